@@ -1,12 +1,15 @@
 # In api/admin.py
 from django.contrib import admin, messages
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from django.urls import path, reverse
 from django.shortcuts import render, redirect
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.utils.html import format_html
 from django.http import HttpResponse, JsonResponse
 import csv
 import io
+import logging
 from datetime import datetime
 
 from import_export import resources
@@ -17,7 +20,15 @@ from import_export.widgets import ForeignKeyWidget
 from .models import (
     Group, Category, Event, Contestant, Registration, Result, GalleryImage, CarouselImage, IndividualChampion
 )
-from .forms import EventResultForm # Import the one correct form
+from .forms import EventResultForm, GalleryBulkUploadForm, CarouselBulkUploadForm, format_registration_label
+from .changes import event_group_points, record_publication
+from .dedup import gallery_hash_index
+from .imaging import preprocess_file
+from .uploads import build_instances, enqueue_uploads, iter_image_files, caption_from_filename
+from .scoring import points_breakdown
+from .search import match_contestants
+
+logger = logging.getLogger(__name__)
 
 # --- Winners Export Resource ---
 class WinnersResource(resources.ModelResource):
@@ -180,32 +191,18 @@ class ContestantResource(resources.ModelResource):
         using_transactions = kwargs.get('using_transactions', args[0] if args else True)
         dry_run = kwargs.get('dry_run', args[1] if len(args) > 1 else False)
         
-        print(f"=== AFTER SAVE INSTANCE: {instance.full_name} (ID: {instance.id}) ===")
-        print(f"Dry run: {dry_run}")
-        print(f"Has _registered_events: {hasattr(self, '_registered_events')}")
-        
-        if hasattr(self, '_registered_events'):
-            print(f"_registered_events value: '{self._registered_events}'")
+        logger.debug("After save instance: %s (ID: %s), dry run: %s, registered events: %r",
+                     instance.full_name, instance.id, dry_run, getattr(self, '_registered_events', None))
         
         if not dry_run and hasattr(self, '_registered_events') and self._registered_events:
-            print(f"🚀 PROCESSING EVENTS FOR: {instance.full_name}")
-            print(f"Events string: '{self._registered_events}'")
-            
             # Process the registered_events string
             event_names = [name.strip() for name in self._registered_events.split(',') if name.strip()]
-            print(f"Parsed event names: {event_names}")
-            
-            # Check each event exists BEFORE processing
-            print(f"🔍 CHECKING EVENTS EXIST:")
-            for event_name in event_names:
-                exists = Event.objects.filter(name=event_name).exists()
-                print(f"  Event '{event_name}': {'✓ EXISTS' if exists else '✗ NOT FOUND'}")
+            logger.debug("Processing events for %s: %s", instance.full_name, event_names)
             
             # Clear existing registrations
-            existing_count = Registration.objects.filter(contestant=instance).count()
-            if existing_count > 0:
-                Registration.objects.filter(contestant=instance).delete()
-                print(f"Cleared {existing_count} existing registrations")
+            deleted, _ = Registration.objects.filter(contestant=instance).delete()
+            if deleted:
+                logger.debug("Cleared existing registrations (%s rows with their results)", deleted)
             
             # Create new registrations
             for event_name in event_names:
@@ -215,32 +212,21 @@ class ContestantResource(resources.ModelResource):
                         contestant=instance,
                         event=event
                     )
-                    print(f"✅ {'CREATED' if created else 'EXISTS'}: {instance.full_name} → {event_name}")
+                    logger.debug("%s: %s → %s", 'Created' if created else 'Exists', instance.full_name, event_name)
                 except Event.DoesNotExist:
-                    print(f"❌ FAILED: Event '{event_name}' not found")
+                    logger.warning("Import of %s: event '%s' not found", instance.full_name, event_name)
                 except Exception as e:
-                    print(f"❌ ERROR creating registration: {e}")
-            
-            # Verify registrations were created
-            final_count = Registration.objects.filter(contestant=instance).count()
-            print(f"📊 FINAL COUNT: {final_count} registrations for {instance.full_name}")
+                    logger.warning("Import of %s: error creating registration for '%s': %s",
+                                   instance.full_name, event_name, e)
             
         else:
-            print(f"⚠️ SKIPPING EVENT PROCESSING:")
-            print(f"  - Dry run: {dry_run}")
-            print(f"  - Has _registered_events: {hasattr(self, '_registered_events')}")
-            if hasattr(self, '_registered_events'):
-                print(f"  - _registered_events: '{self._registered_events}'")
-        
-        print(f"=== END AFTER SAVE: {instance.full_name} ===")
+            logger.debug("Skipping event processing for %s", instance.full_name)
         
         # Call parent method
         try:
-            result = super().after_save_instance(instance, *args, **kwargs)
-            print(f"✓ Parent after_save_instance completed for {instance.full_name}")
-            return result
-        except Exception as e:
-            print(f"❌ Error in parent after_save_instance: {e}")
+            return super().after_save_instance(instance, *args, **kwargs)
+        except Exception:
+            logger.exception("Error in parent after_save_instance for %s", instance.full_name)
             raise
 
 # --- Admin Classes ---
@@ -283,6 +269,11 @@ class EventAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.add_results_view),
                 name='api_event_add_results',
             ),
+            path(
+                '<path:object_id>/registration-search/',
+                self.admin_site.admin_view(self.registration_search_view),
+                name='api_event_registration_search',
+            ),
         ]
         return custom_urls + urls
 
@@ -291,57 +282,87 @@ class EventAdmin(admin.ModelAdmin):
         return format_html('<a class="button" href="{}">Add/Edit Results</a>', url)
     add_results_button.short_description = 'Manage Results'
 
+    def registration_search_view(self, request, object_id):
+        """JSON lookup used by the searchable result picker on large events."""
+        query = request.GET.get('q', '').strip()
+        if len(query) < 2:
+            return JsonResponse({'results': []})
+        matches = match_contestants(Contestant.objects.all(), query, fields=('full_name',))
+        registrations = Registration.objects.filter(
+            event_id=object_id, contestant__in=matches.values('pk')
+        ).select_related(
+            'contestant', 'contestant__group', 'contestant__category'
+        ).order_by('contestant__full_name')[:20]
+        return JsonResponse({'results': [
+            {'id': registration.pk, 'text': format_registration_label(registration)}
+            for registration in registrations
+        ]})
+
     def add_results_view(self, request, object_id):
         event = self.get_object(request, object_id)
+        search_url = reverse('admin:api_event_registration_search', args=[event.pk])
         
         if request.method == 'POST':
-            form = EventResultForm(request.POST, event=event)
+            form = EventResultForm(request.POST, event=event, search_url=search_url)
             if form.is_valid():
-                # Clear existing results for this event
-                Result.objects.filter(registration__event=event).delete()
+                # The results, their change log row and the cache bumps (run
+                # on commit) all land together, or not at all
+                with transaction.atomic():
+                    # Clear existing results for this event, remembering its
+                    # points for the change log
+                    points_before = event_group_points(event)
+                    Result.objects.filter(registration__event=event).delete()
                 
-                data = form.cleaned_data
-                result_number = data.get('result_number')
-                saved_count = 0
+                    data = form.cleaned_data
+                    result_number = data.get('result_number')
+                    saved_count = 0
                 
-                # Process winners for each position
-                for position in [1, 2, 3]:
-                    winners = data.get(f'winners_{position}')
-                    points = data.get(f'points_{position}', 0)
+                    # Process winners for each position
+                    for position in [1, 2, 3]:
+                        winners = data.get(f'winners_{position}')
+                        points = data.get(f'points_{position}', 0)
                     
-                    if winners and points is not None:
-                        display_order = 1
-                        for registration in winners:
+                        if winners and points is not None:
+                            display_order = 1
+                            for registration in winners:
+                                Result.objects.create(
+                                    registration=registration,
+                                    position=position,
+                                    points=points,
+                                    resultNumber=result_number,
+                                    include_in_poster=True,
+                                    display_order=display_order
+                                )
+                                display_order += 1
+                                saved_count += 1
+                                logger.debug("Saved result: registration %s - position %s, points %s",
+                                             registration.pk, position, points)
+                
+                    # Process non-poster participants
+                    non_poster_participants = data.get('non_poster_participants')
+                    non_poster_points = data.get('non_poster_points', 0)
+                
+                    if non_poster_participants and non_poster_points is not None:
+                        for registration in non_poster_participants:
+                            # Use position 4 for non-poster participants (outside poster range 1-3)
                             Result.objects.create(
                                 registration=registration,
-                                position=position,
-                                points=points,
+                                position=4,  # Outside poster range
+                                points=non_poster_points,
                                 resultNumber=result_number,
-                                include_in_poster=True,
-                                display_order=display_order
+                                include_in_poster=False,  # Won't appear on posters
+                                display_order=1
                             )
-                            display_order += 1
                             saved_count += 1
-                            print(f"✅ Saved: {registration.contestant.full_name} - Position {position}, Points {points}")
-                
-                # Process non-poster participants
-                non_poster_participants = data.get('non_poster_participants')
-                non_poster_points = data.get('non_poster_points', 0)
-                
-                if non_poster_participants and non_poster_points is not None:
-                    for registration in non_poster_participants:
-                        # Use position 4 for non-poster participants (outside poster range 1-3)
-                        Result.objects.create(
-                            registration=registration,
-                            position=4,  # Outside poster range
-                            points=non_poster_points,
-                            resultNumber=result_number,
-                            include_in_poster=False,  # Won't appear on posters
-                            display_order=1
-                        )
-                        saved_count += 1
-                        print(f"✅ Saved (Non-poster): {registration.contestant.full_name} - Points {non_poster_points}")
+                            logger.debug("Saved non-poster result: registration %s - points %s",
+                                         registration.pk, non_poster_points)
                 
+                    record_publication(event, points_before, result_number)
+
+                    # Refresh this event's share of the points breakdown (the
+                    # results snapshot follows the result signals)
+                    transaction.on_commit(points_breakdown)
+
                 self.message_user(
                     request, 
                     f"Results for {event.name} saved successfully! {saved_count} results created.", 
@@ -351,33 +372,34 @@ class EventAdmin(admin.ModelAdmin):
             else:
                 self.message_user(request, "Please correct the errors below.", messages.ERROR)
         else:
-            # Pre-populate form with existing results
+            # Pre-populate form with existing results (one query; the pickers
+            # only need registration ids, they have the registrations already)
             initial_data = {}
-            existing_results = Result.objects.filter(registration__event=event)
+            existing_results = list(Result.objects.filter(registration__event=event).order_by('display_order', 'id'))
             
-            if existing_results.exists():
-                initial_data['result_number'] = existing_results.first().resultNumber
+            if existing_results:
+                initial_data['result_number'] = existing_results[0].resultNumber
                 
                 # Group results by position
                 for position in [1, 2, 3]:
-                    position_results = existing_results.filter(position=position, include_in_poster=True).order_by('display_order')
-                    if position_results.exists():
-                        initial_data[f'winners_{position}'] = [r.registration for r in position_results]
-                        initial_data[f'points_{position}'] = position_results.first().points
+                    position_results = [r for r in existing_results if r.position == position and r.include_in_poster]
+                    if position_results:
+                        initial_data[f'winners_{position}'] = [r.registration_id for r in position_results]
+                        initial_data[f'points_{position}'] = position_results[0].points
                 
                 # Non-poster participants (position > 3 or include_in_poster=False)
-                non_poster_results = existing_results.filter(include_in_poster=False)
-                if non_poster_results.exists():
-                    initial_data['non_poster_participants'] = [r.registration for r in non_poster_results]
-                    initial_data['non_poster_points'] = non_poster_results.first().points
+                non_poster_results = [r for r in existing_results if not r.include_in_poster]
+                if non_poster_results:
+                    initial_data['non_poster_participants'] = [r.registration_id for r in non_poster_results]
+                    initial_data['non_poster_points'] = non_poster_results[0].points
                     
-            form = EventResultForm(initial=initial_data, event=event)
+            form = EventResultForm(initial=initial_data, event=event, search_url=search_url)
 
         context = self.admin_site.each_context(request)
         context['opts'] = self.model._meta
         context['form'] = form
         context['event'] = event
-        context['registered_participants'] = Registration.objects.filter(event=event).select_related('contestant', 'contestant__group').count()
+        context['registered_participants'] = len(form.registrations)
         return render(request, 'admin/api/event/change_form_results.html', context)
 
 
@@ -390,6 +412,14 @@ class ContestantAdmin(ImportExportModelAdmin): # <-- This is the key change
     search_fields = ('full_name', 'email')
     autocomplete_fields = ['group', 'category']
     inlines = [RegistrationInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed substring search (api/search.py), also behind the
+        # contestant autocomplete of the registration forms
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return match_contestants(queryset, search_term), False
     
     @admin.display(description='Registered Events')
     def registered_events_display(self, obj):
@@ -405,6 +435,15 @@ class RegistrationAdmin(admin.ModelAdmin):
     search_fields = ('contestant__full_name', 'event__name')
     autocomplete_fields = ['contestant', 'event']
 
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        contestants = match_contestants(Contestant.objects.all(), search_term, fields=('full_name',))
+        return queryset.filter(
+            Q(contestant__in=contestants.values('pk')) | Q(event__name__icontains=search_term)
+        ), False
+
 @admin.register(Result)
 class PublishedResultsAdmin(admin.ModelAdmin):
     """Simple view for published results - one row per event with winners"""
@@ -597,12 +636,104 @@ class PublishedResultsAdmin(admin.ModelAdmin):
         
         return response
 
+class BulkUploadAdminMixin:
+    """
+    Adds a "Bulk upload" page to an image admin. The files are stored right
+    away and uploaded to Cloudinary by background workers (see api/uploads.py),
+    so the request doesn't wait on hundreds of network round trips.
+    """
+    bulk_upload_form = None
+    # Model field that gets a caption made from each file's name
+    bulk_caption_field = 'caption'
+    # Resize/strip/re-encode images before storing them (see api/imaging.py)
+    preprocess_uploads = False
+    change_list_template = 'admin/api/bulk_upload_change_list.html'
+    actions = ['retry_cloudinary_upload']
+
+    def get_urls(self):
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                'bulk-upload/',
+                self.admin_site.admin_view(self.bulk_upload_view),
+                name=f'{opts.app_label}_{opts.model_name}_bulk_upload',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    def build_bulk_instance(self, form, name):
+        """
+        Return an unsaved model instance (without its image) for one uploaded
+        file. `bulk_caption_field` is made from the file name, and fields of
+        `bulk_upload_form` named like a model field (e.g. the gallery year)
+        are copied over. Override it for anything else.
+        """
+        field_names = {field.name for field in self.model._meta.concrete_fields}
+        values = {name: value for name, value in form.cleaned_data.items() if name in field_names}
+        values[self.bulk_caption_field] = caption_from_filename(name)
+        return self.model(**values)
+
+    def bulk_upload_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        if request.method == 'POST':
+            form = self.bulk_upload_form(request.POST, request.FILES)
+            if form.is_valid():
+                pks, skipped = [], []
+                image_files = iter_image_files(form.cleaned_data['images'], form.cleaned_data['archives'])
+                build = lambda name: self.build_bulk_instance(form, name)
+                duplicates = form.cleaned_data.get('duplicates', 'allow')
+                instances = build_instances(image_files, build, self.preprocess_uploads, duplicates, skipped)
+                if self.preprocess_uploads:
+                    # Process every image before the transaction starts, so the
+                    # Pillow work doesn't keep it (and its locks) open
+                    instances = list(instances)
+                with transaction.atomic():
+                    for obj in instances:
+                        obj.save(defer_upload=True)
+                        pks.append(obj.pk)
+                    enqueue_uploads(self.model, pks)
+
+                self.message_user(
+                    request,
+                    f"{len(pks)} images saved. They are being uploaded to Cloudinary in the background. "
+                    "Uploads still running when the server restarts are lost: images left in "
+                    "local storage only can be sent again with the retry action or the "
+                    "`upload_images --pending` management command.",
+                    messages.SUCCESS
+                )
+                if skipped:
+                    self.message_user(
+                        request,
+                        f"Skipped {len(skipped)} images already in the gallery: {', '.join(skipped)}",
+                        messages.WARNING
+                    )
+                opts = self.model._meta
+                return redirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+        else:
+            form = self.bulk_upload_form()
+
+        context = self.admin_site.each_context(request)
+        context['opts'] = self.model._meta
+        context['form'] = form
+        context['title'] = f"Bulk upload {self.model._meta.verbose_name_plural}"
+        return render(request, 'admin/api/bulk_upload.html', context)
+
+    @admin.action(description="Retry Cloudinary upload for selected images")
+    def retry_cloudinary_upload(self, request, queryset):
+        pks = list(queryset.filter(cloudinary_url__isnull=True).exclude(image='').values_list('pk', flat=True))
+        enqueue_uploads(self.model, pks)
+        self.message_user(request, f"{len(pks)} images queued for upload.", messages.SUCCESS)
+
 @admin.register(GalleryImage)
-class GalleryImageAdmin(admin.ModelAdmin):
-    list_display = ('caption', 'year', 'image_status', 'uploaded_at')
-    list_filter = ('year', 'uploaded_at')
-    readonly_fields = ('cloudinary_url', 'uploaded_at')
-    fields = ('caption', 'year', 'image', 'cloudinary_url', 'uploaded_at')
+class GalleryImageAdmin(BulkUploadAdminMixin, admin.ModelAdmin):
+    list_display = ('caption', 'year', 'image_status', 'size_saved', 'duplicate_of', 'uploaded_at')
+    list_filter = ('year', 'uploaded_at', ('duplicate_of', admin.EmptyFieldListFilter))
+    readonly_fields = ('cloudinary_url', 'image_url', 'size_saved', 'duplicate_of', 'uploaded_at')
+    fields = ('caption', 'year', 'image', 'cloudinary_url', 'image_url', 'size_saved', 'duplicate_of', 'uploaded_at')
+    bulk_upload_form = GalleryBulkUploadForm
+    preprocess_uploads = True
     
     @admin.display(description='Image Status')
     def image_status(self, obj):
@@ -617,11 +748,32 @@ class GalleryImageAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color: red;">✗ No image</span>')
     
+    @admin.display(description='Size Saved')
+    def size_saved(self, obj):
+        if obj.original_size is None or obj.stored_size is None:
+            return "-"
+        saved = obj.original_size - obj.stored_size
+        percent = saved * 100 // obj.original_size if obj.original_size else 0
+        return f"{saved / 1024:.0f} KB ({percent}%)"
+
     def save_model(self, request, obj, form, change):
         """
         Custom save to ensure Cloudinary upload happens
         """
+        # A newly chosen file is resized, stripped and re-encoded before upload
+        if 'image' in form.changed_data and obj.image:
+            obj.cloudinary_url = None
+            obj.apply_processed_image(preprocess_file(obj.image))
+            obj.duplicate_of_id = gallery_hash_index.find_duplicate(obj.phash, exclude_pk=obj.pk)
+
         super().save_model(request, obj, form, change)
+
+        if obj.duplicate_of_id:
+            self.message_user(
+                request,
+                f"Image '{obj.caption}' looks like a duplicate of '{obj.duplicate_of}'.",
+                level='WARNING'
+            )
         
         # If save was successful and we have a Cloudinary URL, show success message
         if obj.cloudinary_url:
@@ -638,13 +790,15 @@ class GalleryImageAdmin(admin.ModelAdmin):
             )
 
 @admin.register(CarouselImage)
-class CarouselImageAdmin(admin.ModelAdmin):
+class CarouselImageAdmin(BulkUploadAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'image_status', 'is_active', 'order', 'uploaded_at')
     list_filter = ('is_active', 'uploaded_at')
     list_editable = ('is_active', 'order')
-    readonly_fields = ('cloudinary_url', 'uploaded_at')
-    fields = ('title', 'image', 'cloudinary_url', 'is_active', 'order', 'uploaded_at')
+    readonly_fields = ('cloudinary_url', 'image_url', 'uploaded_at')
+    fields = ('title', 'image', 'cloudinary_url', 'image_url', 'is_active', 'order', 'uploaded_at')
     ordering = ['order', 'uploaded_at']
+    bulk_upload_form = CarouselBulkUploadForm
+    bulk_caption_field = 'title'
     
     @admin.display(description='Image Status')
     def image_status(self, obj):
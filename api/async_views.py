@@ -0,0 +1,151 @@
+"""
+Async variants of the I/O-bound API views, for deployments on ASGI
+(see start_asgi.sh).
+
+Under ASGI a synchronous view holds a thread for the whole request, so a
+poster upload to Cloudinary or a slow database ping blocks everything else
+queued behind it. These views await the database through Django's async
+ORM and Cloudinary through an async HTTP client instead. They return the
+same JSON as their synchronous counterparts, which stay in place for WSGI,
+from the same caches and with the same conditional GET handling (ETag and
+Last-Modified, 304s).
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+from . import views
+from .caching import compress_variants, versioned_key
+from .event_results import poster_cache_key
+from .models import Event, GalleryImage
+from .posters import agenerate_posters, aload_poster_data
+from .scoring import agroup_points
+from .serializers import GalleryImageSerializer
+from .signals import gallery_year_namespace
+
+logger = logging.getLogger(__name__)
+
+
+def _ping():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+async def ping_database(request):
+    """Async version of `views.ping_database`."""
+    try:
+        await sync_to_async(_ping)()
+        return JsonResponse({
+            'status': 'ok',
+            'timestamp': timezone.now().isoformat(),
+            'database': 'connected',
+            'message': 'Database ping successful'
+        })
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'timestamp': timezone.now().isoformat(),
+            'database': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+def _json(data):
+    # Rendered like the DRF views, so both give the same bodies
+    return JSONRenderer().render(data)
+
+
+async def _compressed(request, view, build):
+    """
+    Serve the data returned by `build()` from the compressed response cache
+    of `view`, a `CompressedResponseCacheMixin` view.
+    """
+    if not view._is_cacheable(request):
+        return HttpResponse(_json(await build()), content_type='application/json')
+    cache_key = await sync_to_async(view.get_response_cache_key)(request)
+    variants = await cache.aget(cache_key)
+    if variants is None:
+        variants = compress_variants(_json(await build()))
+        await cache.aset(cache_key, variants, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return view._compressed_response(request, variants)
+
+
+async def _conditional(request, view, respond):
+    """
+    Answer a conditional GET like `view`, a `ConditionalGetMixin` view, and
+    otherwise await `respond()` and add the same validators and policy.
+    """
+    etag, modified = await sync_to_async(view.get_validators)(request)
+    response = get_conditional_response(request, etag=etag, last_modified=int(modified))
+    if response is None:
+        response = await respond()
+        if response.status_code != 200:
+            return response
+    view.add_validators(response, etag, modified)
+    return response
+
+
+async def points(request):
+    """Async version of `views.PointsView`."""
+    return await _compressed(request, views.PointsView(), agroup_points)
+
+
+async def gallery(request):
+    """
+    Async version of the `GalleryImageViewSet` listing. It shares the
+    per-year cache with the synchronous view.
+    """
+    return await _conditional(request, views.GalleryImageViewSet(), lambda: _gallery(request))
+
+
+async def _gallery(request):
+    year = request.GET.get('year')
+    if year is not None:
+        try:
+            year = int(year)
+        except ValueError:
+            return JsonResponse({'year': ['Year must be a number.']}, status=400)
+
+    cache_key = await sync_to_async(versioned_key)(gallery_year_namespace(year), 'list')
+    data = await cache.aget(cache_key)
+    if data is None:
+        queryset = GalleryImage.objects.all().order_by('-uploaded_at')
+        if year is not None:
+            queryset = queryset.filter(year=year)
+        images = [image async for image in queryset]
+        data = GalleryImageSerializer(images, many=True).data
+        await cache.aset(cache_key, data, settings.GALLERY_CACHE_TIMEOUT)
+    return HttpResponse(_json(data), content_type='application/json')
+
+
+async def generate_event_posters(request, event_id):
+    """
+    Async version of `views.GenerateEventPostersView`: the templates are
+    drawn in worker threads and uploaded to Cloudinary concurrently.
+    """
+    try:
+        posters_key = await sync_to_async(poster_cache_key)(event_id)
+        posters = await cache.aget(posters_key)
+        if posters is not None:
+            return JsonResponse(posters, safe=False)
+        data = await aload_poster_data(event_id)
+        if data is None:
+            # No poster-eligible winning results found
+            return JsonResponse([], safe=False)
+        posters = await agenerate_posters(data, request)
+        if posters:
+            await cache.aset(posters_key, posters, settings.POSTER_CACHE_TIMEOUT)
+        return JsonResponse(posters, safe=False)
+    except Event.DoesNotExist:
+        return JsonResponse({"error": "Event not found."}, status=404)
+    except Exception:
+        logger.exception("Generating posters for event %s failed", event_id)
+        return JsonResponse({'error': 'An unexpected server error occurred.'}, status=500)
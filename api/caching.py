@@ -0,0 +1,253 @@
+"""
+Versioned cache keys for API responses, and helpers for serving
+pre-compressed response bodies.
+
+Each cached response belongs to a namespace (e.g. one gallery year, or one
+model). Invalidating a namespace just bumps its version number, so every key
+built from the old version is never read again and simply expires.
+
+Version numbers and last-changed times are read on every cached request.
+Each process keeps a copy of them in its `local` cache for
+`CACHE_COUNTER_TIMEOUT` seconds, so a cache hit is one read of the shared
+cache (a database query with the DatabaseCache) instead of two or more.
+Changes made in this process are seen at once, changes made by other
+workers within that many seconds.
+"""
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+VERSION_KEY = 'version:{}'
+LAST_CHANGED_KEY = 'last_changed:{}'
+
+
+def _local_counters():
+    """This process's short-lived copy of the counters, or None if it is disabled."""
+    return caches['local'] if settings.CACHE_COUNTER_TIMEOUT else None
+
+
+def _read_counters(keys, initial):
+    """
+    Read counters from the local copy, else with one read of the shared
+    cache. Missing counters are set to `initial()`.
+    """
+    local = _local_counters()
+    found = local.get_many(keys) if local else {}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        shared = cache.get_many(missing)
+        for key in missing:
+            if key not in shared:
+                # add() so a concurrent bump isn't overwritten
+                value = initial()
+                cache.add(key, value, None)
+                shared[key] = cache.get(key, value)
+        if local:
+            local.set_many(shared, settings.CACHE_COUNTER_TIMEOUT)
+        found.update(shared)
+    return [found[key] for key in keys]
+
+
+def _forget_counters(keys):
+    local = _local_counters()
+    if local:
+        local.delete_many(keys)
+
+
+def get_version(namespace):
+    """Return the current version number of a cache namespace."""
+    return _read_counters([VERSION_KEY.format(namespace)], lambda: 1)[0]
+
+
+def bump_version(*namespaces):
+    """Invalidate everything cached under the given namespaces."""
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set yet (or evicted), so start a fresh version
+            cache.set(key, 2, None)
+    _forget_counters(keys)
+
+
+def get_versions(*namespaces):
+    """Return the current version numbers of several namespaces with one cache read."""
+    return _read_counters([VERSION_KEY.format(namespace) for namespace in namespaces], lambda: 1)
+
+
+def model_namespace(model):
+    """Cache namespace bumped whenever a row of `model` changes, see api/signals.py."""
+    return f"model:{model._meta.concrete_model._meta.label_lower}"
+
+
+def touch_models(*models):
+    """Record that rows of `models` changed just now."""
+    now = time.time()
+    keys = [LAST_CHANGED_KEY.format(model_namespace(model)) for model in models]
+    cache.set_many(dict.fromkeys(keys, now), None)
+    _forget_counters(keys)
+
+
+def last_changed(*models):
+    """
+    Return the time (a Unix timestamp) any of `models` last changed.
+
+    A model with no recorded change (e.g. after the cache was cleared) counts
+    as changed now, so clients never keep a response older than that.
+    """
+    keys = [LAST_CHANGED_KEY.format(model_namespace(model)) for model in models]
+    return max(_read_counters(keys, time.time), default=0)
+
+
+def versioned_key(namespace, *parts):
+    """Build a cache key that changes whenever the namespace is bumped."""
+    suffix = ':'.join(str(part) for part in parts)
+    return f"{namespace}:v{get_version(namespace)}:{suffix}"
+
+
+def compress_variants(body):
+    """Return `{encoding: bytes}` with the raw body and its compressed forms."""
+    variants = {'identity': body}
+    compressed = {'gzip': gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        compressed['br'] = brotli.compress(body)
+    for encoding, data in compressed.items():
+        # Tiny bodies can grow when compressed
+        if len(data) < len(body):
+            variants[encoding] = data
+    return variants
+
+
+def choose_encoding(request, available):
+    """
+    Pick the best encoding from `available` that the client accepts,
+    preferring Brotli, then gzip, then the uncompressed body.
+    """
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        quality = params.strip().lower()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+class CompressedResponseCacheMixin:
+    """
+    Cache the rendered JSON of a read-only API view together with its gzip
+    and Brotli variants, and answer later requests straight from the cache
+    with the best variant the client accepts.
+
+    Cached bodies are keyed on the versions of `cache_models`, so any change
+    to one of those models (see api/signals.py) makes the next request
+    render a fresh body. Browsable-API (HTML) requests are never cached.
+    """
+    cache_models = ()
+
+    def get_response_cache_key(self, request):
+        versions = get_versions(*(model_namespace(model) for model in self.cache_models))
+        return 'response:%s:%s' % (
+            '.'.join(str(version) for version in versions), request.get_full_path()
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        cache_key = None
+        if self._is_cacheable(request):
+            cache_key = self.get_response_cache_key(request)
+            variants = cache.get(cache_key)
+            if variants is not None:
+                return self._compressed_response(request, variants)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        renderer = getattr(response, 'accepted_renderer', None)
+        if cache_key and response.status_code == 200 and getattr(renderer, 'format', None) == 'json':
+            response.render()
+            variants = compress_variants(response.content)
+            cache.set(cache_key, variants, settings.API_RESPONSE_CACHE_TIMEOUT)
+            return self._compressed_response(request, variants)
+        return response
+
+    def _is_cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and 'format' not in request.GET
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+        )
+
+    def _compressed_response(self, request, variants):
+        encoding = choose_encoding(request, variants)
+        response = HttpResponse(variants[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept, Accept-Encoding'
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs of an API view from the last-changed times of
+    `cache_models`, without running the view, and add `ETag`,
+    `Last-Modified` and `Cache-Control` headers to its responses.
+
+    `cache_policy` names an entry of `settings.API_CACHE_POLICIES`, which
+    sets the `max-age` and `stale-while-revalidate` of the endpoint.
+    """
+    cache_models = ()
+    cache_policy = 'default'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not self.cache_models:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag, modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=int(modified))
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        self.add_validators(response, etag, modified)
+        return response
+
+    def get_validators(self, request):
+        """Return the ETag of a GET of this view and the time it last changed."""
+        modified = last_changed(*self.cache_models)
+        # The browsable API and the JSON of a URL are different bodies
+        flavour = 'html' if 'text/html' in request.META.get('HTTP_ACCEPT', '') else 'json'
+        digest = hashlib.sha1(f"{modified!r}:{flavour}:{request.get_full_path()}".encode()).hexdigest()
+        return f'W/"{digest[:27]}"', modified
+
+    def add_validators(self, response, etag, modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        self.patch_cache_policy(response)
+
+    def patch_cache_policy(self, response):
+        policies = settings.API_CACHE_POLICIES
+        policy = policies.get(self.cache_policy, policies['default'])
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=policy['max_age'],
+            stale_while_revalidate=policy['stale_while_revalidate'],
+        )
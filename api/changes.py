@@ -0,0 +1,109 @@
+"""
+The result change log, for clients that poll the results and the
+leaderboard.
+
+Every publication of an event's results through the admin results form
+adds a `ResultChange` row, whose id is a sequence number, together with how
+it changed each group's points. A client remembers the last sequence number
+it saw and asks `/api/changes/?since=<seq>` for what happened after: the
+current results of the events published since (see api/event_results.py)
+and the summed leaderboard deltas, instead of downloading all results and
+points again. `reset` tells a client whose sequence number is ahead of the
+log (it was cleared) to drop what it has: the answer starts from scratch.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .event_results import event_results
+from .models import Group, Result, ResultChange
+
+MAX_LIMIT = 100
+
+
+def event_group_points(event):
+    """`{group id: points}` of an event's results."""
+    return dict(
+        Result.objects.filter(registration__event=event)
+        .values_list('registration__contestant__group_id')
+        .annotate(points=Sum('points'))
+        .order_by()
+    )
+
+
+def record_publication(event, points_before, result_number=None):
+    """
+    Add the publication of `event`'s results to the change log;
+    `points_before` is its `event_group_points` before the results were
+    replaced.
+    """
+    points_after = event_group_points(event)
+    changed = sorted(
+        (group_id for group_id in points_before.keys() | points_after.keys()
+         if points_after.get(group_id, 0) != points_before.get(group_id, 0)),
+        key=lambda group_id: (group_id is None, group_id),
+    )
+    names = dict(Group.objects.filter(pk__in=changed).values_list('id', 'name'))
+    points_delta = [
+        {
+            'group_id': group_id,
+            'group_name': names.get(group_id),
+            'delta': points_after.get(group_id, 0) - points_before.get(group_id, 0),
+        }
+        for group_id in changed
+    ]
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Sequence numbers are handed out before commit; holding the
+            # table lock until then makes rows visible in sequence order, so
+            # a client never skips one that committed late
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {ResultChange._meta.db_table} IN EXCLUSIVE MODE')
+        return ResultChange.objects.create(event=event, result_number=result_number, points_delta=points_delta)
+
+
+def changes_since(since, limit=MAX_LIMIT):
+    """
+    The changes after sequence number `since`, oldest first and at most
+    `limit`, with the current results of the events they published and the
+    summed points deltas per group.
+    """
+    changes = list(ResultChange.objects.filter(pk__gt=since).order_by('pk')[:limit + 1])
+    if not changes and since:
+        newest = ResultChange.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        if since > newest:
+            # The log was cleared since the client last synced: start over
+            return {**changes_since(0, limit), 'reset': True}
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    deltas = defaultdict(int)
+    names = {}
+    for change in changes:
+        for entry in change.points_delta:
+            deltas[entry['group_id']] += entry['delta']
+            names[entry['group_id']] = entry['group_name']
+
+    # Each event once, as it is now, in the order it was last published
+    event_ids = list(dict.fromkeys(change.event_id for change in reversed(changes)))[::-1]
+    return {
+        'since': since,
+        'latest': changes[-1].pk if changes else since,
+        'has_more': has_more,
+        'reset': False,
+        'changes': [
+            {
+                'seq': change.pk,
+                'event_id': change.event_id,
+                'result_number': change.result_number,
+                'published_at': change.published_at,
+            }
+            for change in changes
+        ],
+        'events': [payload for payload in map(event_results, event_ids) if payload is not None],
+        'points_delta': [
+            {'group_id': group_id, 'group_name': names[group_id], 'delta': delta}
+            for group_id, delta in deltas.items() if delta
+        ],
+    }
@@ -0,0 +1,40 @@
+"""
+Lazy access to the Cloudinary SDK.
+
+The SDK (and the HTTP stack under it) is only imported and configured the
+first time an upload actually happens, so gunicorn workers, management
+commands and cold starts that never upload don't pay for it.
+"""
+import functools
+
+from django.conf import settings
+
+
+@functools.cache
+def _configured():
+    import cloudinary
+
+    # For direct uploads (gallery/carousel images and poster generation)
+    cloudinary.config(
+        cloud_name=settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
+        api_key=settings.CLOUDINARY_STORAGE['API_KEY'],
+        api_secret=settings.CLOUDINARY_STORAGE['API_SECRET'],
+        secure=True,
+    )
+    return cloudinary
+
+
+def uploader():
+    """The configured `cloudinary.uploader` module."""
+    _configured()
+    import cloudinary.uploader
+
+    return cloudinary.uploader
+
+
+def utils():
+    """The configured `cloudinary.utils` module."""
+    _configured()
+    import cloudinary.utils
+
+    return cloudinary.utils
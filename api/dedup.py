@@ -0,0 +1,174 @@
+"""
+Near-duplicate detection for gallery photos.
+
+Every pre-processed gallery photo gets a 64-bit difference hash (dHash, see
+`api.imaging.dhash`). Two photos whose hashes differ in only a few bits are
+the same picture, even if one was re-compressed or resized. The hashes live
+in a per-process multi-index hash table, so a lookup only compares against
+a small part of the collection and stays well under a millisecond even
+with tens of thousands of images.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .caching import bump_version, get_version
+
+# Bumped whenever an image's hash is replaced or an image deleted, so every
+# process reloads its table
+REHASH_NAMESPACE = 'gallery:rehash'
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes."""
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHashTable:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    The hash is cut into `max_distance + 1` chunks. Two hashes that differ
+    in at most `max_distance` bits must agree exactly on at least one chunk
+    (pigeonhole principle), so a lookup only compares against the few
+    hashes that share a chunk with the query instead of the whole set.
+    """
+
+    def __init__(self, max_distance, bits=64):
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        widths = [bits // chunks + (1 if i < bits % chunks else 0) for i in range(chunks)]
+        self._chunks = []
+        shift = 0
+        for width in widths:
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables = [{} for _ in self._chunks]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append((value, item))
+        self._size += 1
+
+    def search(self, value, max_distance=None):
+        """Return `(distance, item)` pairs within `max_distance`, closest first."""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        matches = {}
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            for candidate, item in table.get((value >> shift) & mask, ()):
+                distance = hamming(value, candidate)
+                if distance <= max_distance:
+                    matches[(candidate, item)] = distance
+        return sorted(((distance, item) for (_, item), distance in matches.items()),
+                      key=lambda match: match[0])
+
+
+class GalleryHashIndex:
+    """
+    Multi-index hash table of all gallery image hashes in this process.
+
+    It is loaded on first use and then kept up to date by the gallery image
+    signals of this process (new, replaced and deleted images, see
+    api/signals.py), so lookups don't touch the database. Changes made by
+    other processes are picked up by `refresh()`, which runs at most every
+    `GALLERY_HASH_REFRESH_INTERVAL` seconds on lookup, or explicitly, e.g.
+    once before a batch of uploads is checked: it adds the images created
+    since with one query on the primary key. Replacing or deleting an
+    image bumps `REHASH_NAMESPACE`, and a process that sees the new
+    version loads its table again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+        # The current hash of every image; the table can still hold the
+        # old hash of a replaced or deleted one
+        self._hashes = {}
+        self._last_pk = 0
+        self._version = None
+        self._refreshed_at = None
+
+    def _refresh(self, force=False):
+        from .models import GalleryImage
+
+        now = time.monotonic()
+        if (not force and self._table is not None
+                and now - self._refreshed_at < settings.GALLERY_HASH_REFRESH_INTERVAL):
+            return
+        version = get_version(REHASH_NAMESPACE)
+        if self._table is None or version != self._version:
+            self._table = MultiIndexHashTable(settings.GALLERY_DUPLICATE_DISTANCE)
+            self._hashes = {}
+            self._last_pk = 0
+            self._version = version
+
+        rows = (
+            GalleryImage.objects.filter(pk__gt=self._last_pk)
+            .exclude(phash='').order_by('pk').values_list('pk', 'phash')
+        )
+        for pk, phash in rows:
+            self._index(pk, phash)
+            self._last_pk = pk
+        self._refreshed_at = now
+
+    def _index(self, pk, phash):
+        value = int(phash, 16)
+        self._table.add(value, pk)
+        self._hashes[pk] = value
+
+    def refresh(self):
+        """Pick up the images other processes changed, now."""
+        with self._lock:
+            self._refresh(force=True)
+
+    def add(self, pk, phash):
+        """Index an image saved in this process (new, or with a replaced file)."""
+        with self._lock:
+            # Not loaded yet: the first lookup loads it from the database
+            if self._table is not None:
+                self._index(pk, phash)
+
+    def replaced(self, pk, phash):
+        """
+        Index the new hash of an image whose file was replaced, here at once
+        and in other processes on their next refresh.
+        """
+        self.add(pk, phash)
+        bump_version(REHASH_NAMESPACE)
+
+    def removed(self, pk):
+        """Forget a deleted image, here at once and in other processes on their next refresh."""
+        with self._lock:
+            self._hashes.pop(pk, None)
+        bump_version(REHASH_NAMESPACE)
+
+    def find(self, phash, max_distance=None, exclude_pk=None):
+        """Return the primary keys of gallery images that look like `phash`, closest first."""
+        if max_distance is None:
+            max_distance = settings.GALLERY_DUPLICATE_DISTANCE
+        value = int(phash, 16)
+        with self._lock:
+            self._refresh()
+            candidates = {pk for _, pk in self._table.search(value, max_distance) if pk != exclude_pk}
+            # Compared with each image's current hash: deleted ones are gone,
+            # replaced ones only match their new file
+            matches = [
+                (hamming(value, self._hashes[pk]), pk) for pk in candidates if pk in self._hashes
+            ]
+        return [pk for distance, pk in sorted(matches) if distance <= max_distance]
+
+    def find_duplicate(self, phash, exclude_pk=None):
+        """Return the closest existing duplicate's primary key, or None."""
+        if not phash:
+            return None
+        matches = self.find(phash, exclude_pk=exclude_pk)
+        return matches[0] if matches else None
+
+
+gallery_hash_index = GalleryHashIndex()
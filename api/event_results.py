@@ -0,0 +1,115 @@
+"""
+An event's results with everything the results page shows, in one payload:
+the event, its ordered results with contestant names, groups and points,
+and the URLs of its posters once they have been generated.
+
+Payloads are cached per event, under the event's results version (bumped
+whenever one of its results changes, or the registration or contestant
+behind one, see api/signals.py) and the versions of the event, group and
+category tables, so publishing one event's results, or a new sign-up,
+leaves the other events cached. Poster URLs are cached the same way by the
+poster views (`poster_cache_key`), so a poster is only drawn and uploaded
+again after something on it changed.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import get_versions, model_namespace, versioned_key
+from .models import Category, Event, Group, Result
+from .signals import event_results_namespace
+
+# Besides the event's own results (with their registrations and contestants),
+# the payload shows these
+PAYLOAD_MODELS = (Event, Category, Group)
+
+
+def _versions(event_id):
+    versions = get_versions(
+        event_results_namespace(event_id), *(model_namespace(model) for model in PAYLOAD_MODELS)
+    )
+    return '.'.join(str(version) for version in versions)
+
+
+def poster_cache_key(event_id, versions=None):
+    """Cache key of an event's poster URLs; it changes with anything drawn on them."""
+    return f"posters:{event_id}:{versions or _versions(event_id)}"
+
+
+def build_event_results(event_id):
+    """
+    The payload of one event, or None if there is no such event. The
+    results come from one joined query.
+    """
+    results = list(
+        Result.objects.filter(registration__event_id=event_id)
+        .select_related('registration__contestant__group', 'registration__event')
+        .order_by('position', 'display_order', 'id')
+    )
+    if results:
+        event = results[0].registration.event
+    else:
+        event = Event.objects.filter(pk=event_id).first()
+        if event is None:
+            return None
+
+    return {
+        'event': {
+            'id': event.pk,
+            'name': event.name,
+            'categories': sorted(event.categories.values_list('name', flat=True)),
+        },
+        'result_number': next((result.resultNumber for result in results if result.resultNumber), None),
+        'results': [
+            {
+                'id': result.pk,
+                'position': result.position,
+                'points': result.points,
+                'display_order': result.display_order,
+                'include_in_poster': result.include_in_poster,
+                'contestant_name': result.registration.contestant.full_name,
+                'group_name': (
+                    result.registration.contestant.group.name if result.registration.contestant.group else None
+                ),
+            }
+            for result in results
+        ],
+    }
+
+
+def event_results(event_id):
+    """
+    The cached payload of one event with its `posters` (None until the
+    posters have been generated), or None if there is no such event.
+    """
+    versions = _versions(event_id)
+    payload_key = f"event-results:{event_id}:{versions}"
+    posters_key = poster_cache_key(event_id, versions)
+    found = cache.get_many([payload_key, posters_key])
+    payload = found.get(payload_key)
+    if payload is None:
+        payload = build_event_results(event_id)
+        if payload is None:
+            return None
+        cache.set(payload_key, payload, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return {**payload, 'posters': found.get(posters_key)}
+
+
+def result_number_variants(number):
+    """A result number with and without its leading zero, as entered in the admin."""
+    numbers = {number}
+    if number.isdigit():
+        numbers |= {number.lstrip('0') or '0', number.zfill(2)}
+    return numbers
+
+
+def results_by_number(number):
+    """The payloads of the events published under a result number."""
+    key = versioned_key(model_namespace(Result), 'by-number', number)
+    event_ids = cache.get(key)
+    if event_ids is None:
+        event_ids = list(
+            Result.objects.filter(resultNumber__in=result_number_variants(number))
+            .values_list('registration__event_id', flat=True).distinct().order_by('registration__event_id')
+        )
+        cache.set(key, event_ids, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return [payload for payload in map(event_results, event_ids) if payload is not None]
@@ -0,0 +1,227 @@
+"""
+Synthetic festival data for benchmarks and load tests.
+
+`generate()` fills the `api` tables with a festival of configurable size:
+groups (schools), categories, events in one or more categories,
+contestants, their registrations and published results, plus gallery and
+carousel rows. Everything is drawn from a seeded random generator, so the
+same seed and sizes always produce the same festival, and it is inserted
+with `bulk_create` (no model `save()`, so nothing is uploaded to
+Cloudinary).
+"""
+import random
+from dataclasses import dataclass
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from .caching import bump_version
+from .models import (
+    CarouselImage, Category, Contestant, Event, GalleryImage, Group, Registration, Result,
+    ResultChange,
+)
+from .signals import (
+    GALLERY_YEARS_NAMESPACE, TRACKED_MODELS, gallery_year_namespace, record_model_changes,
+)
+
+FIRST_NAMES = [
+    'Adil', 'Aisha', 'Akhil', 'Amal', 'Anjali', 'Arjun', 'Fathima', 'Gopika', 'Hiba', 'Irfan',
+    'Jithin', 'Lakshmi', 'Meera', 'Midhun', 'Nandana', 'Nihal', 'Rahul', 'Riya', 'Sana', 'Vishnu',
+]
+LAST_NAMES = [
+    'Abdulla', 'Babu', 'Chandran', 'Das', 'Hameed', 'Krishnan', 'Kumar', 'Menon', 'Nair', 'Pillai',
+    'Rahman', 'Raj', 'Thomas', 'Varghese', 'Warrier',
+]
+SCHOOLS = [
+    'Management', 'Languages', 'Pure Sciences', 'Humanities', 'Law', 'Engineering',
+    'Education', 'Fine Arts', 'Social Sciences', 'Health Sciences', 'Commerce', 'Computer Science',
+]
+CATEGORIES = ['A (UG)', 'B (PG)', 'C (Research)', 'Girls', 'Boys', 'General']
+STATES = ['Kerala', 'Karnataka', 'Tamil Nadu', 'Maharashtra', 'Delhi']
+GENDERS = [value for value, _ in Contestant.GENDER_CHOICES]
+COURSES = ['BA English', 'BSc Physics', 'BCom', 'MA Malayalam', 'MSc Chemistry', 'MBA', 'BTech']
+EVENT_KINDS = [
+    'Elocution', 'Essay Writing', 'Poetry Recitation', 'Story Writing', 'Quiz', 'Cartoon',
+    'Mappilappattu', 'Light Music', 'Mimicry', 'Debate', 'Calligraphy', 'Translation',
+]
+LANGUAGES = ['Malayalam', 'English', 'Arabic', 'Urdu', 'Hindi', 'Tamil']
+GALLERY_YEARS = [2023, 2024, 2025]
+
+# Points awarded for the winning positions
+POSITION_POINTS = {1: 5, 2: 3, 3: 1}
+
+
+@dataclass
+class FestivalSize:
+    groups: int = 12
+    categories: int = 6
+    events: int = 120
+    contestants: int = 3000
+    events_per_contestant: int = 3
+    # Share of events that already have published results
+    published: float = 0.8
+    gallery_images: int = 200
+    carousel_images: int = 10
+
+
+def generate(size=None, seed=0, batch_size=1000):
+    """
+    Insert a synthetic festival of `size` (a FestivalSize) into an empty
+    database (see `clear()`) and return the number of rows created per
+    model. Contestants are inserted `batch_size` at a time.
+    """
+    size = size or FestivalSize()
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        groups = Group.objects.bulk_create(
+            [Group(name=f'School of {name}') for name in _numbered(SCHOOLS, size.groups)],
+            batch_size=batch_size,
+        )
+        categories = Category.objects.bulk_create(
+            [Category(name=f'Category - {name}') for name in _numbered(CATEGORIES, size.categories)],
+            batch_size=batch_size,
+        )
+
+        event_names = [f'{kind} ({language})' for language in LANGUAGES for kind in EVENT_KINDS]
+        events = Event.objects.bulk_create(
+            [Event(name=name) for name in _numbered(event_names, size.events)],
+            batch_size=batch_size,
+        )
+        event_categories = []
+        events_by_category = {category.pk: [] for category in categories}
+        for event in events:
+            # Most events are for one category, some are open to several
+            count = 1 if rng.random() < 0.8 else min(len(categories), rng.randint(2, 3))
+            for category in rng.sample(categories, count):
+                event_categories.append(Event.categories.through(event_id=event.pk, category_id=category.pk))
+                events_by_category[category.pk].append(event)
+        Event.categories.through.objects.bulk_create(event_categories, batch_size=batch_size)
+
+        # Contestants and their registrations are created a batch at a time,
+        # so memory stays flat however many there are; only registration ids
+        # are kept, for drawing the winners. Each has its own random stream,
+        # so the data doesn't depend on the batch size.
+        contestant_rng = random.Random(f'{seed}:contestants')
+        registration_rng = random.Random(f'{seed}:registrations')
+        group_ids = [group.pk for group in groups]
+        category_ids = [category.pk for category in categories]
+        event_ids_by_category = {
+            category_id: [event.pk for event in category_events]
+            for category_id, category_events in events_by_category.items()
+        }
+        registration_ids_by_event = {}
+        contestant_count = registration_count = 0
+        for first in range(0, size.contestants, batch_size):
+            contestants = Contestant.objects.bulk_create([
+                Contestant(
+                    full_name=f'{contestant_rng.choice(FIRST_NAMES)} {contestant_rng.choice(LAST_NAMES)}',
+                    email=f'contestant{i}@festival.test',
+                    state=contestant_rng.choice(STATES),
+                    gender=contestant_rng.choice(GENDERS),
+                    group_id=contestant_rng.choice(group_ids),
+                    category_id=contestant_rng.choice(category_ids),
+                    course=contestant_rng.choice(COURSES),
+                    phone_number=f'9{contestant_rng.randrange(10 ** 9):09d}',
+                )
+                for i in range(first, min(first + batch_size, size.contestants))
+            ])
+            registrations = []
+            for contestant in contestants:
+                eligible = event_ids_by_category[contestant.category_id]
+                for event_id in registration_rng.sample(eligible, min(len(eligible), size.events_per_contestant)):
+                    registrations.append(Registration(contestant_id=contestant.pk, event_id=event_id))
+            # One batch of contestants makes several batches of registrations
+            for registration in Registration.objects.bulk_create(registrations, batch_size=batch_size):
+                registration_ids_by_event.setdefault(registration.event_id, []).append(registration.pk)
+            contestant_count += len(contestants)
+            registration_count += len(registrations)
+
+        results = []
+        result_number = 0
+        for event in events:
+            entries = registration_ids_by_event.get(event.pk)
+            if not entries or rng.random() >= size.published:
+                continue
+            result_number += 1
+            winners = rng.sample(entries, min(len(entries), 3))
+            for position, registration_id in enumerate(winners, start=1):
+                results.append(Result(
+                    registration_id=registration_id,
+                    position=position,
+                    points=POSITION_POINTS[position],
+                    resultNumber=f'{result_number:02d}',
+                ))
+        Result.objects.bulk_create(results, batch_size=batch_size)
+
+        GalleryImage.objects.bulk_create([
+            GalleryImage(
+                caption=f'Festival moment {i + 1}',
+                year=GALLERY_YEARS[i % len(GALLERY_YEARS)],
+                image=f'gallery_images/festival_{i + 1}.jpg',
+                image_url=f'https://res.cloudinary.com/demo/image/upload/festival_{i + 1}.jpg',
+            )
+            for i in range(size.gallery_images)
+        ], batch_size=batch_size)
+        CarouselImage.objects.bulk_create([
+            CarouselImage(
+                title=f'Highlight {i + 1}',
+                image=f'carousel_images/highlight_{i + 1}.jpg',
+                image_url=f'https://res.cloudinary.com/demo/image/upload/highlight_{i + 1}.jpg',
+                order=i,
+                is_active=i % 5 != 4,
+            )
+            for i in range(size.carousel_images)
+        ], batch_size=batch_size)
+
+    _invalidate_caches()
+
+    return {
+        'groups': len(groups),
+        'categories': len(categories),
+        'events': len(events),
+        'event_categories': len(event_categories),
+        'contestants': contestant_count,
+        'registrations': registration_count,
+        'results': len(results),
+        'gallery_images': size.gallery_images,
+        'carousel_images': size.carousel_images,
+    }
+
+
+def clear():
+    """
+    Empty every table `generate()` fills, and the result change log that
+    refers to them (and reset their id sequences), with the same SQL as
+    `manage.py flush`. Real festival data goes too!
+    """
+    models = [
+        ResultChange, Result, Registration, Contestant, Event.categories.through, Event, Category,
+        Group, GalleryImage, CarouselImage,
+    ]
+    tables = [model._meta.db_table for model in models]
+    sql_list = connection.ops.sql_flush(no_style(), tables, reset_sequences=True, allow_cascade=True)
+    connection.ops.execute_sql_flush(sql_list)
+    _invalidate_caches()
+
+
+def is_empty():
+    return not (Group.objects.exists() or Category.objects.exists() or Contestant.objects.exists())
+
+
+def _invalidate_caches():
+    # Neither bulk_create nor a flush sends signals, see api/signals.py
+    record_model_changes(*TRACKED_MODELS)
+    bump_version(
+        GALLERY_YEARS_NAMESPACE,
+        gallery_year_namespace(None),
+        *(gallery_year_namespace(year) for year in GALLERY_YEARS),
+    )
+
+
+def _numbered(names, count):
+    # Cycle through `names`, numbering the second round onwards: "Quiz", ..., "Quiz 2"
+    return [
+        names[i % len(names)] + (f' {i // len(names) + 1}' if i >= len(names) else '')
+        for i in range(count)
+    ]
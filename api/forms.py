@@ -1,8 +1,147 @@
 # In api/forms.py
 from django import forms
+from django.conf import settings
 from django.forms import formset_factory
+from django.utils.choices import BaseChoiceIterator
 from .models import Registration, Event, Contestant, Result
 
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+class MultipleFileField(forms.FileField):
+    """A file field that accepts several files and cleans to a list."""
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)] if data else []
+
+class BulkImageUploadForm(forms.Form):
+    """Upload many images (or zip archives of images) in one go."""
+    images = MultipleFileField(
+        required=False,
+        label="Images",
+        help_text="Select as many images as you like. The file name is used as the caption."
+    )
+    archives = MultipleFileField(
+        required=False,
+        label="Zip archives",
+        help_text="Optional .zip files containing images."
+    )
+
+    def clean_archives(self):
+        archives = self.cleaned_data.get('archives') or []
+        for archive in archives:
+            if not archive.name.lower().endswith('.zip'):
+                raise forms.ValidationError(f"{archive.name} is not a .zip file.")
+        return archives
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('images') and not cleaned_data.get('archives'):
+            raise forms.ValidationError("Please select at least one image or zip archive.")
+        return cleaned_data
+
+class GalleryBulkUploadForm(BulkImageUploadForm):
+    year = forms.IntegerField(label="Year", help_text="Festival year for all uploaded images")
+    duplicates = forms.ChoiceField(
+        choices=[
+            ('skip', "Skip photos that are already in the gallery"),
+            ('flag', "Upload them, but mark them as duplicates"),
+            ('allow', "Upload everything"),
+        ],
+        initial='skip',
+        label="Duplicates",
+        widget=forms.RadioSelect
+    )
+
+class CarouselBulkUploadForm(BulkImageUploadForm):
+    is_active = forms.BooleanField(required=False, initial=True, label="Show in carousel")
+
+def format_registration_label(registration):
+    """Format how contestants appear in the result selection lists"""
+    contestant = registration.contestant
+    group = contestant.group.name if contestant.group else "No group"
+    category = contestant.category.name if contestant.category else "No category"
+    return f"{contestant.full_name} ({group}) - {category}"
+
+class RegistrationChoices(BaseChoiceIterator):
+    """
+    The registrations of one event, loaded with a single query the first
+    time they are needed and shared by every picker field of a form, for
+    rendering and for validating submitted ids.
+    """
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._by_pk = None
+        self._choices = None
+
+    @property
+    def by_pk(self):
+        if self._by_pk is None:
+            self._by_pk = {str(registration.pk): registration for registration in self.queryset}
+        return self._by_pk
+
+    def __len__(self):
+        return len(self.by_pk)
+
+    def __iter__(self):
+        # Labels are formatted once, however many fields render them
+        if self._choices is None:
+            self._choices = [
+                (pk, format_registration_label(registration)) for pk, registration in self.by_pk.items()
+            ]
+        return iter(self._choices)
+
+class RegistrationSearchWidget(forms.SelectMultiple):
+    """
+    A multi-select that only renders the currently selected registrations.
+    The results page script adds a search box that looks up more
+    registrations from `search_url` as the user types.
+    """
+    def __init__(self, search_url, attrs=None):
+        attrs = {**(attrs or {}), 'data-search-url': search_url, 'class': 'registration-search', 'size': 6}
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        selected = set(str(v) for v in value)
+        all_choices = self.choices
+        self.choices = [(pk, label) for pk, label in all_choices if str(pk) in selected]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+
+class RegistrationMultipleChoiceField(forms.MultipleChoiceField):
+    """
+    Picks registrations of one event. Cleans to a list of Registration
+    objects taken from the form's shared RegistrationChoices, so no field
+    runs its own query.
+    """
+    def __init__(self, registrations, *args, **kwargs):
+        super().__init__(*args, choices=registrations, **kwargs)
+        self.registrations = registrations
+
+    def valid_value(self, value):
+        return str(value) in self.registrations.by_pk
+
+    def prepare_value(self, value):
+        # Initial data holds Registration objects
+        if isinstance(value, (list, tuple)):
+            return [getattr(v, 'pk', v) for v in value]
+        return getattr(value, 'pk', value)
+
+    def clean(self, value):
+        value = super().clean(value)
+        return [self.registrations.by_pk[str(pk)] for pk in value]
+
+    def has_changed(self, initial, data):
+        return super().has_changed(self.prepare_value(initial or []), data)
+
 class EventResultForm(forms.Form):
     result_number = forms.CharField(
         max_length=100, 
@@ -13,24 +152,33 @@ class EventResultForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         event = kwargs.pop('event', None)
+        search_url = kwargs.pop('search_url', None)
         super().__init__(*args, **kwargs)
         self.event = event
         
         if event:
-            # Get all registrations for this event
-            registrations = Registration.objects.filter(event=event).select_related(
-                'contestant', 'contestant__group', 'contestant__category'
-            ).order_by('contestant__full_name')
+            # Get all registrations for this event, loaded once for all pickers
+            self.registrations = RegistrationChoices(
+                Registration.objects.filter(event=event).select_related(
+                    'contestant', 'contestant__group', 'contestant__category'
+                ).order_by('contestant__full_name')
+            )
+
+            # Large events get a searchable picker instead of thousands of checkboxes
+            if search_url and len(self.registrations) > settings.RESULT_PICKER_SEARCH_THRESHOLD:
+                make_widget = lambda: RegistrationSearchWidget(search_url)
+            else:
+                make_widget = forms.CheckboxSelectMultiple
             
             # Create dynamic fields for each position
             for position in [1, 2, 3]:
                 # Multiple winner selection for tied positions
-                self.fields[f'winners_{position}'] = forms.ModelMultipleChoiceField(
-                    queryset=registrations,
+                self.fields[f'winners_{position}'] = RegistrationMultipleChoiceField(
+                    self.registrations,
                     required=False,
                     label=f"Position {position} Winners",
                     help_text=f"Select one or more winners for {position} position (for tied positions)",
-                    widget=forms.CheckboxSelectMultiple
+                    widget=make_widget()
                 )
                 
                 # Points for this position
@@ -42,12 +190,12 @@ class EventResultForm(forms.Form):
                 )
             
             # Add non-poster participants section
-            self.fields['non_poster_participants'] = forms.ModelMultipleChoiceField(
-                queryset=registrations,
+            self.fields['non_poster_participants'] = RegistrationMultipleChoiceField(
+                self.registrations,
                 required=False,
                 label="Non-Poster Participants",
                 help_text="Students who participated and earned points but won't appear on posters",
-                widget=forms.CheckboxSelectMultiple
+                widget=make_widget()
             )
             
             self.fields['non_poster_points'] = forms.IntegerField(
@@ -57,16 +205,6 @@ class EventResultForm(forms.Form):
                 initial=0,
                 help_text="Points to award each non-poster participant"
             )
-            
-            # Customize the display 
-            for field_name in self.fields:
-                if 'winners_' in field_name or field_name == 'non_poster_participants':
-                    self.fields[field_name].label_from_instance = self._format_contestant_display
-    
-    def _format_contestant_display(self, registration):
-        """Format how contestants appear in the selection lists"""
-        contestant = registration.contestant
-        return f"{contestant.full_name} ({contestant.group.name}) - {contestant.category.name}"
     
     def clean(self):
         cleaned_data = super().clean()
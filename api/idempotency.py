@@ -0,0 +1,107 @@
+"""
+`Idempotency-Key` support for the public write endpoints.
+
+The registration form sends a key with each POST and reuses it when it
+retries, e.g. after a mobile connection dropped before the response
+arrived. The first request with a key runs as usual and its response is
+stored in the cache for `IDEMPOTENCY_TTL` seconds; a retry with the same key
+gets that response back (marked `Idempotent-Replayed: true`) without
+inserting anything again. So a retried contestant POST answers with the
+contestant it created the first time instead of a duplicate-email 400.
+
+Keys are scoped to the client (the user, or the IP as the throttles see
+it), so one client can never replay another's response.
+
+* Reusing a key for a different request body is a client bug: `422`.
+* A retry while the first request is still running gets `409 Conflict`.
+* Client errors are stored and replayed like successes, including the ones
+  raised as exceptions (a `ValidationError` is replayed as the same 400).
+* Server errors, and exceptions DRF does not turn into a response, are not
+  stored, so the request can be retried.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+IN_PROGRESS = 'in-progress'
+
+
+def _client(request):
+    """Who sent the request: the user, or else the client IP (as the throttles see it)."""
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+def _cache_key(client, path, key):
+    return 'idempotency:' + hashlib.sha256(f'{client}\n{path}\n{key}'.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """Honor the `Idempotency-Key` header on a viewset's `create`."""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = _cache_key(_client(request), request.path, key)
+        fingerprint = _fingerprint(request)
+        # add() is atomic, so only one of several concurrent retries runs
+        if not cache.add(cache_key, {'fingerprint': fingerprint, 'status': IN_PROGRESS},
+                         settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            return self.replay(cache.get(cache_key), fingerprint)
+
+        try:
+            try:
+                response = super().create(request, *args, **kwargs)
+            except Exception as exc:
+                # Turn e.g. a ValidationError into its 400 here, so it is
+                # stored like any other response; anything DRF does not
+                # handle is raised again
+                response = self.handle_exception(exc)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, settings.IDEMPOTENCY_TTL)
+        return response
+
+    def replay(self, stored, fingerprint):
+        if stored is not None and stored['fingerprint'] != fingerprint:
+            return Response(
+                {'error': 'This Idempotency-Key was used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if stored is None or stored['status'] == IN_PROGRESS:
+            # Still running (or it just failed, and can be retried)
+            return Response(
+                {'error': 'A request with this Idempotency-Key is in progress.'},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        return Response(stored['data'], status=stored['status'], headers={REPLAYED_HEADER: 'true'})
@@ -0,0 +1,89 @@
+"""
+Resolve the public URL (and responsive size variants) for gallery and
+carousel images.
+
+This runs when an image is saved and from the `backfill_image_urls`
+management command, so the API serializers only have to read the stored
+columns instead of rebuilding URLs for every object on every request.
+"""
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOUDINARY_UPLOAD_MARKER = '/image/upload/'
+
+# Width (in px) of each responsive variant served to the frontend.
+# Cloudinary builds these on the fly from the transformation in the URL.
+IMAGE_VARIANT_WIDTHS = {
+    'thumb': 320,
+    'medium': 800,
+    'large': 1600,
+}
+
+
+def _cloud_name():
+    return (getattr(settings, 'CLOUDINARY_STORAGE', None) or {}).get('CLOUD_NAME')
+
+
+def resolve_image_url(obj):
+    """
+    Return the final public URL for an image model instance.
+
+    Uses the stored Cloudinary URL when there is one, otherwise builds the
+    Cloudinary URL from the stored file name (for images uploaded before
+    `cloudinary_url` existed), and finally falls back to the storage URL.
+    """
+    if obj.cloudinary_url:
+        return obj.cloudinary_url
+
+    if not obj.image:
+        return ''
+
+    cloud_name = _cloud_name()
+    if cloud_name:
+        # The public_id is the stored file name without its extension
+        public_id = str(obj.image.name).rsplit('.', 1)[0]
+        return f"https://res.cloudinary.com/{cloud_name}/image/upload/{public_id}"
+
+    logger.warning("No CLOUDINARY_CLOUD_NAME found for %s %s", obj._meta.model_name, obj.pk)
+    try:
+        return obj.image.url
+    except Exception as e:
+        logger.error("Error resolving URL for %s %s: %s", obj._meta.model_name, obj.pk, e)
+        return ''
+
+
+def build_variant_urls(url):
+    """
+    Return a dict of responsive variant URLs for a Cloudinary image URL.
+
+    Non-Cloudinary URLs cannot be resized on the fly, so they get no variants.
+    """
+    if not url or CLOUDINARY_UPLOAD_MARKER not in url:
+        return {}
+
+    base, public_part = url.split(CLOUDINARY_UPLOAD_MARKER, 1)
+    return {
+        name: f"{base}{CLOUDINARY_UPLOAD_MARKER}c_limit,w_{width},f_auto,q_auto/{public_part}"
+        for name, width in IMAGE_VARIANT_WIDTHS.items()
+    }
+
+
+def resolve_image_fields(obj):
+    """
+    Set `image_url` and `image_variants` on the instance.
+
+    Returns True if either value changed.
+    """
+    image_url = resolve_image_url(obj)
+    image_variants = build_variant_urls(image_url)
+    thumbnail = getattr(obj, 'thumbnail', None)
+    if not image_variants and thumbnail:
+        # Not on Cloudinary, but we have our own pre-processed thumbnail
+        image_variants = {'thumb': thumbnail.url}
+    changed = (image_url, image_variants) != (obj.image_url, obj.image_variants)
+    obj.image_url = image_url
+    obj.image_variants = image_variants
+    return changed
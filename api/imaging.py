@@ -0,0 +1,135 @@
+"""
+Pre-processing for uploaded gallery photos.
+
+Before a photo is stored and uploaded to Cloudinary it is rotated according
+to its EXIF orientation, stripped of all metadata, scaled down so its long
+edge fits `IMAGE_MAX_EDGE`, and re-encoded as WebP. A small WebP thumbnail
+and a perceptual hash (for duplicate detection, see api/dedup.py) are made
+at the same time. Bulk uploads are processed on a process pool, because the
+work is CPU bound.
+"""
+import io
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessedImage(NamedTuple):
+    name: str
+    data: bytes
+    thumbnail: Optional[bytes]
+    original_size: int
+    phash: str = ''
+
+    @property
+    def stored_size(self):
+        return len(self.data)
+
+    @property
+    def saved_bytes(self):
+        return self.original_size - self.stored_size
+
+
+def _encode_webp(image, quality):
+    buffer = io.BytesIO()
+    # No exif/icc arguments, so none of the original metadata is written
+    image.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def dhash(image, size=8):
+    """
+    Return the 64-bit difference hash of an image as 16 hex digits.
+
+    The image is shrunk to (size + 1) x size greyscale pixels and each bit
+    records whether a pixel is brighter than its right-hand neighbour, so
+    the hash survives resizing and re-compression.
+    """
+    from PIL import Image
+
+    small = image.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{size * size // 4}x}"
+
+
+def preprocess_image(data, name, max_edge, thumbnail_edge, quality):
+    """
+    Normalize one image and return a ProcessedImage.
+
+    If Pillow can't read the file (e.g. HEIC without a plugin), the original
+    bytes are returned unchanged with no thumbnail.
+    """
+    # Pillow is imported on first use, most processes never touch an image
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            processed = _encode_webp(image, quality)
+            phash = dhash(image)
+
+            image.thumbnail((thumbnail_edge, thumbnail_edge), Image.Resampling.LANCZOS)
+            thumbnail = _encode_webp(image, quality)
+    except Exception as e:
+        logger.warning("Could not pre-process %s, keeping the original: %s", name, e)
+        return ProcessedImage(name, data, None, len(data))
+
+    webp_name = os.path.splitext(os.path.basename(name))[0] + '.webp'
+    return ProcessedImage(webp_name, processed, thumbnail, len(data), phash)
+
+
+def _options():
+    from django.conf import settings
+
+    return {
+        'max_edge': settings.IMAGE_MAX_EDGE,
+        'thumbnail_edge': settings.IMAGE_THUMBNAIL_EDGE,
+        'quality': settings.IMAGE_WEBP_QUALITY,
+    }
+
+
+def preprocess_file(file):
+    """Pre-process a single (uploaded) file in the current process."""
+    file.seek(0)
+    return preprocess_image(file.read(), file.name, **_options())
+
+
+def preprocess_files(files, workers=None):
+    """
+    Pre-process many files on a process pool and yield ProcessedImages in
+    input order.
+
+    At most two images per worker are held in memory at a time, so even a
+    large zip of phone photos doesn't have to fit in RAM at once.
+
+    The workers are spawned, not forked: a fork of a threaded gunicorn
+    worker copies its locks (and open database connections) in whatever
+    state the other threads left them, and can deadlock in the child.
+    """
+    from django.conf import settings
+
+    workers = workers or settings.IMAGE_PREPROCESS_WORKERS
+    options = _options()
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for file in files:
+            pending.append(pool.submit(preprocess_image, file.read(), file.name, **options))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,120 @@
+"""
+Logging support: request-id correlation, a JSON formatter and a
+non-blocking queue handler (wired up by `LOGGING` in settings.py).
+
+Request threads only put records on a queue; a background listener thread
+formats them and writes them to stdout, so slow log I/O never holds up a
+response. Every record carries the id of the request it was logged in,
+taken from an incoming `X-Request-ID` header or generated, and echoed back
+in the response.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+request_id = contextvars.ContextVar('request_id', default='-')
+
+# Accept ids set by a proxy/load balancer, but only reasonably sized, plain ones
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdFilter(logging.Filter):
+    """Add the current request's id to every record as `request_id`."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log pipelines that parse structure."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Queue records and write them to a stream from a background thread.
+
+    Formatters set on this handler (e.g. by dictConfig) are used by the
+    writing thread, so formatting doesn't happen on the request thread
+    either.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self._stream_handler = logging.StreamHandler(stream or sys.stdout)
+        self._listener = QueueListener(self.queue, self._stream_handler, respect_handler_level=False)
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+    def setFormatter(self, fmt):
+        self._stream_handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (the arguments may change
+        # later), but leave the formatting to the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestIdMiddleware:
+    """Bind a request id to everything logged while handling a request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        current, token = self.bind(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response['X-Request-ID'] = current
+        return response
+
+    async def __acall__(self, request):
+        current, token = self.bind(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response['X-Request-ID'] = current
+        return response
+
+    def bind(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        current = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        request.request_id = current
+        return current, request_id.set(current)
@@ -0,0 +1,71 @@
+# In api/management/commands/backfill_image_urls.py
+
+from django.core.management.base import BaseCommand
+
+from api.caching import bump_version
+from api.image_urls import resolve_image_fields
+from api.models import GalleryImage, CarouselImage
+from api.signals import gallery_year_namespace, record_model_changes
+
+MODELS = {
+    'gallery': GalleryImage,
+    'carousel': CarouselImage,
+}
+
+class Command(BaseCommand):
+    help = (
+        'Resolves and stores the public URL and size-variant URLs for gallery '
+        'and carousel images. Only unresolved images are processed, so an '
+        'interrupted run can simply be started again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Only backfill this model (can be repeated). Defaults to all.')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Skip images with an id up to and including this one.')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-resolve images that already have a stored URL.')
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS):
+            self._backfill(MODELS[name], options)
+
+    def _backfill(self, model, options):
+        batch_size = options['batch_size']
+        queryset = model.objects.filter(pk__gt=options['start_after']).order_by('pk')
+        if not options['force']:
+            queryset = queryset.filter(image_url='')
+
+        total = queryset.count()
+        label = model._meta.verbose_name_plural
+        self.stdout.write(f'Backfilling {total} {label}...')
+
+        done = updated = 0
+        last_pk = options['start_after']
+        while done < total:
+            # Page by primary key so rows updated by this run are never skipped
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+
+            changed = [obj for obj in batch if resolve_image_fields(obj)]
+            if changed:
+                model.objects.bulk_update(changed, ['image_url', 'image_variants'])
+                self._invalidate_caches(model, changed)
+
+            done += len(batch)
+            updated += len(changed)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'  {done}/{total} processed, {updated} updated (last id {last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(f'Finished {label}: {updated} updated.'))
+
+    @staticmethod
+    def _invalidate_caches(model, changed):
+        # bulk_update sends no signals, see api/signals.py
+        record_model_changes(model)
+        if model is GalleryImage:
+            years = {obj.year for obj in changed}
+            bump_version(gallery_year_namespace(None), *(gallery_year_namespace(year) for year in years))
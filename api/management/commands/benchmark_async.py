@@ -0,0 +1,95 @@
+# In api/management/commands/benchmark_async.py
+
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Regular URL and its async variant (see api/async_views.py)
+ENDPOINTS = {
+    'ping': ('/api/ping/', '/api/async/ping/'),
+    'points': ('/api/points/', '/api/async/points/'),
+    'gallery': ('/api/gallery/', '/api/async/gallery/'),
+}
+
+class Command(BaseCommand):
+    help = (
+        'Measures throughput and latency of the regular (sync) and async '
+        'endpoints under concurrent load, against a running server. Run it '
+        'once against a WSGI and once against an ASGI (start_asgi.sh) server '
+        'to compare the two deployments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append',
+                            help='Endpoint to benchmark (can be repeated). Defaults to all.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--event', type=int,
+                            help='Also benchmark poster generation for this event id (uploads to Cloudinary!).')
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError('benchmark_async needs httpx (pip install httpx).')
+
+        targets = {name: ENDPOINTS[name] for name in options['endpoint'] or sorted(ENDPOINTS)}
+        if options['event']:
+            event_id = options['event']
+            targets['posters'] = (
+                f'/api/generate-event-posters/{event_id}/',
+                f'/api/async/generate-event-posters/{event_id}/',
+            )
+
+        self.stdout.write(
+            f"{options['requests']} requests per endpoint, concurrency {options['concurrency']}, "
+            f"against {options['base_url']}"
+        )
+        self.stdout.write(f"{'endpoint':<12}{'path':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, paths in targets.items():
+            for label, path in zip(('sync', 'async'), paths):
+                stats = asyncio.run(self._run(
+                    httpx, options['base_url'] + path, options['requests'], options['concurrency']
+                ))
+                self.stdout.write(
+                    f"{name:<12}{label:<10}{stats['rps']:>10.1f}{stats['p50']:>10.1f}"
+                    f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['errors']:>8}"
+                )
+
+    async def _run(self, httpx, url, total, concurrency):
+        latencies = []
+        errors = 0
+        remaining = iter(range(total))
+
+        async def worker(client):
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0
+
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'errors': errors,
+        }
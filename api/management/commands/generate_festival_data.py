@@ -0,0 +1,72 @@
+# In api/management/commands/generate_festival_data.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.festival_data import FestivalSize, clear, generate, is_empty
+
+defaults = FestivalSize()
+
+class Command(BaseCommand):
+    help = (
+        'Fills the database with a synthetic festival: groups, categories, '
+        'events, contestants, registrations, results and gallery/carousel '
+        'rows. The same --seed and sizes always produce the same data. Use it '
+        'to reproduce N+1 queries and slow pages locally, e.g. with '
+        '--contestants 100000 --events 600.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--groups', type=int, default=defaults.groups)
+        parser.add_argument('--categories', type=int, default=defaults.categories)
+        parser.add_argument('--events', type=int, default=defaults.events)
+        parser.add_argument('--contestants', type=int, default=defaults.contestants)
+        parser.add_argument('--events-per-contestant', type=int, default=defaults.events_per_contestant)
+        parser.add_argument('--published', type=float, default=defaults.published,
+                            help='Share of events with published results (0-1).')
+        parser.add_argument('--gallery-images', type=int, default=defaults.gallery_images)
+        parser.add_argument('--carousel-images', type=int, default=defaults.carousel_images)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete all festival data (groups, events, contestants, results, '
+                                 'gallery...) first.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation before --clear.')
+
+    def handle(self, *args, **options):
+        if options['groups'] < 1 or options['categories'] < 1 or options['events'] < 1:
+            raise CommandError('At least one group, category and event is needed.')
+        if not 0 <= options['published'] <= 1:
+            raise CommandError('--published must be between 0 and 1.')
+
+        if options['clear']:
+            if options['interactive']:
+                answer = input(
+                    'This deletes ALL groups, categories, events, contestants, registrations, '
+                    'results, gallery and carousel images. Type "yes" to continue: '
+                )
+                if answer != 'yes':
+                    raise CommandError('Cancelled.')
+            clear()
+        elif not is_empty():
+            raise CommandError('The database already has festival data; run with --clear to replace it.')
+
+        size = FestivalSize(
+            groups=options['groups'],
+            categories=options['categories'],
+            events=options['events'],
+            contestants=options['contestants'],
+            events_per_contestant=options['events_per_contestant'],
+            published=options['published'],
+            gallery_images=options['gallery_images'],
+            carousel_images=options['carousel_images'],
+        )
+        started = time.perf_counter()
+        counts = generate(size, seed=options['seed'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name:<20}{count:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Generated the festival (seed {options['seed']}) in {elapsed:.1f}s."))
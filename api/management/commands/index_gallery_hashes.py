@@ -0,0 +1,71 @@
+# In api/management/commands/index_gallery_hashes.py
+
+import io
+import urllib.request
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from api.caching import bump_version
+from api.dedup import REHASH_NAMESPACE, gallery_hash_index
+from api.imaging import dhash
+from api.models import GalleryImage
+
+class Command(BaseCommand):
+    help = (
+        'Computes the perceptual hash of gallery images that were uploaded '
+        'before duplicate detection existed, and optionally flags duplicates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flag-duplicates', action='store_true',
+                            help='Set duplicate_of on images that look like an earlier one.')
+
+    def handle(self, *args, **options):
+        queryset = GalleryImage.objects.filter(phash='').order_by('pk')
+        total = queryset.count()
+        self.stdout.write(f'Hashing {total} gallery images...')
+
+        hashed = failed = 0
+        for obj in queryset.iterator():
+            try:
+                with Image.open(io.BytesIO(self._read(obj))) as image:
+                    obj.phash = dhash(ImageOps.exif_transpose(image))
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'  #{obj.pk} {obj.caption}: {e}'))
+                continue
+            GalleryImage.objects.filter(pk=obj.pk).update(phash=obj.phash)
+            hashed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{hashed} hashed, {failed} failed.'))
+        if hashed:
+            # Updated without signals: have every process load the new hashes
+            bump_version(REHASH_NAMESPACE)
+
+        if options['flag_duplicates']:
+            self._flag_duplicates()
+
+    def _read(self, obj):
+        """Read the image from storage, or from its public URL if the local file is gone."""
+        try:
+            with obj.image.open('rb') as f:
+                return f.read()
+        except Exception:
+            url = obj.image_url or obj.cloudinary_url
+            if not url or not url.startswith('http'):
+                raise
+            with urllib.request.urlopen(url, timeout=30) as response:
+                return response.read()
+
+    def _flag_duplicates(self):
+        gallery_hash_index.refresh()
+        flagged = 0
+        rows = GalleryImage.objects.exclude(phash='').filter(duplicate_of__isnull=True).order_by('pk')
+        for pk, phash in rows.values_list('pk', 'phash'):
+            # Only point at older images, so the first copy stays the original
+            earlier = [match for match in gallery_hash_index.find(phash, exclude_pk=pk) if match < pk]
+            if earlier:
+                GalleryImage.objects.filter(pk=pk).update(duplicate_of_id=earlier[0])
+                flagged += 1
+        self.stdout.write(self.style.SUCCESS(f'{flagged} duplicates flagged.'))
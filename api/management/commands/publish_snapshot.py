@@ -0,0 +1,22 @@
+# In api/management/commands/publish_snapshot.py
+
+from django.core.management.base import BaseCommand
+
+from api.snapshots import publish_snapshot
+
+class Command(BaseCommand):
+    help = (
+        'Publishes a versioned static JSON snapshot of the points table, all '
+        'results and the winners of each event to SNAPSHOT_STORAGE, so the '
+        'public pages can be served without hitting the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int,
+                            help='Number of snapshot versions to keep (default: SNAPSHOT_KEEP).')
+
+    def handle(self, *args, **options):
+        manifest = publish_snapshot(keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Published snapshot {manifest['version']} ({len(manifest['files'])} files)."
+        ))
@@ -0,0 +1,275 @@
+# In api/management/commands/run_benchmarks.py
+
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+
+from api.festival_data import FestivalSize, generate
+from api.models import Category, Contestant, Event, Result
+from api.posters import POSTER_TEMPLATES, load_poster_data, render_poster
+from api.snapshots import build_snapshot
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'local': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the in-process benchmark suite: every public API endpoint, '
+        'poster rendering and the exports, against a throwaway test database '
+        'filled with a synthetic festival (see api/festival_data.py). Writes '
+        'machine-readable results with --output and compares them with an '
+        'earlier run with --compare. For load against a running server use '
+        'locustfile.py instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed runs per scenario.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed runs per scenario first.')
+        parser.add_argument('--scenario', action='append',
+                            help='Only run scenarios whose name starts with this (can be repeated).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--contestants', type=int, default=FestivalSize.contestants)
+        parser.add_argument('--events', type=int, default=FestivalSize.events)
+        parser.add_argument('--groups', type=int, default=FestivalSize.groups)
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Run with a dummy cache, to measure the uncached code paths.')
+        parser.add_argument('--use-existing', action='store_true',
+                            help="Benchmark the configured database as it is, instead of a "
+                                 "generated festival in a test database (read-only scenarios only).")
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='Compare with the JSON results of an earlier run.')
+        parser.add_argument('--max-regression', type=float,
+                            help='With --compare, fail if a p50 got slower by more than this many percent.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        setup_test_environment()
+        old_config = None
+        try:
+            if options['use_existing']:
+                data = None
+            else:
+                old_config = setup_databases(verbosity=0, interactive=False)
+                size = FestivalSize(
+                    groups=options['groups'], events=options['events'], contestants=options['contestants'],
+                )
+                started = time.perf_counter()
+                data = generate(size, seed=options['seed'])
+                self.stdout.write(
+                    f"Generated {data['contestants']} contestants, {data['registrations']} registrations "
+                    f"and {data['results']} results in {time.perf_counter() - started:.1f}s"
+                )
+
+            caches = override_settings(CACHES=NO_CACHE) if options['no_cache'] else override_settings()
+            with caches:
+                scenarios = self.select(self.scenarios(write=not options['use_existing']), options['scenario'])
+                results = {
+                    name: self.measure(run, options['warmup'], options['iterations'])
+                    for name, run in scenarios.items()
+                }
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': self.meta(options, data),
+            'scenarios': results,
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if baseline:
+            self.compare(baseline, report, options['max_regression'])
+
+    def scenarios(self, write=True):
+        """`{name: callable}`; each call does one request and returns the response size."""
+        client = Client()
+
+        def get(path):
+            def run():
+                response = client.get(path)
+                if response.status_code >= 400:
+                    raise CommandError(f'GET {path} returned {response.status_code}')
+                return len(response.content)
+            return run
+
+        category = Category.objects.order_by('pk').first()
+        event = Event.objects.filter(pk__in=Result.objects.values('registration__event')).order_by('pk').first()
+        scenarios = {
+            'api.categories': get('/api/categories/'),
+            'api.groups': get('/api/groups/'),
+            'api.events': get('/api/events/'),
+            'api.results': get('/api/results/'),
+            'api.points': get('/api/points/'),
+            'api.points.breakdown': get('/api/points/breakdown/'),
+            'api.changes': get('/api/changes/'),
+            'api.gallery': get('/api/gallery/'),
+            'api.gallery.years': get('/api/gallery/years/'),
+            'api.carousel': get('/api/carousel/'),
+            'api.contestants': get('/api/contestants/'),
+            'api.registrations': get('/api/registrations/'),
+            'api.ping': get('/api/ping/'),
+            'async.points': get('/api/async/points/'),
+            'async.gallery': get('/api/async/gallery/'),
+            'export.winners': get('/api/export-winners/'),
+            'export.snapshot': lambda: len(json.dumps(build_snapshot())),
+        }
+        if category:
+            scenarios['api.events-for-registration'] = get(f'/api/events-for-registration/{category.pk}/')
+        if event:
+            scenarios['api.event'] = get(f'/api/events/{event.pk}/')
+            scenarios['api.event.results'] = get(f'/api/events/{event.pk}/results/')
+            number = Result.objects.filter(registration__event=event).values_list('resultNumber', flat=True).first()
+            if number:
+                scenarios['api.results.by-number'] = get(f'/api/results/by-number/{number}/')
+            scenarios['export.event-winners'] = get(f'/api/export-winners/{event.pk}/')
+            for template_name in POSTER_TEMPLATES:
+                scenarios[f'posters.render.{template_name}'] = self.render_poster(event.pk, template_name)
+        if write:
+            # Last, it changes the data the cached scenarios read
+            scenarios['api.contestants.create'] = self.create_contestant(client, category)
+        return scenarios
+
+    @staticmethod
+    def select(scenarios, prefixes):
+        if not prefixes:
+            return scenarios
+        selected = {name: run for name, run in scenarios.items() if name.startswith(tuple(prefixes))}
+        if not selected:
+            raise CommandError(f"No scenario matches {', '.join(prefixes)}; choose from {', '.join(scenarios)}")
+        return selected
+
+    @staticmethod
+    def render_poster(event_id, template_name):
+        def run():
+            # Drawing only, nothing is uploaded
+            png = render_poster(template_name, load_poster_data(event_id))
+            return len(png or b'')
+        return run
+
+    @staticmethod
+    def create_contestant(client, category):
+        counter = itertools.count()
+        group_id = Contestant.objects.values_list('group_id', flat=True).first()
+
+        def run():
+            number = next(counter)
+            # Every registration comes from another visitor, as in a real
+            # burst, so the per-client throttle doesn't cut the run short
+            response = client.post('/api/contestants/', {
+                'full_name': 'Benchmark Contestant',
+                'email': f'benchmark{number}@festival.test',
+                'state': 'Kerala',
+                'gender': 'Female',
+                'group': group_id,
+                'category': category.pk if category else '',
+                'course': 'BA English',
+                'phone_number': '9000000000',
+            }, REMOTE_ADDR=f'10.0.{number // 256 % 256}.{number % 256}')
+            if response.status_code != 201:
+                raise CommandError(f'POST /api/contestants/ returned {response.status_code}: {response.content[:200]}')
+            return len(response.content)
+        return run
+
+    @staticmethod
+    def measure(run, warmup, iterations):
+        for _ in range(warmup):
+            run()
+        durations = []
+        queries = []
+        size = 0
+
+        def count_query(execute, *args):
+            queries[-1] += 1
+            return execute(*args)
+
+        for _ in range(iterations):
+            queries.append(0)
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                size = run()
+                durations.append((time.perf_counter() - start) * 1000)
+        durations.sort()
+        return {
+            'iterations': iterations,
+            'p50_ms': round(percentile(durations, 0.50), 3),
+            'p95_ms': round(percentile(durations, 0.95), 3),
+            'p99_ms': round(percentile(durations, 0.99), 3),
+            'mean_ms': round(statistics.fmean(durations), 3),
+            'queries': max(queries),
+            'bytes': size,
+        }
+
+    @staticmethod
+    def meta(options, data):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'database': connection.vendor,
+            'cache': 'off' if options['no_cache'] else settings.CACHES['default']['BACKEND'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': None if options['use_existing'] else options['seed'],
+            'data': data,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(f"{'scenario':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'bytes':>10}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<36}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['queries']:>9}{stats['bytes']:>10}"
+            )
+
+    def compare(self, baseline, report, max_regression):
+        self.stdout.write(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+        self.stdout.write(f"{'scenario':<36}{'p50 before':>12}{'p50 now':>10}{'change':>9}{'queries':>12}")
+        regressions = []
+        for name, now in report['scenarios'].items():
+            before = baseline['scenarios'].get(name)
+            if before is None:
+                continue
+            change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f"{name:<36}{before['p50_ms']:>12.2f}{now['p50_ms']:>10.2f}{change:>+8.1f}%"
+                f"{before['queries']:>6} -> {now['queries']:<4}"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(f'{name} ({change:+.1f}%)')
+        if regressions:
+            raise CommandError(f"Slower than the baseline by more than {max_regression}%: {', '.join(regressions)}")
@@ -0,0 +1,102 @@
+# In api/management/commands/upload_images.py
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import GalleryImage, CarouselImage
+from api.uploads import (
+    IMAGE_EXTENSIONS, build_instances, caption_from_filename, iter_image_files, upload_pending,
+)
+
+MODELS = {
+    'gallery': GalleryImage,
+    'carousel': CarouselImage,
+}
+
+class Command(BaseCommand):
+    help = (
+        'Bulk uploads images (files, directories or zip archives) as gallery or '
+        'carousel images, sending them to Cloudinary with a pool of workers. '
+        'Use --pending to retry images whose earlier upload failed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Image files, directories of images, or .zip archives.')
+        parser.add_argument('--model', choices=sorted(MODELS), default='gallery')
+        parser.add_argument('--year', type=int, help='Festival year (required for gallery images).')
+        parser.add_argument('--inactive', action='store_true', help='Hide new carousel images.')
+        parser.add_argument('--workers', type=int, help='Concurrent uploads (default: UPLOAD_WORKERS).')
+        parser.add_argument('--retries', type=int, help='Attempts per image (default: UPLOAD_RETRIES).')
+        parser.add_argument('--no-preprocess', action='store_true',
+                            help='Store gallery images as they are, without resizing/re-encoding.')
+        parser.add_argument('--duplicates', choices=['skip', 'flag', 'allow'], default='skip',
+                            help='What to do with photos already in the gallery (default: skip).')
+        parser.add_argument('--pending', action='store_true',
+                            help='Also upload every existing image that has no Cloudinary URL yet.')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        if not options['paths'] and not options['pending']:
+            raise CommandError('Give some paths to upload, or --pending.')
+        if options['paths'] and model is GalleryImage and options['year'] is None:
+            raise CommandError('--year is required for gallery images.')
+
+        pks = self._store_files(model, options) if options['paths'] else []
+        if options['pending']:
+            pks = None  # everything without a Cloudinary URL, including the new files
+
+        self.stdout.write('Uploading to Cloudinary...')
+        succeeded, failed = upload_pending(model, pks, options['workers'], options['retries'])
+        self.stdout.write(self.style.SUCCESS(f'{len(succeeded)} images uploaded.'))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'{len(failed)} images failed (ids {sorted(failed)}). '
+                f'Run again with --pending to retry them.'
+            ))
+
+    def _store_files(self, model, options):
+        files, archives = [], []
+        for path in options['paths']:
+            if os.path.isdir(path):
+                files.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if name.lower().endswith(IMAGE_EXTENSIONS)
+                )
+            elif path.lower().endswith('.zip'):
+                archives.append(path)
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f'{path} does not exist.')
+
+        pks = []
+        for path in files:
+            with open(path, 'rb') as handle:
+                pks.extend(self._store(model, iter_image_files([handle]), options))
+        pks.extend(self._store(model, iter_image_files(archives=archives), options))
+        return pks
+
+    def _store(self, model, image_files, options):
+        # Gallery photos are resized, stripped and re-encoded first (api/imaging.py)
+        preprocess = model is GalleryImage and not options['no_preprocess']
+        build = lambda name: self._build_instance(model, name, options)
+        pks, skipped = [], []
+        for obj in build_instances(image_files, build, preprocess, options['duplicates'], skipped):
+            obj.save(defer_upload=True)
+            pks.append(obj.pk)
+            message = f'  Stored {obj.image.name}'
+            if getattr(obj, 'original_size', None):
+                message += f' ({obj.original_size // 1024} KB -> {obj.stored_size // 1024} KB)'
+            if getattr(obj, 'duplicate_of_id', None):
+                message += f' [duplicate of #{obj.duplicate_of_id}]'
+            self.stdout.write(message)
+        for name in skipped:
+            self.stdout.write(self.style.WARNING(f'  Skipped {name} (already in the gallery)'))
+        return pks
+
+    def _build_instance(self, model, name, options):
+        caption = caption_from_filename(name)
+        if model is GalleryImage:
+            return GalleryImage(caption=caption, year=options['year'])
+        return CarouselImage(title=caption, is_active=not options['inactive'])
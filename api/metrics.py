@@ -0,0 +1,253 @@
+"""
+Per-request performance metrics for the API.
+
+`MetricsMiddleware` times every `/api/` request: wall time, number and
+duration of database queries, and time spent in serializers (reported by
+`TimedSerializerMixin`, see api/serializers.py). The numbers are sent back
+in a `Server-Timing` header, so they show up in the browser's network tab,
+and aggregated per route in memory for the admin-only `/api/metrics/`
+endpoint. Aggregates are per worker process and reset on restart.
+
+With `PROFILE_SAMPLE_RATE` above zero a sample of requests also runs under
+cProfile, and the profiles of the slowest ones are written to `PROFILE_DIR`
+(open them with `python -m pstats` or snakeviz). Requests served on the
+async path (ASGI) are timed but never profiled: cProfile follows one
+thread, not one request on an event loop.
+"""
+import contextlib
+import contextvars
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+NAMED_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serialize_time', '_serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self._serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextlib.contextmanager
+def serializer_timer():
+    """Add the time spent in the block to the current request's serializer time."""
+    metrics = _current.get()
+    # Nested serializers are already inside the outer one's time
+    if metrics is None or metrics._serializing:
+        yield
+        return
+    metrics._serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - start
+        metrics._serializing = False
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class RouteStats:
+    """The most recent `METRICS_SAMPLES` timings of one route."""
+
+    def __init__(self, samples):
+        self.count = 0
+        self.errors = 0
+        self.durations = deque(maxlen=samples)
+        self.db_times = deque(maxlen=samples)
+        self.queries = deque(maxlen=samples)
+        self.serialize_times = deque(maxlen=samples)
+
+    def add(self, duration, metrics, status_code):
+        self.count += 1
+        if status_code >= 500:
+            self.errors += 1
+        self.durations.append(duration)
+        self.db_times.append(metrics.db_time)
+        self.queries.append(metrics.queries)
+        self.serialize_times.append(metrics.serialize_time)
+
+    def summary(self):
+        def ms(values):
+            ordered = sorted(values)
+            return {
+                'p50': round(percentile(ordered, 0.50) * 1000, 2),
+                'p95': round(percentile(ordered, 0.95) * 1000, 2),
+                'p99': round(percentile(ordered, 0.99) * 1000, 2),
+            }
+
+        queries = sorted(self.queries)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'samples': len(self.durations),
+            'duration_ms': ms(self.durations),
+            'db_ms': ms(self.db_times),
+            'serialize_ms': ms(self.serialize_times),
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2) if queries else 0,
+                'p95': percentile(queries, 0.95),
+                'max': queries[-1] if queries else 0,
+            },
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: RouteStats(settings.METRICS_SAMPLES))
+        self.started = time.time()
+
+    def record(self, route, duration, metrics, status_code):
+        with self._lock:
+            self._routes[route].add(duration, metrics, status_code)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: stats.summary() for route, stats in self._routes.items()}
+        return {'pid': os.getpid(), 'since': self.started, 'routes': routes}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.started = time.time()
+
+
+registry = MetricsRegistry()
+
+_profile_lock = threading.Lock()
+
+
+def _route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    # Router URLs are regexes, e.g. "events/(?P<pk>[^/.]+)/$" -> "events/<pk>/"
+    route = NAMED_GROUP.sub(r'<\1>', match.route).replace('^', '').replace('$', '')
+    return f"{request.method} /{route}"
+
+
+def _save_profile(profiler, request, duration):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    route = re.sub(r'[^A-Za-z0-9]+', '_', _route_name(request)).strip('_')
+    name = f"{int(duration * 1000):07d}ms-{route}-{getattr(request, 'request_id', 'x')}.prof"
+    profiler.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+
+    # Only the slowest profiles are kept (the names sort by duration)
+    profiles = sorted(f for f in os.listdir(settings.PROFILE_DIR) if f.endswith('.prof'))
+    for old in profiles[:-settings.PROFILE_KEEP]:
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(settings.PROFILE_DIR, old))
+
+
+class MetricsMiddleware:
+    """Measure `/api/` requests; see the module docstring."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+
+        profiler = None
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            # One profile at a time, a profiler can't nest
+            if _profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                self.wrap_queries(stack, metrics)
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+            if profiler:
+                try:
+                    if duration * 1000 >= settings.PROFILE_SLOW_MS:
+                        _save_profile(profiler, request, duration)
+                finally:
+                    _profile_lock.release()
+
+        return self.finish(request, response, metrics, duration)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED or not request.path.startswith('/api/'):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                # Database connections (and their execute wrappers) are per
+                # thread: install the wrappers in the thread that runs this
+                # request's sync code and ORM queries, and remove them there
+                await sync_to_async(self.wrap_queries)(stack, metrics)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+
+        return self.finish(request, response, metrics, duration)
+
+    def wrap_queries(self, stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def finish(self, request, response, metrics, duration):
+        registry.record(_route_name(request), duration, metrics, response.status_code)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ])
+        return response
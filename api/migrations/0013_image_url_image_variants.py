@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_change_result_registration_to_foreignkey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carouselimage',
+            name='image_url',
+            field=models.CharField(blank=True, default='', help_text='Resolved public URL served by the API', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='carouselimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Responsive size-variant URLs, keyed by size name'),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='image_url',
+            field=models.CharField(blank=True, default='', help_text='Resolved public URL served by the API', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Responsive size-variant URLs, keyed by size name'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_image_url_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='galleryimage',
+            index=models.Index(fields=['year', '-uploaded_at'], name='gallery_year_uploaded_idx'),
+        ),
+    ]
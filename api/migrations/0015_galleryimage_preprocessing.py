@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_galleryimage_year_uploaded_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryimage',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Size in bytes of the file as uploaded', null=True),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='stored_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Size in bytes after pre-processing', null=True),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='gallery_images/thumbnails/'),
+        ),
+    ]
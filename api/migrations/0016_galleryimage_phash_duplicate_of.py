@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_galleryimage_preprocessing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryimage',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='An earlier image this one looks like a copy of', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='api.galleryimage'),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='phash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Perceptual hash (dHash) used to spot duplicates', max_length=16),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_galleryimage_phash_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carouselimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'uploaded_at'], name='carousel_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['name'], name='event_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryimage',
+            index=models.Index(fields=['-uploaded_at'], name='gallery_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['registration', 'position', 'display_order'], name='result_reg_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['position', 'display_order'], name='result_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['resultNumber'], name='result_number_idx'),
+        ),
+    ]
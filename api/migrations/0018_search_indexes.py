@@ -0,0 +1,76 @@
+# Substring search indexes, see api/search.py. They depend on the database
+# (pg_trgm on Postgres, FTS5 on SQLite), so they are created with SQL here
+# rather than declared on the models.
+#
+# On SQLite, Django applies some field changes by rebuilding the table, which
+# drops the triggers: a later migration that alters api_contestant there has
+# to run drop_search_indexes/create_search_indexes again.
+
+from django.db import migrations
+
+POSTGRES_INDEXES = {
+    'contestant_name_trgm_idx': ('api_contestant', 'full_name'),
+    'contestant_email_trgm_idx': ('api_contestant', 'email'),
+    'event_name_trgm_idx': ('api_event', 'name'),
+}
+
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE api_contestant_fts USING fts5(
+        full_name, email, content='api_contestant', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER api_contestant_fts_insert AFTER INSERT ON api_contestant BEGIN
+        INSERT INTO api_contestant_fts(rowid, full_name, email) VALUES (new.id, new.full_name, new.email);
+    END""",
+    """CREATE TRIGGER api_contestant_fts_delete AFTER DELETE ON api_contestant BEGIN
+        INSERT INTO api_contestant_fts(api_contestant_fts, rowid, full_name, email)
+        VALUES ('delete', old.id, old.full_name, old.email);
+    END""",
+    """CREATE TRIGGER api_contestant_fts_update AFTER UPDATE OF full_name, email ON api_contestant BEGIN
+        INSERT INTO api_contestant_fts(api_contestant_fts, rowid, full_name, email)
+        VALUES ('delete', old.id, old.full_name, old.email);
+        INSERT INTO api_contestant_fts(rowid, full_name, email) VALUES (new.id, new.full_name, new.email);
+    END""",
+    "INSERT INTO api_contestant_fts(api_contestant_fts) VALUES ('rebuild')",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, (table, column) in POSTGRES_INDEXES.items():
+            # The same expression Django's icontains filters on
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            has_fts5 = cursor.fetchone()[0]
+        # The trigram tokenizer is new in SQLite 3.34; without it search falls back to icontains
+        if not has_fts5 or connection.Database.sqlite_version_info < (3, 34):
+            return
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for name in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    elif connection.vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS api_contestant_fts_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS api_contestant_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_number', models.CharField(blank=True, max_length=100, null=True)),
+                ('points_delta', models.JSONField(blank=True, default=list, help_text="How the publication changed each group's points: [{'group_id', 'group_name', 'delta'}]")),
+                ('published_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_changes', to='api.event')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -1,7 +1,16 @@
 
-from django.db import models
+import logging
+import uuid
+
+from django.db import models, transaction
+from django.core.files.base import ContentFile
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .image_urls import resolve_image_fields
+from .uploads import upload_model_image
+
+logger = logging.getLogger(__name__)
+
 class Group(models.Model):
     """Represents a School, like 'School of Management'."""
     name = models.CharField(max_length=100, unique=True)
@@ -23,6 +32,12 @@ class Event(models.Model):
     name = models.CharField(max_length=100)
     categories = models.ManyToManyField(Category, related_name='events')
 
+    class Meta:
+        indexes = [
+            # Import lookups by name, and results/exports ordered by event name
+            models.Index(fields=['name'], name='event_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -81,51 +96,101 @@ class Result(models.Model):
     class Meta:
         verbose_name = "Published Result"
         verbose_name_plural = "Published Results"
+        indexes = [
+            # An event's results in poster order (position, then ties by display_order)
+            models.Index(fields=['registration', 'position', 'display_order'], name='result_reg_position_idx'),
+            # Winners (positions 1-3) across all events, for exports and snapshots
+            models.Index(fields=['position', 'display_order'], name='result_position_idx'),
+            # Admin filter and lookups by result number
+            models.Index(fields=['resultNumber'], name='result_number_idx'),
+        ]
 
     def __str__(self):
         return f"{self.registration} - {self.position} Place"
 
+class ResultChange(models.Model):
+    """
+    One publication of an event's results, in the change log behind
+    /api/changes/ (see api/changes.py). The id is the sequence number
+    clients sync from.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='result_changes')
+    result_number = models.CharField(max_length=100, blank=True, null=True)
+    points_delta = models.JSONField(
+        default=list, blank=True,
+        help_text="How the publication changed each group's points: [{'group_id', 'group_name', 'delta'}]"
+    )
+    published_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.event}"
+
 class GalleryImage(models.Model):
     caption = models.CharField(max_length=255)
     year = models.IntegerField()
     image = models.ImageField(upload_to='gallery_images/')
     cloudinary_url = models.URLField(blank=True, null=True)
+    image_url = models.CharField(max_length=500, blank=True, default='', help_text="Resolved public URL served by the API")
+    image_variants = models.JSONField(blank=True, default=dict, help_text="Responsive size-variant URLs, keyed by size name")
+    thumbnail = models.ImageField(upload_to='gallery_images/thumbnails/', blank=True)
+    original_size = models.PositiveIntegerField(null=True, blank=True, help_text="Size in bytes of the file as uploaded")
+    stored_size = models.PositiveIntegerField(null=True, blank=True, help_text="Size in bytes after pre-processing")
+    phash = models.CharField(max_length=16, blank=True, default='', db_index=True, help_text="Perceptual hash (dHash) used to spot duplicates")
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates',
+        help_text="An earlier image this one looks like a copy of"
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        # If image is provided and cloudinary_url is not set, upload to Cloudinary
-        if self.image and not self.cloudinary_url:
+    class Meta:
+        indexes = [
+            # Matches the gallery listing: filter by year, newest first
+            models.Index(fields=['year', '-uploaded_at'], name='gallery_year_uploaded_idx'),
+            # All years, newest first
+            models.Index(fields=['-uploaded_at'], name='gallery_uploaded_idx'),
+        ]
+
+    cloudinary_folder = "gallery_images"
+
+    def build_public_id(self):
+        # Create a unique public_id to avoid conflicts
+        unique_id = str(uuid.uuid4())[:8]
+        safe_caption = ''.join(c for c in self.caption if c.isalnum() or c in '-_')[:20]
+        return f"gallery_{self.year}_{safe_caption}_{unique_id}"
+
+    def apply_processed_image(self, processed):
+        """Use a pre-processed image (see api/imaging.py) as this image's file."""
+        self.image = ContentFile(processed.data, name=processed.name)
+        if processed.thumbnail:
+            self.thumbnail = ContentFile(processed.thumbnail, name=processed.name)
+        self.original_size = processed.original_size
+        self.stored_size = processed.stored_size
+        self.phash = processed.phash
+
+    def save(self, *args, defer_upload=False, **kwargs):
+        # If image is provided and cloudinary_url is not set, upload to Cloudinary.
+        # With defer_upload=True the caller queues the upload instead (see api/uploads.py).
+        if self.image and not self.cloudinary_url and not defer_upload:
             try:
-                import cloudinary.uploader
-                import uuid
-                
-                # Read the image data
-                self.image.seek(0)
-                image_data = self.image.read()
-                
-                # Create a unique public_id to avoid conflicts
-                unique_id = str(uuid.uuid4())[:8]
-                safe_caption = ''.join(c for c in self.caption if c.isalnum() or c in '-_')[:20]
-                
-                # Upload to Cloudinary (same method as poster generation)
-                upload_result = cloudinary.uploader.upload(
-                    image_data,
-                    folder="gallery_images",
-                    public_id=f"gallery_{self.year}_{safe_caption}_{unique_id}",
-                    overwrite=True
-                )
-                
-                # Store the Cloudinary URL
-                self.cloudinary_url = upload_result.get('secure_url')
-                
-                # Reset the image field position
-                self.image.seek(0)
-                
+                self.cloudinary_url = upload_model_image(self)
             except Exception as e:
-                print(f"Error uploading to Cloudinary: {e}")
+                logger.warning("Error uploading gallery image to Cloudinary: %s", e)
                 # Continue saving even if Cloudinary upload fails
         
-        super().save(*args, **kwargs)
+        # One transaction with the URL update below, so the cache bumps (made
+        # on commit, see api/signals.py) never come before it
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            # Resolve the public URL once the file name is final, so the API
+            # never has to rebuild it per request
+            if resolve_image_fields(self):
+                type(self).objects.filter(pk=self.pk).update(
+                    image_url=self.image_url, image_variants=self.image_variants
+                )
 
     def __str__(self):
         return f"{self.caption} ({self.year})"
@@ -137,53 +202,52 @@ class CarouselImage(models.Model):
     cloudinary_url = models.URLField(blank=True, null=True)
     is_active = models.BooleanField(default=True, help_text="Whether this image should be shown in the carousel")
     order = models.PositiveIntegerField(default=0, help_text="Order in which images appear (lower numbers first)")
+    image_url = models.CharField(max_length=500, blank=True, default='', help_text="Resolved public URL served by the API")
+    image_variants = models.JSONField(blank=True, default=dict, help_text="Responsive size-variant URLs, keyed by size name")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['order', 'uploaded_at']
         verbose_name = "Carousel Image"
         verbose_name_plural = "Carousel Images"
+        indexes = [
+            # The public carousel: only active images, in order
+            models.Index(
+                fields=['order', 'uploaded_at'], name='carousel_active_order_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+    cloudinary_folder = "carousel_images"
+
+    def build_public_id(self):
+        # Create a unique public_id to avoid conflicts
+        unique_id = str(uuid.uuid4())[:8]
+        safe_title = ''.join(c for c in self.title if c.isalnum() or c in '-_')[:20]
+        return f"carousel_{safe_title}_{unique_id}"
 
-    def save(self, *args, **kwargs):
-        # If image is provided and cloudinary_url is not set, upload to Cloudinary
-        if self.image and not self.cloudinary_url:
+    def save(self, *args, defer_upload=False, **kwargs):
+        # If image is provided and cloudinary_url is not set, upload to Cloudinary.
+        # With defer_upload=True the caller queues the upload instead (see api/uploads.py).
+        if self.image and not self.cloudinary_url and not defer_upload:
             try:
-                import cloudinary.uploader
-                import uuid
-                
-                # Read the image data from the uploaded file
-                if hasattr(self.image, 'read'):
-                    # If it's an uploaded file object
-                    self.image.seek(0)
-                    image_data = self.image.read()
-                    self.image.seek(0)  # Reset for Django to save it locally too
-                else:
-                    # If it's already saved locally, read from file path
-                    with open(self.image.path, 'rb') as f:
-                        image_data = f.read()
-                
-                # Create a unique public_id to avoid conflicts
-                unique_id = str(uuid.uuid4())[:8]
-                safe_title = ''.join(c for c in self.title if c.isalnum() or c in '-_')[:20]
-                
-                # Upload to Cloudinary
-                upload_result = cloudinary.uploader.upload(
-                    image_data,
-                    folder="carousel_images",
-                    public_id=f"carousel_{safe_title}_{unique_id}",
-                    overwrite=True
-                )
-                
-                # Store the Cloudinary URL
-                self.cloudinary_url = upload_result.get('secure_url')
-                
-                print(f"✅ Successfully uploaded carousel image to Cloudinary: {self.cloudinary_url}")
-                
+                self.cloudinary_url = upload_model_image(self)
+                logger.debug("Uploaded carousel image to Cloudinary: %s", self.cloudinary_url)
             except Exception as e:
-                print(f"❌ Error uploading carousel image to Cloudinary: {e}")
+                logger.warning("Error uploading carousel image to Cloudinary: %s", e)
                 # Don't set cloudinary_url if upload fails - this way we can retry later
         
-        super().save(*args, **kwargs)
+        # One transaction with the URL update below, so the cache bumps (made
+        # on commit, see api/signals.py) never come before it
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            # Resolve the public URL once the file name is final, so the API
+            # never has to rebuild it per request
+            if resolve_image_fields(self):
+                type(self).objects.filter(pk=self.pk).update(
+                    image_url=self.image_url, image_variants=self.image_variants
+                )
 
     def __str__(self):
         return self.title
@@ -0,0 +1,289 @@
+"""
+Result poster generation.
+
+A poster is drawn on each template in `assets/` with the event's poster
+winners, encoded as PNG and uploaded to Cloudinary. `generate_posters` does
+this one template at a time for the synchronous view; `agenerate_posters`
+draws the templates in worker threads and uploads them concurrently with an
+async HTTP client, for the ASGI view.
+"""
+import asyncio
+import io
+import logging
+import os
+import time
+from typing import List, NamedTuple
+
+from django.conf import settings
+
+from . import cloudinary_sdk
+from .models import Event, Result
+
+logger = logging.getLogger(__name__)
+
+POSTER_TEMPLATES = ['tmb1.png', 'tmb2.png']
+POSTER_FOLDER = 'generated_posters'
+
+
+class PosterData(NamedTuple):
+    event: Event
+    category_names: List[str]
+    results: List[Result]
+    result_number: str
+
+    @property
+    def is_general_event(self):
+        return len(self.category_names) > 1
+
+
+def _poster_results(event):
+    # Winning results (positions 1, 2, 3) that should be included in posters,
+    # by position first, then display_order for ties
+    return Result.objects.filter(
+        registration__event=event, position__in=[1, 2, 3], include_in_poster=True,
+    ).select_related(
+        'registration__contestant__group', 'registration__event'
+    ).order_by('position', 'display_order')
+
+
+def load_poster_data(event_id):
+    """
+    Return the PosterData of an event, or None if it has no poster-eligible
+    results. Raises Event.DoesNotExist for an unknown event.
+    """
+    event = Event.objects.prefetch_related('categories').get(id=event_id)
+    results = list(_poster_results(event))
+    if not results:
+        return None
+    category_names = [cat.name for cat in event.categories.all()]
+    return PosterData(event, category_names, results, results[0].resultNumber or "")
+
+
+async def aload_poster_data(event_id):
+    """Async version of `load_poster_data`."""
+    event = await Event.objects.aget(id=event_id)
+    results = [result async for result in _poster_results(event)]
+    if not results:
+        return None
+    category_names = [cat.name async for cat in event.categories.all()]
+    return PosterData(event, category_names, results, results[0].resultNumber or "")
+
+
+def poster_filename(event_id, template_name):
+    return f'event_{event_id}_{template_name}'
+
+
+def _load_fonts():
+    from PIL import ImageFont
+
+    try:
+        font_main_path = os.path.join(settings.BASE_DIR, 'assets', 'fonts', 'chinese rocks rg.otf')
+        font_secondary_path = os.path.join(settings.BASE_DIR, 'assets', 'fonts', 'Poppins-Medium.ttf')
+
+        fonts = {
+            'publication_num': ImageFont.truetype(font_main_path, 60),
+            'category': ImageFont.truetype(font_main_path, 50),
+            'event': ImageFont.truetype(font_main_path, 60),
+            'winner': ImageFont.truetype(font_main_path, 45),
+            'department': ImageFont.truetype(font_secondary_path, 25),
+        }
+        return fonts
+
+    except Exception as font_error:
+        logger.warning("Poster font loading error, using the default font: %s", font_error)
+        # Use default font if custom fonts fail
+        default = ImageFont.load_default()
+        return dict.fromkeys(['publication_num', 'category', 'event', 'winner', 'department'], default)
+
+
+def render_poster(template_name, data):
+    """
+    Draw one poster and return it as PNG bytes, or None if the template
+    file doesn't exist.
+    """
+    from PIL import Image, ImageDraw
+
+    template_path = os.path.join(settings.BASE_DIR, 'assets', template_name)
+    if not os.path.exists(template_path):
+        return None
+
+    with Image.open(template_path) as template_img:
+        # Copy the template to work with and convert to RGB mode
+        # This fixes the "cannot allocate more than 256 colors" error
+        image = template_img.convert('RGB')
+
+    fonts = _load_fonts()
+    draw = ImageDraw.Draw(image)
+
+    # Define colors
+    color_primary = (0, 0, 0)
+    color_secondary = (0, 0, 0)
+    even_name_color = (167, 18, 26)
+
+    # ===== CUSTOMIZABLE POSITIONS =====
+    # Adjust these X,Y coordinates for any template design
+
+    # Result number position (01, 02, etc.)
+    result_num_x = 225
+    result_num_y = 605
+
+    # Category position (GIRLS, BOYS, etc.)
+    category_x = 210
+    category_y = 705
+
+    # Event name position
+    event_x = 210
+    event_y = 760
+
+    # Winners starting position and spacing
+    winners_start_x = 280
+    winners_start_y = 885
+    winners_spacing = 95  # Vertical space between each winner
+
+    # Department name offset (relative to winner name)
+    dept_x_offset = 0    # Horizontal offset from winner name
+    dept_y_offset = 40   # Vertical offset from winner name
+
+    # Draw result number
+    draw.text((result_num_x, result_num_y), str(data.result_number), font=fonts['publication_num'], fill=color_primary)
+
+    # Draw category and event name
+    if not data.is_general_event and data.category_names:
+        category_text = data.category_names[0].upper()
+        draw.text((category_x, category_y), category_text, font=fonts['category'], fill=color_secondary)
+
+    # Draw event name
+    event_text = data.event.name.upper()
+    draw.text((event_x, event_y), event_text, font=fonts['event'], fill=even_name_color)
+
+    # Draw winners list - simple X,Y positioning with tie handling
+    # Results are already sorted by position, then display_order for ties
+    for i, result in enumerate(data.results):
+        winner_name = result.registration.contestant.full_name
+        department_name = result.registration.contestant.group.name
+
+        logger.debug("Drawing winner at position %s (display_order: %s): %s - %s",
+                     result.position, result.display_order, winner_name, department_name)
+
+        # Calculate positions for this winner
+        winner_y = winners_start_y + (i * winners_spacing)
+        dept_x = winners_start_x + dept_x_offset
+        dept_y = winner_y + dept_y_offset
+
+        try:
+            # Draw winner name and department
+            draw.text((winners_start_x, winner_y), winner_name, font=fonts['winner'], fill=color_primary)
+            draw.text((dept_x, dept_y), department_name, font=fonts['department'], fill=color_secondary)
+        except Exception as e:
+            logger.warning("Error drawing poster winner %s: %s", winner_name, e)
+
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format='PNG')
+    # Immediately close the image to free memory
+    image.close()
+    return img_buffer.getvalue()
+
+
+def upload_poster(png, filename):
+    """Upload a poster to Cloudinary and return its URL."""
+    upload_result = cloudinary_sdk.uploader().upload(
+        io.BytesIO(png),
+        public_id=f"{POSTER_FOLDER}/{filename}",
+        folder=POSTER_FOLDER,
+        resource_type="image",
+        format="png"
+    )
+    return upload_result['secure_url']
+
+
+async def aupload_poster(png, filename, client=None):
+    """
+    Upload a poster to Cloudinary without blocking the event loop and
+    return its URL. Uses the signed upload API directly over httpx.
+    """
+    if client is None:
+        return await asyncio.to_thread(upload_poster, png, filename)
+
+    cloudinary_utils = cloudinary_sdk.utils()
+    params = cloudinary_utils.sign_request({
+        'public_id': f"{POSTER_FOLDER}/{filename}",
+        'folder': POSTER_FOLDER,
+        'format': 'png',
+        'timestamp': int(time.time()),
+    }, {})
+    response = await client.post(
+        cloudinary_utils.cloudinary_api_url('upload', resource_type='image'),
+        data=params,
+        files={'file': (filename, png, 'image/png')},
+    )
+    response.raise_for_status()
+    return response.json()['secure_url']
+
+
+def save_poster_locally(png, filename, request):
+    """Fallback when Cloudinary fails (won't work on Render but good for local testing)."""
+    output_dir = os.path.join(settings.MEDIA_ROOT, POSTER_FOLDER)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, filename), 'wb') as f:
+        f.write(png)
+    return request.build_absolute_uri(os.path.join(settings.MEDIA_URL, POSTER_FOLDER, filename))
+
+
+def generate_posters(data, request):
+    """Draw and upload the posters one template at a time; return `[{'id', 'url'}]`."""
+    generated_posters_urls = []
+
+    # Process one template at a time to minimize memory usage
+    for template_name in POSTER_TEMPLATES:
+        try:
+            png = render_poster(template_name, data)
+            if png is None:
+                continue
+            filename = poster_filename(data.event.id, template_name)
+            try:
+                image_url = upload_poster(png, filename)
+                logger.debug("Uploaded poster %s to Cloudinary: %s", filename, image_url)
+            except Exception as cloudinary_error:
+                logger.warning("Cloudinary upload of poster %s failed, saving locally: %s", filename, cloudinary_error)
+                image_url = save_poster_locally(png, filename, request)
+            generated_posters_urls.append({'id': template_name, 'url': image_url})
+
+        except Exception as template_error:
+            logger.exception("Error processing poster template %s: %s", template_name, template_error)
+            continue
+
+    return generated_posters_urls
+
+
+async def agenerate_posters(data, request):
+    """
+    Draw all posters in worker threads and upload them concurrently;
+    return `[{'id', 'url'}]` in template order.
+    """
+
+    async def one(template_name, client):
+        try:
+            png = await asyncio.to_thread(render_poster, template_name, data)
+            if png is None:
+                return None
+            filename = poster_filename(data.event.id, template_name)
+            try:
+                image_url = await aupload_poster(png, filename, client)
+                logger.debug("Uploaded poster %s to Cloudinary: %s", filename, image_url)
+            except Exception as cloudinary_error:
+                logger.warning("Cloudinary upload of poster %s failed, saving locally: %s", filename, cloudinary_error)
+                image_url = await asyncio.to_thread(save_poster_locally, png, filename, request)
+            return {'id': template_name, 'url': image_url}
+        except Exception as template_error:
+            logger.exception("Error processing poster template %s: %s", template_name, template_error)
+            return None
+
+    try:
+        # Imported here, httpx is slow to import and only needed for posters
+        import httpx
+    except ImportError:  # uploads then run in worker threads
+        posters = await asyncio.gather(*(one(name, None) for name in POSTER_TEMPLATES))
+    else:
+        async with httpx.AsyncClient(timeout=settings.POSTER_UPLOAD_TIMEOUT) as client:
+            posters = await asyncio.gather(*(one(name, client) for name in POSTER_TEMPLATES))
+    return [poster for poster in posters if poster]
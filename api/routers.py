@@ -0,0 +1,170 @@
+"""
+Read-replica routing.
+
+With a replica configured (`REPLICA_DATABASE_URL`), views marked with
+`ReplicaReadMixin` (the public read-only API and the exports) read from it;
+everything else, all writes and the whole admin use the primary
+(`default`). Reads stay on the primary when the replica may not have caught
+up yet (it can lag up to `REPLICA_MAX_LAG` seconds):
+
+* for the rest of a request that wrote something,
+* for `REPLICA_MAX_LAG` seconds after a client's own write (read-your-writes,
+  remembered in a cookie), and
+* while a model the view reads changed less than `REPLICA_MAX_LAG` seconds
+  ago, so a response cached right after a change is never built from stale
+  replica rows.
+"""
+import contextlib
+import contextvars
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .caching import last_changed
+
+STICKY_COOKIE = 'primary_until'
+
+# Models that must always be read from the primary: the database cache
+# table holds the cache versions, which change on every write
+PRIMARY_ONLY_APPS = {'django_cache'}
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.use_replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+def replica_alias():
+    """The replica's database alias, or None if there is no replica."""
+    alias = settings.REPLICA_DATABASE_ALIAS
+    return alias if alias in connections.settings else None
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Read from the replica (where it is safe) inside the block."""
+    state = _state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _state.set(state)
+    previous = state.use_replica
+    state.use_replica = True
+    try:
+        yield state
+    finally:
+        state.use_replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None or not state.use_replica or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return replica_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state = _state.get()
+            if state is not None:
+                state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary through replication
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track the database writes of each request, and keep a client that
+    wrote something on the primary for REPLICA_MAX_LAG seconds.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(self.initial_state(request))
+        try:
+            response = self.get_response(request)
+            wrote = _state.get().wrote
+        finally:
+            _state.reset(token)
+        return self.pin(request, response, wrote)
+
+    async def __acall__(self, request):
+        # The state object is shared with the sync_to_async threads the
+        # request's queries run in (they get a copy of this context)
+        token = _state.set(self.initial_state(request))
+        try:
+            response = await self.get_response(request)
+            wrote = _state.get().wrote
+        finally:
+            _state.reset(token)
+        return self.pin(request, response, wrote)
+
+    def initial_state(self, request):
+        try:
+            primary_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        return RoutingState(pinned=primary_until > time.time())
+
+    def pin(self, request, response, wrote):
+        if wrote and replica_alias():
+            max_lag = settings.REPLICA_MAX_LAG
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + max_lag:.0f}', max_age=max_lag,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Let the safe (GET/HEAD/OPTIONS) requests of a view read from the
+    replica. `cache_models` are the models the view reads: while one of
+    them changed recently, the view keeps reading from the primary.
+    """
+    cache_models = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or replica_alias() is None or self.recently_changed():
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    def recently_changed(self):
+        if not self.cache_models:
+            return False
+        return last_changed(*self.cache_models) > time.time() - settings.REPLICA_MAX_LAG
@@ -0,0 +1,155 @@
+"""
+Leaderboard calculations shared by the API views and the published
+snapshots (see api/snapshots.py).
+
+Besides the group totals there is a points breakdown: a cube of the points
+of every group, split by contestant category and gender. It comes from one
+grouped aggregation over the results and is kept in the cache, per event:
+when an event's results are published only that event's share is
+aggregated again (see `points_breakdown`).
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .caching import get_versions, model_namespace
+from .models import Category, Contestant, Event, Group, Registration, Result
+from .signals import event_results_namespace
+
+BREAKDOWN_KEY = 'scoring:breakdown'
+# Changes to these rebuild the whole breakdown; result changes only
+# refresh the events they belong to
+BREAKDOWN_MODELS = (Group, Category, Contestant, Registration, Event)
+
+
+def _group_totals():
+    return Group.objects.annotate(total=Sum('contestant__registration__results__points'))
+
+
+def _rank(groups):
+    points_data = [
+        {'group_name': group.name, 'total_points': group.total or 0}
+        for group in groups
+    ]
+    # A stable sort, so tied groups keep their usual order
+    return sorted(points_data, key=lambda x: x['total_points'], reverse=True)
+
+
+def group_points():
+    """
+    Total points of every group, highest first, as
+    `[{'group_name': ..., 'total_points': ...}]`.
+    """
+    return _rank(_group_totals())
+
+
+async def agroup_points():
+    """Async version of `group_points`."""
+    return _rank([group async for group in _group_totals()])
+
+
+def _event_cells(results):
+    """`{event id: {(group id, category id, gender): points}}` from one grouped query."""
+    rows = (
+        results
+        .values_list(
+            'registration__event_id',
+            'registration__contestant__group_id',
+            'registration__contestant__category_id',
+            'registration__contestant__gender',
+        )
+        .annotate(points=Sum('points'))
+        .order_by()
+    )
+    events = defaultdict(dict)
+    for event_id, group_id, category_id, gender, points in rows:
+        events[event_id][(group_id, category_id, gender)] = points or 0
+    return dict(events)
+
+
+def _build_breakdown(versions):
+    event_ids = list(Event.objects.values_list('id', flat=True))
+    return {
+        'versions': versions,
+        'event_versions': dict(zip(event_ids, get_versions(*map(event_results_namespace, event_ids)))),
+        'events': _event_cells(Result.objects.all()),
+        'groups': dict(Group.objects.values_list('id', 'name')),
+        'categories': dict(Category.objects.values_list('id', 'name')),
+    }
+
+
+def points_breakdown():
+    """
+    The cached breakdown cube, as `{'events': {event id: {(group id,
+    category id, gender): points}}, 'groups': {id: name}, 'categories':
+    {id: name}, ...}`. Events whose results changed since it was cached are
+    aggregated again (in one query); any other change rebuilds it.
+    """
+    versions = get_versions(*(model_namespace(model) for model in BREAKDOWN_MODELS))
+    cube = cache.get(BREAKDOWN_KEY)
+    if cube is None or cube['versions'] != versions:
+        cube = _build_breakdown(versions)
+        cache.set(BREAKDOWN_KEY, cube, None)
+        return cube
+
+    event_ids = list(cube['event_versions'])
+    event_versions = dict(zip(event_ids, get_versions(*map(event_results_namespace, event_ids))))
+    stale = [event_id for event_id in event_ids if event_versions[event_id] != cube['event_versions'][event_id]]
+    if stale:
+        # Versions are read before the rows, so a concurrent change is
+        # picked up again on the next call rather than lost
+        fresh = _event_cells(Result.objects.filter(registration__event_id__in=stale))
+        for event_id in stale:
+            cube['events'][event_id] = fresh.get(event_id, {})
+        cube['event_versions'] = event_versions
+        cache.set(BREAKDOWN_KEY, cube, None)
+    return cube
+
+
+def breakdown_standings(group=None, category=None, gender=None, top=None):
+    """
+    Group standings per category and gender from the breakdown, highest
+    first, optionally filtered by group, category and gender ids/values and
+    cut to the `top` groups of each standing.
+    """
+    cube = points_breakdown()
+    cells = defaultdict(int)
+    for event_cells in cube['events'].values():
+        for key, points in event_cells.items():
+            cells[key] += points
+
+    standings = defaultdict(list)
+    totals = defaultdict(int)
+    for (group_id, category_id, cell_gender), points in cells.items():
+        if group is not None and group_id != group:
+            continue
+        if category is not None and category_id != category:
+            continue
+        if gender is not None and cell_gender != gender:
+            continue
+        standings[category_id, cell_gender].append((points, group_id))
+        totals[group_id] += points
+
+    def ranked(entries):
+        # Ties in group name order
+        entries = sorted(entries, key=lambda entry: (-entry[0], cube['groups'].get(entry[1]) or ''))
+        return [
+            {'group_id': group_id, 'group_name': cube['groups'].get(group_id), 'points': points}
+            for points, group_id in entries[:top]
+        ]
+
+    return {
+        'standings': [
+            {
+                'category_id': category_id,
+                'category_name': cube['categories'].get(category_id),
+                'gender': cell_gender,
+                'groups': ranked(entries),
+            }
+            for (category_id, cell_gender), entries in sorted(
+                standings.items(), key=lambda item: (cube['categories'].get(item[0][0]) or '', item[0][1] or '')
+            )
+        ],
+        'totals': ranked((points, group_id) for group_id, points in totals.items()),
+    }
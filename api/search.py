@@ -0,0 +1,90 @@
+"""
+Name and result-number search, for the admin (search boxes and
+autocomplete widgets) and the public `/api/search/` endpoint.
+
+A plain `icontains` is a sequential scan of the contestants table, and the
+admin autocomplete runs one per keystroke. Migration 0018 adds an index for
+substring matches instead:
+
+* Postgres: trigram GIN indexes (pg_trgm) on the exact expression Django's
+  `icontains` compares, `UPPER(column::text)`, so ordinary `icontains`
+  filters use them. Matches are ranked by trigram similarity.
+* SQLite: an FTS5 table with the trigram tokenizer over contestant names
+  and emails, kept in sync by triggers. Queries shorter than three
+  characters can't use it and fall back to `icontains`.
+"""
+import functools
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .event_results import result_number_variants
+from .models import Contestant, Result
+
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 50
+
+# FTS5 trigrams need at least three characters
+FTS_MIN_LENGTH = 3
+FTS_TABLE = 'api_contestant_fts'
+
+
+@functools.lru_cache
+def has_fts_table(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _fts_query(query, fields):
+    # A phrase restricted to the given columns; quotes are doubled to escape them
+    phrase = query.replace('"', '""')
+    return f'{{{" ".join(fields)}}} : "{phrase}"'
+
+
+def match_contestants(queryset, query, fields=('full_name', 'email')):
+    """Filter a Contestant queryset to those with `query` in any of `fields`."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite' and len(query) >= FTS_MIN_LENGTH and has_fts_table(queryset.db):
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_fts_query(query, fields)]
+        ))
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+def _rank_by_name(queryset, query):
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.annotate(
+            similarity=TrigramSimilarity('full_name', query)
+        ).order_by('-similarity', 'full_name', 'pk')
+    return queryset.order_by('full_name', 'pk')
+
+
+def search_contestants(query, limit=10):
+    """Contestants whose name contains `query`, best matches first."""
+    contestants = match_contestants(
+        Contestant.objects.select_related('group'), query, fields=('full_name',)
+    )
+    return list(_rank_by_name(contestants, query)[:limit])
+
+
+def search_results(query, limit=10):
+    """
+    Results with the result number `query` (with or without its leading
+    zero), or won by a contestant whose name contains it.
+    """
+    numbers = result_number_variants(query)
+    contestants = match_contestants(Contestant.objects.all(), query, fields=('full_name',))
+    results = Result.objects.filter(
+        Q(resultNumber__in=numbers) | Q(registration__contestant__in=contestants.values('pk'))
+    ).select_related(
+        'registration__contestant__group', 'registration__event'
+    ).order_by('resultNumber', 'position', 'display_order', 'pk')
+    return list(results[:limit])
@@ -0,0 +1,193 @@
+"""
+Signal handlers that keep cached API responses and in-memory indexes in
+sync with the database.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .caching import bump_version, model_namespace, touch_models
+from .dedup import gallery_hash_index
+from .models import (
+    CarouselImage, Category, Contestant, Event, GalleryImage, Group, IndividualChampion, Registration,
+    Result, ResultChange,
+)
+
+# Models whose changes are tracked for CompressedResponseCacheMixin (versions)
+# and ConditionalGetMixin (last-changed times)
+TRACKED_MODELS = (
+    Group, Category, Event, Contestant, Registration, Result, CarouselImage, GalleryImage,
+    ResultChange,
+)
+
+GALLERY_YEARS_NAMESPACE = 'gallery:years'
+
+
+def gallery_year_namespace(year):
+    """Cache namespace for the gallery listing of one year (None means all years)."""
+    return f"gallery:year:{'all' if year is None else year}"
+
+
+def event_results_namespace(event_id):
+    """Cache namespace bumped whenever a result of one event changes."""
+    return f"results:event:{event_id}"
+
+
+@receiver(pre_save, sender=GalleryImage)
+def remember_gallery_state(sender, instance, **kwargs):
+    # If an image moves to another year, the old year's page is stale too,
+    # and a replaced file needs its new hash indexed
+    instance._previous_year = instance._previous_phash = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('year', 'phash').first()
+        if previous:
+            instance._previous_year, instance._previous_phash = previous
+
+
+@receiver(post_save, sender=GalleryImage)
+@receiver(post_delete, sender=GalleryImage)
+def invalidate_gallery_cache(sender, instance, **kwargs):
+    years = {instance.year, getattr(instance, '_previous_year', None)} - {None}
+    # After the commit, which includes the image URL written after the save
+    transaction.on_commit(lambda: bump_version(
+        GALLERY_YEARS_NAMESPACE,
+        gallery_year_namespace(None),
+        *(gallery_year_namespace(year) for year in years),
+    ))
+
+
+@receiver(post_save, sender=GalleryImage)
+def index_gallery_hash(sender, instance, created, **kwargs):
+    # After the commit, so a rolled back image is never indexed, and other
+    # processes reload the new hash, not the old one. New images reach other
+    # processes with their next refresh.
+    if created and instance.phash:
+        transaction.on_commit(lambda: gallery_hash_index.add(instance.pk, instance.phash))
+    elif not created and instance.phash and instance.phash != getattr(instance, '_previous_phash', None):
+        transaction.on_commit(lambda: gallery_hash_index.replaced(instance.pk, instance.phash))
+
+
+@receiver(post_delete, sender=GalleryImage)
+def unindex_gallery_hash(sender, instance, **kwargs):
+    if instance.phash:
+        pk = instance.pk
+        transaction.on_commit(lambda: gallery_hash_index.removed(pk))
+
+
+def record_model_changes(*models):
+    models = {model._meta.concrete_model for model in models} & set(TRACKED_MODELS)
+    if not models:
+        return
+
+    def record():
+        bump_version(*(model_namespace(model) for model in models))
+        touch_models(*models)
+
+    # Wait for the transaction, so a request in between can't cache the old
+    # rows under the new version
+    transaction.on_commit(record)
+
+
+def track_model_change(sender, **kwargs):
+    record_model_changes(sender)
+
+
+def track_m2m_change(sender, instance, model, action, **kwargs):
+    if action.startswith('post_'):
+        record_model_changes(type(instance), model)
+
+
+# Connected per sender: a receiver for every model would stop Django from
+# fast-deleting anything (sessions, admin log, ...). Proxy models (e.g.
+# IndividualChampion) send as themselves, so they are connected too.
+for _model in apps.get_app_config('api').get_models():
+    if _model._meta.concrete_model in TRACKED_MODELS:
+        post_save.connect(track_model_change, sender=_model)
+        post_delete.connect(track_model_change, sender=_model)
+for _model in TRACKED_MODELS:
+    for _field in _model._meta.local_many_to_many:
+        m2m_changed.connect(track_m2m_change, sender=_field.remote_field.through)
+
+
+@receiver(pre_save, sender=Result)
+def remember_result_event(sender, instance, **kwargs):
+    # A result moved to another event's registration changes both events
+    instance._previous_event_id = None
+    if instance.pk:
+        instance._previous_event_id = (
+            sender.objects.filter(pk=instance.pk).values_list('registration__event_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def invalidate_event_results(sender, instance, **kwargs):
+    if Result.registration.is_cached(instance):
+        event_id = instance.registration.event_id
+    else:
+        event_id = (
+            Registration.objects.filter(pk=instance.registration_id).values_list('event_id', flat=True).first()
+        )
+    events = {event_id, getattr(instance, '_previous_event_id', None)} - {None}
+    invalidate_events(events)
+
+
+def refresh_results_snapshot():
+    # Imported here: the snapshot is built with api/scoring.py, which imports this module
+    from .snapshots import schedule_snapshot
+
+    schedule_snapshot()
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_snapshot_on_change(sender, **kwargs):
+    # The points table lists every group, also those without points
+    refresh_results_snapshot()
+
+
+@receiver(post_save, sender=Event)
+def refresh_snapshot_on_event_change(sender, instance, created, **kwargs):
+    # The winners show the event's name
+    if not created and Result.objects.filter(registration__event=instance).exists():
+        refresh_results_snapshot()
+
+
+def invalidate_events(events):
+    """Bump the results namespaces of `events` once the transaction commits."""
+    if events:
+        transaction.on_commit(lambda: bump_version(*(event_results_namespace(event) for event in events)))
+
+
+@receiver(pre_save, sender=Registration)
+def remember_registration_event(sender, instance, **kwargs):
+    instance._previous_event_id = None
+    if instance.pk:
+        instance._previous_event_id = sender.objects.filter(pk=instance.pk).values_list('event_id', flat=True).first()
+
+
+@receiver(post_save, sender=Registration)
+def invalidate_registration_results(sender, instance, created, **kwargs):
+    # New sign-ups have no results yet; an edited registration with results
+    # changes what its event (and the event it moved from) shows
+    if not created and instance.results.exists():
+        invalidate_events({instance.event_id, instance._previous_event_id} - {None})
+        refresh_results_snapshot()
+
+
+@receiver(post_save, sender=Contestant)
+@receiver(post_save, sender=IndividualChampion)
+def invalidate_contestant_results(sender, instance, created, **kwargs):
+    # Results show the contestant's name and group
+    if not created:
+        events = set(
+            Result.objects.filter(registration__contestant=instance)
+            .values_list('registration__event_id', flat=True).distinct()
+        )
+        invalidate_events(events)
+        # Their points count for their group
+        if events:
+            refresh_results_snapshot()
@@ -0,0 +1,210 @@
+"""
+Static JSON snapshots of the public results for results night.
+
+A snapshot is a set of JSON files written to `SNAPSHOT_STORAGE` under a new
+version directory:
+
+    <version>/points.json          same data as /api/points/
+    <version>/results.json         same data as /api/results/
+    <version>/winners.json         poster winners of every event
+    <version>/winners/<id>.json    poster winners of one event
+    latest.json                    points at the current version
+
+Versioned files never change, so they can be cached forever by browsers and
+a CDN; only the small `latest.json` has to be revalidated. Each file is also
+written gzip- and Brotli-compressed (`.gz`, `.br`) for WhiteNoise to serve
+(see `views.serve_snapshot`). Snapshots are published by `publish_snapshot`
+and whenever results, or the contestants, groups, registrations and events
+they show, change (see api/signals.py). The results and points pages read
+them first; the API stays available as the fallback.
+"""
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .caching import compress_variants
+from .models import Result
+from .scoring import group_points
+from .serializers import ResultSerializer
+
+logger = logging.getLogger(__name__)
+
+LATEST_NAME = 'latest.json'
+
+_executor = None
+_pending = False
+
+
+def get_snapshot_storage():
+    return storages.create_storage(settings.SNAPSHOT_STORAGE)
+
+
+def build_snapshot():
+    """Return `{relative file name: JSON-serializable data}` for one snapshot."""
+    results = (
+        Result.objects
+        .select_related('registration__contestant__group', 'registration__event')
+        .order_by('registration__event_id', 'position', 'display_order', 'id')
+    )
+    results = list(results)
+
+    winners = {}
+    for result in results:
+        if result.position > 3 or not result.include_in_poster:
+            continue
+        registration = result.registration
+        event = winners.setdefault(registration.event_id, {
+            'id': registration.event_id,
+            'name': registration.event.name,
+            'result_number': result.resultNumber,
+            'posters_url': reverse('generate-event-posters', args=[registration.event_id]),
+            'winners': [],
+        })
+        group = registration.contestant.group
+        event['winners'].append({
+            'position': result.position,
+            'points': result.points,
+            'contestant_name': registration.contestant.full_name,
+            'group_name': group.name if group else None,
+        })
+
+    files = {
+        'points.json': group_points(),
+        'results.json': ResultSerializer(results, many=True).data,
+        'winners.json': list(winners.values()),
+    }
+    for event_id, event in winners.items():
+        files[f'winners/{event_id}.json'] = event
+    return files
+
+
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+def _dump(data):
+    return ContentFile(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _save_compressed(storage, name, content):
+    """Save `content` under `name`, with its compressed variants next to it."""
+    for encoding, body in compress_variants(content.read()).items():
+        storage.save(name + COMPRESSED_SUFFIXES.get(encoding, ''), ContentFile(body))
+
+
+def publish_snapshot(storage=None, keep=None):
+    """
+    Build a snapshot, write it under a new version and point `latest.json`
+    at it. Returns the manifest written to `latest.json`.
+    """
+    storage = storage or get_snapshot_storage()
+    keep = settings.SNAPSHOT_KEEP if keep is None else keep
+
+    published_at = timezone.now()
+    version = published_at.strftime('%Y%m%dT%H%M%S%fZ')
+    files = build_snapshot()
+    for name, data in files.items():
+        _save_compressed(storage, f'{version}/{name}', _dump(data))
+
+    manifest = {
+        'version': version,
+        'published_at': published_at.isoformat(),
+        'files': {name: storage.url(f'{version}/{name}') for name in files},
+    }
+    # Written last, and replaced in one step: a reader gets the previous
+    # manifest or this one, and all the files either lists exist. A worker
+    # that finishes after a newer snapshot was published leaves it in place.
+    if _published_version(storage) < version:
+        _replace(storage, LATEST_NAME, _dump(manifest))
+
+    prune_snapshots(storage, keep)
+    logger.info("Published results snapshot %s (%d files)", version, len(files))
+    return manifest
+
+
+def _published_version(storage):
+    """The version `latest.json` points at, or '' if there is none."""
+    try:
+        with storage.open(LATEST_NAME) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return ''
+
+
+def _replace(storage, name, content):
+    """Write `name` in one step, so it is never missing or half written."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storages (e.g. S3 with django-storages) overwrite an object
+        # with a single upload
+        storage.save(name, content)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(content.read())
+    os.replace(temporary, path)
+
+
+def prune_snapshots(storage, keep):
+    """Delete all but the newest `keep` snapshot versions."""
+    try:
+        versions, _ = storage.listdir('')
+    except (NotImplementedError, FileNotFoundError):
+        return
+    if keep > 0:
+        for version in sorted(versions)[:-keep]:
+            _delete_tree(storage, version)
+
+
+def _delete_tree(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        storage.delete(f'{path}/{name}')
+    for name in directories:
+        _delete_tree(storage, f'{path}/{name}')
+    # Local storage leaves the empty directory behind
+    try:
+        os.rmdir(storage.path(path))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def _publish_in_background():
+    global _pending
+    _pending = False
+    try:
+        publish_snapshot()
+    except Exception:
+        logger.exception("Publishing the results snapshot failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_snapshot():
+    """
+    Publish a new snapshot in a background thread once the current
+    transaction commits. Several results saved in a row share one publish.
+    """
+    if not settings.SNAPSHOT_ON_PUBLISH:
+        return
+
+    def submit():
+        global _executor, _pending
+        if _pending:
+            return
+        _pending = True
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot')
+        _executor.submit(_publish_in_background)
+
+    transaction.on_commit(submit)
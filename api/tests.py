@@ -1,3 +1,1732 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
 
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, router
+from django.db.models import DateTimeField
+from django.forms import CheckboxSelectMultiple
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
+from .caching import (
+    LAST_CHANGED_KEY, VERSION_KEY, get_version, last_changed, model_namespace, touch_models, versioned_key,
+)
+from .changes import event_group_points, record_publication
+from .dedup import REHASH_NAMESPACE, GalleryHashIndex, MultiIndexHashTable, gallery_hash_index
+from .festival_data import FestivalSize, generate
+from .forms import EventResultForm, RegistrationSearchWidget
+from .idempotency import _cache_key
+from .image_urls import IMAGE_VARIANT_WIDTHS, build_variant_urls
+from .imaging import ProcessedImage, preprocess_files, preprocess_image
+from .log import JsonFormatter, QueueStreamHandler, RequestIdFilter, RequestIdMiddleware, request_id
+from .metrics import RequestMetrics, RouteStats, registry as metrics_registry
+from .models import (
+    CarouselImage, Category, Contestant, Event, GalleryImage, Group, IndividualChampion, Registration, Result,
+    ResultChange,
+)
+from .posters import _poster_results
+from .routers import STICKY_COOKIE, replica_reads
+from .scoring import breakdown_standings, group_points, points_breakdown
+from .search import FTS_TABLE, has_fts_table, match_contestants
+from .signals import gallery_year_namespace
+from .snapshots import LATEST_NAME, publish_snapshot
+from . import throttling
+from .throttling import AdmissionGate, get_gate
+from .uploads import build_instances
+
+# Each test's changes to the shared (database) cache are rolled back, so
+# copies of its counters kept in the local cache must not outlive it. Result
+# changes don't publish snapshots in the background either.
+_test_settings = override_settings(CACHE_COUNTER_TIMEOUT=0, SNAPSHOT_ON_PUBLISH=False)
+
+
+def setUpModule():
+    _test_settings.enable()
+
+
+def tearDownModule():
+    _test_settings.disable()
+
+
+# Loads what every gunicorn worker loads before serving its first request
+WORKER_BOOT = """
+import django
+django.setup()
+from django.urls import resolve
+resolve('/api/points/')
+from django.contrib import admin
+admin.autodiscover()
+"""
+
+
+def import_times(code):
+    """
+    Run `code` in a fresh interpreter with `-X importtime` and return
+    `{module: cumulative microseconds}` for every module it imported, and
+    the total import time in microseconds.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='pusahityotsav.settings')
+    env.setdefault('SECRET_KEY', 'import-time-test')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    total = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+        # Nested imports are indented, and already part of their parent's time
+        if not module.startswith('  '):
+            total += int(cumulative)
+    return times, total
+
+
+class WorkerImportTimeTests(SimpleTestCase):
+    """
+    Guards the worker boot time: the imaging, Cloudinary and async HTTP
+    stacks must only be imported by the poster and upload services that use
+    them, and the whole boot has to stay within IMPORT_TIME_BUDGET_MS.
+    """
+    LAZY_MODULES = ['PIL', 'cloudinary', 'httpx']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.times, cls.total = import_times(WORKER_BOOT)
+
+    def test_heavy_modules_are_not_imported_at_boot(self):
+        imported = [module for module in self.LAZY_MODULES if module in self.times]
+        self.assertEqual(imported, [], 'imported while booting a worker')
+
+    def test_boot_stays_within_budget(self):
+        budget_ms = int(os.environ.get('IMPORT_TIME_BUDGET_MS', 3000))
+        self.assertLess(self.total / 1000, budget_ms)
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def test_worker_exit_closes_the_connection_pools(self):
+        import runpy
+        from unittest import mock
+
+        config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+        postgres = mock.Mock(vendor='postgresql')
+        sqlite = mock.Mock(vendor='sqlite', spec=['vendor', 'close'])
+        with mock.patch('django.db.connections.all', return_value=[postgres, sqlite]) as all_connections:
+            config['worker_exit'](server=mock.Mock(), worker=mock.Mock())
+        all_connections.assert_called_once_with(initialized_only=True)
+        postgres.close_pool.assert_called_once_with()
+
+
+class IndexUsageTests(TestCase):
+    """
+    EXPLAIN the hot queries of the API, the admin and the exports, and check
+    that they use the indexes made for them (migration 0017).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        generate(FestivalSize(contestants=300, events=30, gallery_images=30), seed=1)
+
+    def assertUsesIndex(self, queryset, *index_names):
+        """Assert the query plan uses (at least one of) the given indexes."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # The test tables are tiny, so a sequential scan would always win
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), f'{index_names} not used:\n{plan}')
+
+    def test_event_by_name(self):
+        self.assertUsesIndex(Event.objects.filter(name='Quiz (English)'), 'event_name_idx')
+
+    def test_poster_results_of_an_event(self):
+        event = Event.objects.filter(registration__results__isnull=False).first()
+        # Depending on the join order, results are found by registration or by position
+        self.assertUsesIndex(_poster_results(event), 'result_reg_position_idx', 'result_position_idx')
+
+    def test_winners_export(self):
+        winners = Result.objects.filter(position__in=[1, 2, 3]).order_by(
+            'registration__event__name', 'position', 'display_order'
+        )
+        self.assertUsesIndex(winners, 'result_position_idx')
+
+    def test_result_number(self):
+        self.assertUsesIndex(Result.objects.filter(resultNumber='01'), 'result_number_idx')
+
+    def test_gallery(self):
+        self.assertUsesIndex(GalleryImage.objects.order_by('-uploaded_at'), 'gallery_uploaded_idx')
+        self.assertUsesIndex(
+            GalleryImage.objects.filter(year=2024).order_by('-uploaded_at'), 'gallery_year_uploaded_idx'
+        )
+
+    def test_active_carousel(self):
+        carousel = CarouselImage.objects.filter(is_active=True).order_by('order', 'uploaded_at')
+        self.assertUsesIndex(carousel, 'carousel_active_order_idx')
+
+
+REPLICA = settings.REPLICA_DATABASE_ALIAS
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    The test database stands in for the primary and a second SQLite file
+    for the replica. Each has its own copy of the groups table with a
+    different row, which shows the database a read went to.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        cls.configured_replica = connections.settings.get(REPLICA)
+        connections.settings[REPLICA] = connections.configure_settings({
+            'default': connections.settings['default'],
+            REPLICA: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+            },
+        })[REPLICA]
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(Group)
+        Group.objects.using(REPLICA).create(name='Replica copy')
+        # Only now that the alias exists may the test case use it
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        if cls.configured_replica is None:
+            del connections.settings[REPLICA]
+        else:
+            connections.settings[REPLICA] = cls.configured_replica
+        cls.replica_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='Primary copy')
+        cls.category = Category.objects.create(name='Category - A (UG)')
+
+    def setUp(self):
+        # Nothing changed recently, views may use the replica
+        cache.set(LAST_CHANGED_KEY.format(model_namespace(Group)), 0, None)
+
+    def group_names(self, response):
+        return [group['name'] for group in response.json()]
+
+    def test_reads_use_the_primary_by_default(self):
+        self.assertEqual(list(Group.objects.values_list('name', flat=True)), ['Primary copy'])
+
+    def test_replica_reads(self):
+        with replica_reads():
+            self.assertEqual(list(Group.objects.values_list('name', flat=True)), ['Replica copy'])
+
+    def test_a_write_keeps_the_rest_of_the_request_on_the_primary(self):
+        with replica_reads():
+            Group.objects.create(name='Another group')
+            self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Group.objects.using(REPLICA).count(), 1)
+
+    def test_no_migrations_on_the_replica(self):
+        self.assertFalse(router.allow_migrate(REPLICA, 'api', model_name='group'))
+        self.assertTrue(router.allow_migrate('default', 'api', model_name='group'))
+
+    def test_public_views_read_from_the_replica(self):
+        # format=json skips the response cache
+        response = self.client.get('/api/groups/?format=json')
+        self.assertEqual(self.group_names(response), ['Replica copy'])
+
+    def test_recently_changed_models_are_read_from_the_primary(self):
+        touch_models(Group)
+        response = self.client.get('/api/groups/?format=json')
+        self.assertEqual(self.group_names(response), ['Primary copy'])
+
+    def test_read_your_writes(self):
+        response = self.client.post('/api/contestants/', {
+            'full_name': 'New Contestant', 'email': 'new@festival.test', 'state': 'Kerala',
+            'gender': 'Female', 'group': self.group.pk, 'category': self.category.pk,
+            'course': 'BA English', 'phone_number': '9000000000',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # The client's cookie keeps it on the primary...
+        response = self.client.get('/api/groups/?format=json')
+        self.assertEqual(self.group_names(response), ['Primary copy'])
+        # ...other clients still use the replica
+        self.client.cookies.clear()
+        response = self.client.get('/api/groups/?format=json')
+        self.assertEqual(self.group_names(response), ['Replica copy'])
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'contestants': '2/min', 'registrations': '2/min'},
+})
+class RegistrationThrottlingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+        cls.category = Category.objects.create(name='Category A')
+
+    def register(self, email, ip='203.0.113.1'):
+        return self.client.post('/api/contestants/', {
+            'full_name': 'New Contestant', 'email': email, 'state': 'Kerala',
+            'gender': 'Female', 'group': self.group.pk, 'category': self.category.pk,
+            'course': 'BA English', 'phone_number': '9000000000',
+        }, REMOTE_ADDR=ip)
+
+    def test_writes_are_throttled_per_client(self):
+        self.assertEqual(self.register('one@festival.test').status_code, 201)
+        self.assertEqual(self.register('two@festival.test').status_code, 201)
+        response = self.register('three@festival.test')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.register('three@festival.test', ip='203.0.113.2').status_code, 201)
+        self.assertEqual(self.client.get('/api/contestants/', REMOTE_ADDR='203.0.113.1').status_code, 200)
+
+    def test_full_admission_queue_sheds_load(self):
+        gate = throttling._gate = AdmissionGate(limit=1, queue=0)
+        self.addCleanup(setattr, throttling, '_gate', None)
+        self.assertTrue(gate.acquire(timeout=0))
+
+        response = self.register('one@festival.test')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(settings.ADMISSION_RETRY_AFTER))
+        # One gate for all write endpoints
+        response = self.client.post('/api/registrations/', {}, REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, 429)
+
+        gate.release()
+        self.assertEqual(self.register('one@festival.test').status_code, 201)
+        self.assertEqual(gate.active, 0)
+
+    def test_queued_requests_give_up_after_the_timeout(self):
+        gate = AdmissionGate(limit=1, queue=1)
+        self.assertTrue(gate.acquire(timeout=0))
+        self.assertFalse(gate.acquire(timeout=0.01))
+        self.assertEqual(gate.waiting, 0)
+
+    def test_gate_leaves_a_thread_for_reads(self):
+        self.addCleanup(setattr, throttling, '_gate', throttling._gate)
+        throttling._gate = None
+        gate = get_gate()
+        self.assertIs(get_gate(), gate)
+        self.assertLess(gate.limit + gate.queue, settings.GUNICORN_THREADS)
+
+
+class IdempotencyKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+        cls.category = Category.objects.create(name='Category A')
+
+    def register(self, key, email='new@festival.test', ip='127.0.0.1'):
+        return self.client.post('/api/contestants/', {
+            'full_name': 'New Contestant', 'email': email, 'state': 'Kerala',
+            'gender': 'Female', 'group': self.group.pk, 'category': self.category.pk,
+            'course': 'BA English', 'phone_number': '9000000000',
+        }, headers={'Idempotency-Key': key}, REMOTE_ADDR=ip)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.register('key-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.register('key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Contestant.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.register('key-1')
+        response = self.register('key-1', email='other@festival.test')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Contestant.objects.count(), 1)
+
+    def test_retry_while_the_first_request_runs(self):
+        self.register('key-1')
+        key = _cache_key('ip:127.0.0.1', '/api/contestants/', 'key-1')
+        cache.set(key, {**cache.get(key), 'status': 'in-progress'})
+        response = self.register('key-1')
+        self.assertEqual(response.status_code, 409)
+        # A different body is reported as such even while the first one runs
+        response = self.register('key-1', email='other@festival.test')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Contestant.objects.count(), 1)
+
+    def test_client_errors_are_replayed(self):
+        Contestant.objects.create(
+            full_name='Taken', email='new@festival.test', state='Kerala', gender='Female',
+            group=self.group, category=self.category, course='BA English', phone_number='9000000001',
+        )
+        with self.assertLogs('django.request', 'WARNING'):
+            first = self.register('key-1')
+            retry = self.register('key-1')
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_keys_are_per_client(self):
+        self.assertEqual(self.register('key-1').status_code, 201)
+        response = self.register('key-1', email='other@festival.test', ip='203.0.113.9')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Contestant.objects.count(), 2)
+
+
+class FestivalDataTests(TestCase):
+    SIZE = ['--contestants', '60', '--events', '12', '--gallery-images', '5', '--carousel-images', '2']
+
+    def generate(self, *args):
+        from django.core.management import call_command
+
+        call_command('generate_festival_data', *self.SIZE, *args, stdout=io.StringIO())
+        # Every column but the creation times
+        columns = lambda model: [
+            field.attname for field in model._meta.concrete_fields if not isinstance(field, DateTimeField)
+        ]
+        return {
+            model.__name__: list(model.objects.order_by('pk').values_list(*columns(model)))
+            for model in (Group, Category, Event, Event.categories.through, Contestant, Registration, Result,
+                          GalleryImage, CarouselImage)
+        }
+
+    def test_the_same_seed_generates_the_same_festival(self):
+        from django.core.management.base import CommandError
+
+        first = self.generate('--seed', '5')
+        self.assertEqual(len(first['Contestant']), 60)
+        self.assertTrue(first['Result'])
+        with self.assertRaises(CommandError):
+            self.generate('--seed', '5')
+
+        self.assertEqual(self.generate('--seed', '5', '--clear', '--noinput'), first)
+        other = self.generate('--seed', '6', '--clear', '--noinput')
+        self.assertNotEqual(other['Contestant'], first['Contestant'])
+        self.assertNotEqual(other['Result'], first['Result'])
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(FestivalSize(contestants=40, events=8, gallery_images=2, carousel_images=1), seed=4)
+
+    def run_benchmarks(self, *args):
+        from unittest import mock
+
+        from django.core.management import call_command
+
+        output = io.StringIO()
+        # The test runner has set up the test environment and database already
+        with mock.patch('api.management.commands.run_benchmarks.setup_test_environment'), \
+                mock.patch('api.management.commands.run_benchmarks.teardown_test_environment'):
+            call_command('run_benchmarks', '--use-existing', '--warmup', '1', '--iterations', '4',
+                         '--scenario', 'api.points', '--scenario', 'api.groups', *args, stdout=output)
+        return output.getvalue()
+
+    def test_report(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'benchmarks.json')
+        self.run_benchmarks('--output', path)
+        with open(path) as f:
+            report = json.load(f)
+
+        self.assertEqual(set(report['scenarios']), {'api.points', 'api.points.breakdown', 'api.groups'})
+        stats = report['scenarios']['api.points']
+        self.assertEqual(stats['iterations'], 4)
+        self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+        self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertGreater(stats['bytes'], 0)
+        self.assertEqual(report['meta']['database'], connection.vendor)
+        self.assertIsNone(report['meta']['seed'])
+
+    def test_compare_fails_on_regressions(self):
+        from django.core.management.base import CommandError
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'baseline.json')
+        baseline = {'p50_ms': 0.001, 'queries': 0}
+        with open(path, 'w') as f:
+            json.dump({'meta': {}, 'scenarios': {'api.groups': baseline}}, f)
+
+        output = self.run_benchmarks('--compare', path)
+        self.assertIn('api.groups', output.split('Compared with')[1])
+        with self.assertRaisesMessage(CommandError, 'api.groups'):
+            self.run_benchmarks('--compare', path, '--max-regression', '10')
+
+    def test_scenario_selection(self):
+        from django.core.management.base import CommandError
+
+        from .management.commands.run_benchmarks import Command
+
+        scenarios = {'api.points': None, 'api.points.breakdown': None, 'api.groups': None}
+        self.assertEqual(list(Command.select(scenarios, ['api.points'])), ['api.points', 'api.points.breakdown'])
+        self.assertIs(Command.select(scenarios, None), scenarios)
+        with self.assertRaisesMessage(CommandError, 'No scenario matches api.nothing'):
+            Command.select(scenarios, ['api.nothing'])
+
+
+class PointsBreakdownTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(FestivalSize(contestants=200, events=20, gallery_images=0, carousel_images=0), seed=2)
+
+    def expected_totals(self, **filters):
+        totals = {}
+        for result in Result.objects.filter(**filters).select_related('registration__contestant'):
+            group_id = result.registration.contestant.group_id
+            totals[group_id] = totals.get(group_id, 0) + result.points
+        return {group_id: points for group_id, points in totals.items() if points}
+
+    def totals(self, **filters):
+        return {row['group_id']: row['points'] for row in breakdown_standings(**filters)['totals'] if row['points']}
+
+    def test_matches_the_results(self):
+        category = Category.objects.first()
+        self.assertEqual(self.totals(), self.expected_totals())
+        self.assertEqual(
+            self.totals(category=category.pk, gender='Female'),
+            self.expected_totals(registration__contestant__category=category,
+                                 registration__contestant__gender='Female'),
+        )
+        standings = breakdown_standings(top=1)['standings']
+        self.assertTrue(standings)
+        self.assertTrue(all(len(standing['groups']) == 1 for standing in standings))
+
+    def test_publishing_refreshes_only_that_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            points_breakdown()
+        registration = Registration.objects.filter(results__isnull=True).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.create(registration=registration, position=1, points=50)
+
+        with CaptureQueriesContext(connection) as queries:
+            points_breakdown()
+        aggregations = [query['sql'] for query in queries if 'api_result' in query['sql']]
+        self.assertEqual(len(aggregations), 1)
+        self.assertIn(f'IN ({registration.event_id})', aggregations[0])
+        self.assertEqual(self.totals(), self.expected_totals())
+
+    def test_endpoint(self):
+        response = self.client.get('/api/points/breakdown/', {'gender': 'Female', 'top': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(standing['gender'] == 'Female' for standing in response.json()['standings']))
+        self.assertEqual(self.client.get('/api/points/breakdown/', {'gender': 'Other'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/points/breakdown/', {'top': 0}).status_code, 400)
+
+
+class EventResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(FestivalSize(contestants=200, events=20, gallery_images=0, carousel_images=0), seed=3)
+        cls.event = Event.objects.filter(registration__results__isnull=False).first()
+        cls.other = Event.objects.filter(registration__results__isnull=False).exclude(pk=cls.event.pk).first()
+
+    def get_results(self, event):
+        response = self.client.get(f'/api/events/{event.pk}/results/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ordered_results_with_names(self):
+        data = self.get_results(self.event)
+        expected = list(
+            Result.objects.filter(registration__event=self.event)
+            .order_by('position', 'display_order', 'id')
+            .values_list('registration__contestant__full_name', 'points')
+        )
+        self.assertEqual([(row['contestant_name'], row['points']) for row in data['results']], expected)
+        self.assertEqual(data['event']['name'], self.event.name)
+        self.assertIsNone(data['posters'])
+        self.assertEqual(self.client.get('/api/events/0/results/').status_code, 404)
+
+    def test_cached_per_event(self):
+        self.get_results(self.event)
+        self.get_results(self.other)
+        result = Result.objects.filter(registration__event=self.other).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            result.points += 10
+            result.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_results(self.event)
+        self.assertFalse([query for query in queries if 'api_result' in query['sql']])
+        data = self.get_results(self.other)
+        self.assertIn(result.points, [row['points'] for row in data['results'] if row['id'] == result.pk])
+
+    def assertCached(self, event):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_results(event)
+        self.assertFalse([query for query in queries if 'api_result' in query['sql']])
+        return data
+
+    def test_sign_ups_keep_results_and_posters_cached(self):
+        from .event_results import poster_cache_key
+
+        self.get_results(self.event)
+        posters_key = poster_cache_key(self.event.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            contestant = Contestant.objects.create(
+                full_name='New Contestant', email='new@festival.test', state='Kerala', gender='Female',
+                group=Group.objects.first(), course='BA English', phone_number='9000000000',
+            )
+            Registration.objects.create(contestant=contestant, event=self.event)
+        self.assertCached(self.event)
+        self.assertEqual(poster_cache_key(self.event.pk), posters_key)
+
+    def test_renamed_winner_refreshes_their_events(self):
+        self.get_results(self.event)
+        self.get_results(self.other)
+        contestant = (
+            Contestant.objects.filter(registration__event=self.other, registration__results__isnull=False)
+            .exclude(registration__event=self.event).first()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            contestant.full_name = 'Renamed Winner'
+            contestant.save()
+        self.assertCached(self.event)
+        data = self.get_results(self.other)
+        self.assertIn('Renamed Winner', [row['contestant_name'] for row in data['results']])
+
+    def test_by_number(self):
+        number = Result.objects.filter(registration__event=self.event).values_list('resultNumber', flat=True).first()
+        response = self.client.get(f'/api/results/by-number/{int(number)}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['event']['id'] for event in response.json()['events']], [self.event.pk])
+        self.assertEqual(self.client.get('/api/results/by-number/999/').status_code, 404)
+
+
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+        cls.other_group = Group.objects.create(name='School of Law')
+        cls.event = Event.objects.create(name='Poetry')
+        cls.contestants = [
+            Contestant.objects.create(
+                full_name=f'Contestant {n}', email=f'c{n}@festival.test', state='Kerala', gender='Female',
+                group=group, course='BA English', phone_number='9000000000',
+            )
+            for n, group in enumerate([cls.group, cls.other_group])
+        ]
+        cls.registrations = [
+            Registration.objects.create(contestant=contestant, event=cls.event) for contestant in cls.contestants
+        ]
+
+    def publish(self, points):
+        # What the admin results form does
+        points_before = event_group_points(self.event)
+        Result.objects.filter(registration__event=self.event).delete()
+        for position, (registration, value) in enumerate(zip(self.registrations, points), start=1):
+            Result.objects.create(registration=registration, position=position, points=value, resultNumber='07')
+        return record_publication(self.event, points_before, '07')
+
+    def changes(self, since):
+        response = self.client.get('/api/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_feed(self):
+        first = self.publish([5, 3])
+        data = self.changes(0)
+        self.assertEqual(data['latest'], first.pk)
+        self.assertEqual([event['event']['id'] for event in data['events']], [self.event.pk])
+        self.assertEqual({row['group_name']: row['delta'] for row in data['points_delta']},
+                         {'School of Letters': 5, 'School of Law': 3})
+
+        # A correction only sends the difference
+        self.publish([3, 5])
+        data = self.changes(first.pk)
+        self.assertEqual(len(data['changes']), 1)
+        self.assertEqual({row['group_name']: row['delta'] for row in data['points_delta']},
+                         {'School of Letters': -2, 'School of Law': 2})
+        self.assertEqual(self.changes(data['latest'])['changes'], [])
+
+    def test_invalid_parameters(self):
+        for params, key in (({'since': 'x'}, 'since'), ({'since': -1}, 'since'),
+                            ({'limit': 'x'}, 'limit'), ({'limit': 0}, 'limit')):
+            with self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get('/api/changes/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(response.json()), [key])
+
+    def test_cleared_log_starts_over(self):
+        self.publish([5, 3])
+        data = self.changes(ResultChange.objects.get().pk + 10)
+        self.assertTrue(data['reset'])
+        self.assertEqual(len(data['changes']), 1)
+
+
+class ChangeTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+        cls.category = Category.objects.create(name='Category A')
+        cls.event = Event.objects.create(name='Poetry')
+
+    def etag(self, path):
+        response = self.client.get(path, {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertBumps(self, model, change):
+        version = get_version(model_namespace(model))
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertGreater(get_version(model_namespace(model)), version)
+
+    def test_save_bumps_the_namespace_and_the_etag(self):
+        etag = self.etag('/api/groups/')
+        self.group.name = 'School of Languages'
+        self.assertBumps(Group, self.group.save)
+        self.assertNotEqual(self.etag('/api/groups/'), etag)
+
+    def test_delete_bumps_the_namespace_and_the_etag(self):
+        etag = self.etag('/api/categories/')
+        self.assertBumps(Category, self.category.delete)
+        self.assertNotEqual(self.etag('/api/categories/'), etag)
+
+    def test_m2m_and_proxy_changes(self):
+        self.assertBumps(Event, lambda: self.event.categories.add(self.category))
+        contestant = Contestant.objects.create(
+            full_name='New Contestant', email='new@festival.test', state='Kerala', gender='Female',
+            group=self.group, course='BA English', phone_number='9000000000',
+        )
+        champion = IndividualChampion.objects.get(pk=contestant.pk)
+        champion.full_name = 'Renamed'
+        self.assertBumps(Contestant, champion.save)
+
+    def test_untracked_models_are_fast_deleted(self):
+        from django.contrib.sessions.models import Session
+        from django.db.models.deletion import Collector
+
+        self.assertTrue(Collector(using='default').can_fast_delete(Session.objects.all()))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+
+    def setUp(self):
+        self.changed_at(1_700_000_000)
+
+    def changed_at(self, timestamp):
+        cache.set(LAST_CHANGED_KEY.format(model_namespace(Group)), timestamp, None)
+
+    def get(self, **headers):
+        headers = {name.replace('_', '-'): value for name, value in headers.items()}
+        return self.client.get('/api/groups/', {'format': 'json'}, headers=headers)
+
+    def test_if_none_match(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(response['Last-Modified'], 'Tue, 14 Nov 2023 22:13:20 GMT')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+        # Answered from the last-changed time, without running the view
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.get(If_None_Match=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse([query for query in queries if Group._meta.db_table in query['sql']])
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified['Cache-Control'], response['Cache-Control'])
+
+        self.changed_at(1_700_000_060)
+        self.assertEqual(self.get(If_None_Match=response['ETag']).status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.get()['Last-Modified']
+        self.assertEqual(self.get(If_Modified_Since=last_modified).status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since='Tue, 14 Nov 2023 22:13:19 GMT').status_code, 200)
+
+        self.changed_at(1_700_000_060)
+        response = self.get(If_Modified_Since=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], 'Tue, 14 Nov 2023 22:14:20 GMT')
+
+
+def image_file(name, size=(96, 64), fmt='PNG', **save_options):
+    """An uploaded image file with a diagonal gradient, so it has a non-trivial hash."""
+    from PIL import Image
+
+    width, height = size
+    image = Image.new('RGB', size)
+    image.putdata([((x * 255) // width, (y * 255) // height, (x + y) % 256)
+                   for y in range(height) for x in range(width)])
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ImageUrlTests(TestCase):
+    def test_variant_urls(self):
+        url = 'https://res.cloudinary.com/demo/image/upload/v1/gallery/stage.webp'
+        self.assertEqual(build_variant_urls(url), {
+            name: f'https://res.cloudinary.com/demo/image/upload/c_limit,w_{width},f_auto,q_auto/v1/gallery/stage.webp'
+            for name, width in IMAGE_VARIANT_WIDTHS.items()
+        })
+        self.assertEqual(build_variant_urls('/media/gallery_images/stage.webp'), {})
+        self.assertEqual(build_variant_urls(''), {})
+
+    def test_cache_is_invalidated_after_the_url_is_stored(self):
+        version = get_version(gallery_year_namespace(2024))
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = GalleryImage.objects.create(
+                caption='Stage', year=2024, image='gallery_images/stage.webp',
+                cloudinary_url='https://res.cloudinary.com/demo/image/upload/stage.webp',
+            )
+            self.assertEqual(get_version(gallery_year_namespace(2024)), version)
+        # By the time the listing's version changes, the row has its URLs
+        stored = GalleryImage.objects.values_list('image_url', 'image_variants').get(pk=image.pk)
+        self.assertEqual(stored, (image.cloudinary_url, build_variant_urls(image.cloudinary_url)))
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version(gallery_year_namespace(2024)), version)
+
+    @override_settings(CLOUDINARY_STORAGE={'CLOUD_NAME': 'demo'})
+    def test_backfill_resumes_where_it_stopped(self):
+        from django.core.management import call_command
+
+        images = GalleryImage.objects.bulk_create(
+            GalleryImage(caption=f'Stage {n}', year=2024, image=f'gallery_images/stage{n}.webp') for n in range(5)
+        )
+        # A run that was interrupted after the first two
+        GalleryImage.objects.filter(pk__lte=images[1].pk).update(image_url='https://cdn.test/resolved.webp')
+
+        output = io.StringIO()
+        call_command('backfill_image_urls', model=['gallery'], batch_size=2, stdout=output)
+        self.assertIn('Backfilling 3 gallery images', output.getvalue())
+        self.assertIn('Finished gallery images: 3 updated.', output.getvalue())
+        stored = list(GalleryImage.objects.order_by('pk').values_list('image_url', flat=True))
+        self.assertEqual(stored, ['https://cdn.test/resolved.webp'] * 2 + [
+            f'https://res.cloudinary.com/demo/image/upload/gallery_images/stage{n}' for n in range(2, 5)
+        ])
+        self.assertEqual(GalleryImage.objects.get(pk=images[4].pk).image_variants, build_variant_urls(stored[4]))
+
+        output = io.StringIO()
+        call_command('backfill_image_urls', model=['gallery'], start_after=images[3].pk, force=True, stdout=output)
+        self.assertIn('Backfilling 1 gallery images', output.getvalue())
+        self.assertIn('0 updated', output.getvalue())
+
+    @override_settings(CLOUDINARY_STORAGE={'CLOUD_NAME': 'demo'})
+    def test_backfill_invalidates_the_cached_listings(self):
+        from django.core.management import call_command
+
+        GalleryImage.objects.bulk_create([GalleryImage(caption='Stage', year=2024, image='gallery_images/stage.webp')])
+        CarouselImage.objects.bulk_create([CarouselImage(title='Opening', image='carousel_images/opening.webp')])
+        namespaces = [gallery_year_namespace(2024), gallery_year_namespace(None), model_namespace(CarouselImage)]
+        before = [get_version(namespace) for namespace in namespaces]
+        modified = last_changed(GalleryImage)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_image_urls', stdout=io.StringIO())
+        after = [get_version(namespace) for namespace in namespaces]
+        self.assertTrue(all(new > old for new, old in zip(after, before)), (before, after))
+        self.assertGreater(last_changed(GalleryImage), modified)
+
+        # Nothing changed, nothing to invalidate
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_image_urls', force=True, stdout=io.StringIO())
+        self.assertEqual([get_version(namespace) for namespace in namespaces], after)
+
+
+class ImagingTests(SimpleTestCase):
+    def open(self, data):
+        from PIL import Image
+
+        return Image.open(io.BytesIO(data))
+
+    def test_preprocess_image(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+        original = image_file('stage.jpg', size=(300, 200), fmt='JPEG', exif=exif.tobytes()).read()
+
+        processed = preprocess_image(original, 'uploads/stage.jpg', max_edge=150, thumbnail_edge=30, quality=80)
+        self.assertEqual(processed.name, 'stage.webp')
+        self.assertEqual(processed.original_size, len(original))
+        self.assertEqual(len(processed.phash), 16)
+        with self.open(processed.data) as image:
+            self.assertEqual(image.format, 'WEBP')
+            # Turned upright, scaled to the long edge and stripped of its EXIF
+            self.assertEqual(image.size, (100, 150))
+            self.assertNotIn(0x0112, image.getexif())
+        with self.open(processed.thumbnail) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (20, 30))
+
+    def test_small_images_are_not_enlarged(self):
+        processed = preprocess_image(image_file('stage.png').read(), 'stage.png', 150, 30, 80)
+        with self.open(processed.data) as image:
+            self.assertEqual(image.size, (96, 64))
+
+    def test_unreadable_images_are_kept(self):
+        with self.assertLogs('api.imaging', 'WARNING'):
+            processed = preprocess_image(b'not an image', 'stage.heic', 150, 30, 80)
+        self.assertEqual(processed, ProcessedImage('stage.heic', b'not an image', None, 12))
+
+    def test_preprocess_files_keeps_the_input_order(self):
+        files = [image_file(f'{number}.png', size=(40 + number, 30)) for number in range(3)]
+        processed = list(preprocess_files(files, workers=1))
+        self.assertEqual([image.name for image in processed], ['0.webp', '1.webp', '2.webp'])
+        for number, image in enumerate(processed):
+            with self.open(image.data) as decoded:
+                self.assertEqual(decoded.size, (40 + number, 30))
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        # The shared index outlives each test's rolled back rows
+        gallery_hash_index._table = None
+
+    def add_image(self, phash, **fields):
+        return GalleryImage.objects.create(
+            caption='Stage', year=2024, image='gallery_images/stage.webp',
+            cloudinary_url='https://res.cloudinary.com/demo/image/upload/stage.webp', phash=phash, **fields,
+        )
+
+    def test_multi_index_search(self):
+        table = MultiIndexHashTable(max_distance=3)
+        table.add(0b1111, 'a')
+        table.add(0b1111 << 40, 'b')
+        table.add(0b0111, 'c')
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.search(0b1111), [(0, 'a'), (1, 'c')])
+        self.assertEqual(table.search(0b1111, max_distance=0), [(0, 'a')])
+        # Beyond the table's own distance nothing more is found
+        self.assertEqual(table.search(0, max_distance=10), [(3, 'c')])
+
+    def test_add_before_the_first_lookup(self):
+        index = GalleryHashIndex()
+        image = self.add_image('00000000000000ff')
+        index.add(image.pk, image.phash)
+        self.assertEqual(index.find('00000000000000fe'), [image.pk])
+
+    def test_replaced_hash_reaches_other_processes(self):
+        image = self.add_image('00000000000000ff')
+        other = GalleryHashIndex()
+        self.assertEqual(other.find('00000000000000ff'), [image.pk])
+
+        version = get_version(REHASH_NAMESPACE)
+        image.phash = 'ff00000000000000'
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        self.assertGreater(get_version(REHASH_NAMESPACE), version)
+        other.refresh()
+        self.assertEqual(other.find('ff00000000000000'), [image.pk])
+        self.assertEqual(other.find('00000000000000ff'), [])
+
+    @override_settings(GALLERY_HASH_REFRESH_INTERVAL=60)
+    def test_lookups_stay_in_memory(self):
+        image = self.add_image('00000000000000ff')
+        index = GalleryHashIndex()
+        self.assertEqual(index.find('00000000000000ff'), [image.pk])
+
+        with self.assertNumQueries(0):
+            for _ in range(100):
+                self.assertEqual(index.find('00000000000000fe'), [image.pk])
+        # Another process's new image shows after the next refresh
+        other = self.add_image('0f0000000000000f')
+        self.assertEqual(index.find('0f0000000000000f'), [])
+        index.refresh()
+        self.assertEqual(index.find('0f0000000000000f'), [other.pk])
+
+    def test_changes_made_here_are_indexed_at_once(self):
+        gallery_hash_index.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            image = self.add_image('00000000000000ff')
+        with self.settings(GALLERY_HASH_REFRESH_INTERVAL=60), self.assertNumQueries(0):
+            self.assertEqual(gallery_hash_index.find('00000000000000ff'), [image.pk])
+
+        version = get_version(REHASH_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        with self.settings(GALLERY_HASH_REFRESH_INTERVAL=60), self.assertNumQueries(0):
+            self.assertEqual(gallery_hash_index.find('00000000000000ff'), [])
+        self.assertGreater(get_version(REHASH_NAMESPACE), version)
+
+    def test_a_batch_refreshes_once(self):
+        from unittest import mock
+
+        build = lambda name: GalleryImage(caption=name, year=2024)
+        files = [image_file(f'{number}.png', size=(60 + number, 40)) for number in range(3)]
+        with mock.patch.object(gallery_hash_index, 'refresh', wraps=gallery_hash_index.refresh) as refresh:
+            list(build_instances(files, build, preprocess=True, duplicates='flag'))
+        refresh.assert_called_once_with()
+
+    def build(self, duplicates, skipped=None):
+        build = lambda name: GalleryImage(caption=name, year=2024)
+        files = [image_file('stage.png')]
+        return list(build_instances(files, build, preprocess=True, duplicates=duplicates, skipped=skipped))
+
+    def test_build_instances_flags_and_skips_duplicates(self):
+        [new] = self.build('allow')
+        self.assertEqual(new.image.name, 'stage.webp')
+        self.assertIsNone(new.duplicate_of_id)
+        existing = self.add_image(new.phash)
+
+        [flagged] = self.build('flag')
+        self.assertEqual(flagged.duplicate_of_id, existing.pk)
+
+        skipped = []
+        self.assertEqual(self.build('skip', skipped), [])
+        self.assertEqual(skipped, ['stage.webp'])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='School of Letters')
+        cls.event = Event.objects.create(name='Poetry Recitation')
+        cls.anjali, cls.arjun = [
+            Contestant.objects.create(
+                full_name=name, email=f'{name.split()[0].lower()}@festival.test', state='Kerala',
+                gender='Female', group=cls.group, course='BA English', phone_number='9000000000',
+            )
+            for name in ('Anjali Menon', 'Arjun Nair')
+        ]
+        cls.registration = Registration.objects.create(contestant=cls.anjali, event=cls.event)
+        Result.objects.create(registration=cls.registration, position=1, points=5, resultNumber='07')
+
+    def matches(self, query, **kwargs):
+        return set(match_contestants(Contestant.objects.all(), query, **kwargs))
+
+    def fts_rowids(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [f'"{query}"'])
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_fts_table_follows_the_contestants(self):
+        if connection.vendor != 'sqlite' or not has_fts_table(connection.alias):
+            self.skipTest('No FTS5 table on this database')
+        self.assertEqual(self.fts_rowids('menon'), {self.anjali.pk})
+        self.assertEqual(self.fts_rowids('festival.test'), {self.anjali.pk, self.arjun.pk})
+
+        self.anjali.full_name = 'Anjali Pillai'
+        self.anjali.save()
+        self.assertEqual(self.fts_rowids('menon'), set())
+        self.assertEqual(self.fts_rowids('pillai'), {self.anjali.pk})
+
+        pk = self.arjun.pk
+        self.arjun.delete()
+        self.assertEqual(self.fts_rowids('nair'), set())
+        self.assertEqual(self.fts_rowids('festival.test'), {self.anjali.pk})
+
+        Contestant.objects.create(
+            full_name='Nila Varma', email='nila@festival.test', state='Kerala', gender='Female',
+            group=self.group, course='BA English', phone_number='9000000000',
+        )
+        self.assertEqual(len(self.fts_rowids('varma')), 1)
+        self.assertNotIn(pk, self.fts_rowids('festival.test'))
+
+    def test_short_queries_fall_back_to_icontains(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.matches('ar', fields=('full_name',)), {self.arjun})
+        self.assertNotIn(FTS_TABLE, queries[-1]['sql'])
+        self.assertEqual(self.matches('MENON'), {self.anjali})
+        self.assertEqual(self.matches('arjun@'), {self.arjun})
+
+    def test_admin_search(self):
+        from django.contrib import admin
+
+        from .admin import ContestantAdmin, RegistrationAdmin
+
+        request = RequestFactory().get('/admin/')
+        contestant_admin = ContestantAdmin(Contestant, admin.site)
+        found, distinct = contestant_admin.get_search_results(request, Contestant.objects.all(), ' nair ')
+        self.assertEqual(list(found), [self.arjun])
+        self.assertFalse(distinct)
+        found, _ = contestant_admin.get_search_results(request, Contestant.objects.all(), '')
+        self.assertEqual(found.count(), 2)
+
+        registration_admin = RegistrationAdmin(Registration, admin.site)
+        for term in ('menon', 'recitation'):
+            found, _ = registration_admin.get_search_results(request, Registration.objects.all(), term)
+            self.assertEqual(list(found), [self.registration])
+        found, _ = registration_admin.get_search_results(request, Registration.objects.all(), 'nair')
+        self.assertEqual(list(found), [])
+
+    def test_endpoint(self):
+        data = self.client.get('/api/search/', {'q': 'anjali'}).json()
+        self.assertEqual([row['id'] for row in data['contestants']], [self.anjali.pk])
+        self.assertEqual(len(data['results']), 1)
+        data = self.client.get('/api/search/', {'q': '07'}).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'a'}).json()['contestants'], [])
+
+        for limit in ('0', '-1', 'ten'):
+            response = self.client.get('/api/search/', {'q': 'anjali', 'limit': limit})
+            self.assertEqual(response.status_code, 400)
+
+
+class GalleryCacheTests(TestCase):
+    def add_image(self, year):
+        # The cached pages are invalidated once the change is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            return GalleryImage.objects.create(
+                caption='Stage', year=year, image='gallery_images/stage.webp',
+                cloudinary_url='https://res.cloudinary.com/demo/image/upload/stage.webp',
+            )
+
+    def listing(self, year=None):
+        response = self.client.get('/api/gallery/', {} if year is None else {'year': year})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [image['id'] for image in (data['results'] if isinstance(data, dict) else data)]
+
+    def versions(self):
+        return [get_version(gallery_year_namespace(year)) for year in (2023, 2024, None)]
+
+    def test_changes_invalidate_only_their_year(self):
+        old = self.add_image(2023)
+        self.assertEqual(self.listing(2023), [old.pk])
+        self.assertEqual(self.listing(2024), [])
+        before = self.versions()
+
+        new = self.add_image(2024)
+        after = self.versions()
+        self.assertEqual(after[0], before[0])
+        self.assertGreater(after[1], before[1])
+        self.assertGreater(after[2], before[2])
+        self.assertEqual(self.listing(2024), [new.pk])
+        self.assertEqual(self.listing(), [new.pk, old.pk])
+
+    def test_moving_an_image_invalidates_both_years(self):
+        image = self.add_image(2023)
+        self.assertEqual(self.listing(2023), [image.pk])
+        self.assertEqual(self.listing(2024), [])
+        before = self.versions()
+
+        image.year = 2024
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        self.assertTrue(all(new > old for new, old in zip(self.versions(), before)))
+        self.assertEqual(self.listing(2023), [])
+        self.assertEqual(self.listing(2024), [image.pk])
+
+    def test_query_parameters_share_the_cached_listing(self):
+        image = self.add_image(2024)
+        self.assertEqual(self.listing(2024), [image.pk])
+        key = versioned_key(gallery_year_namespace(2024), 'list')
+        self.assertIsNotNone(cache.get(key))
+
+        cache.delete(key)
+        for page in range(2, 5):
+            response = self.client.get('/api/gallery/', {'year': 2024, 'page': page})
+            self.assertEqual([row['id'] for row in response.json()], [image.pk])
+        self.assertIsNotNone(cache.get(key))
+
+    @override_settings(CACHE_COUNTER_TIMEOUT=60)
+    def test_local_counters(self):
+        caches['local'].clear()
+        self.addCleanup(caches['local'].clear)
+        image = self.add_image(2024)
+        self.listing(2024)
+
+        # A cache hit only reads the cached page
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.listing(2024), [image.pk])
+        self.assertEqual(len(queries), 1)
+
+        # Changes made here show at once, another worker's once the copy expires
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertEqual(self.listing(2024), [])
+        cache.incr(VERSION_KEY.format(gallery_year_namespace(2024)))
+        version = get_version(gallery_year_namespace(2024))
+        caches['local'].clear()
+        self.assertEqual(get_version(gallery_year_namespace(2024)), version + 1)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Enough groups for a body that compresses
+        group, *_ = Group.objects.bulk_create(Group(name=f'School of Letters {n}') for n in range(10))
+        event = Event.objects.create(name='Poetry')
+        contestant = Contestant.objects.create(
+            full_name='Anjali Menon', email='anjali@festival.test', state='Kerala', gender='Female',
+            group=group, course='BA English', phone_number='9000000000',
+        )
+        registration = Registration.objects.create(contestant=contestant, event=event)
+        Result.objects.create(registration=registration, position=1, points=5)
+        cls.image = GalleryImage.objects.create(
+            caption='Stage', year=2024, image='gallery_images/stage.webp',
+            cloudinary_url='https://res.cloudinary.com/demo/image/upload/stage.webp',
+        )
+
+    def test_points_are_cached_and_compressed(self):
+        expected = self.client.get('/api/points/').json()
+        response = self.client.get('/api/async/points/')
+        self.assertEqual(response.json(), expected)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/async/points/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse([query for query in queries if 'api_result' in query['sql']])
+
+    def test_gallery_answers_conditional_gets(self):
+        response = self.client.get('/api/async/gallery/', {'year': 2024})
+        self.assertEqual([image['id'] for image in response.json()], [self.image.pk])
+        self.assertIn('max-age=300', response['Cache-Control'])
+
+        response = self.client.get(
+            '/api/async/gallery/', {'year': 2024}, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get('/api/async/gallery/', {'year': 'next'}).status_code, 400)
+
+    async def test_middleware_runs_on_the_event_loop(self):
+        from asgiref.sync import iscoroutinefunction
+
+        from .metrics import MetricsMiddleware
+        from .routers import ReplicaRoutingMiddleware
+
+        async def view(request):
+            pass
+
+        for middleware in (RequestIdMiddleware, MetricsMiddleware, ReplicaRoutingMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(view)))
+            self.assertFalse(iscoroutinefunction(middleware(lambda request: None)))
+
+        response = await self.async_client.get('/api/async/gallery/', headers={'X-Request-ID': 'req-1'})
+        self.assertEqual(response['X-Request-ID'], 'req-1')
+        # The queries ran in another thread, and were still counted
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+
+class BulkUploadAdminTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        user = get_user_model().objects.create_superuser('admin', 'admin@festival.test', 'password')
+        self.client.force_login(user)
+
+    def test_default_instances(self):
+        from django.contrib import admin
+
+        from .forms import CarouselBulkUploadForm, GalleryBulkUploadForm
+
+        form = GalleryBulkUploadForm({'year': 2024, 'duplicates': 'skip'}, {'images': [image_file('main_stage-2.png')]})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = admin.site._registry[GalleryImage].build_bulk_instance(form, 'main_stage-2.png')
+        self.assertEqual((image.caption, image.year, image.pk), ('main stage 2', 2024, None))
+
+        form = CarouselBulkUploadForm({}, {'images': [image_file('opening.png')]})
+        self.assertTrue(form.is_valid(), form.errors)
+        slide = admin.site._registry[CarouselImage].build_bulk_instance(form, 'opening.png')
+        self.assertEqual((slide.title, slide.is_active), ('opening', False))
+
+    def test_bulk_upload_stores_and_queues(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/admin/api/carouselimage/bulk-upload/', {
+                'images': [image_file('opening.png'), image_file('closing.png')], 'is_active': 'on',
+            })
+        self.assertRedirects(response, '/admin/api/carouselimage/')
+        self.assertEqual(
+            sorted(CarouselImage.objects.filter(cloudinary_url=None).values_list('title', flat=True)),
+            ['closing', 'opening'],
+        )
+        # The Cloudinary uploads are queued for after the commit
+        self.assertIn('enqueue_uploads.<locals>.submit', [callback.__qualname__ for callback in callbacks])
+        message = str(list(response.wsgi_request._messages)[0])
+        self.assertIn('upload_images --pending', message)
+
+    def test_gallery_images_are_processed_before_the_transaction(self):
+        from unittest import mock
+
+        from .imaging import preprocess_file
+
+        depths = []
+
+        def preprocess_files(files):
+            for file in files:
+                depths.append(len(connection.atomic_blocks))
+                yield preprocess_file(file)
+
+        depth = len(connection.atomic_blocks)
+        with mock.patch('api.imaging.preprocess_files', preprocess_files), self.captureOnCommitCallbacks():
+            response = self.client.post('/admin/api/galleryimage/bulk-upload/', {
+                'images': [image_file('opening.png'), image_file('closing.png', size=(64, 96))],
+                'year': 2024, 'duplicates': 'allow',
+            })
+        self.assertRedirects(response, '/admin/api/galleryimage/')
+        self.assertEqual(depths, [depth, depth])
+        self.assertEqual(GalleryImage.objects.filter(image__endswith='.webp').count(), 2)
+
+    def test_uploads_give_the_connection_back_while_they_wait(self):
+        from unittest import mock
+
+        from .uploads import _upload_one
+
+        image = CarouselImage(title='Opening', image='carousel_images/opening.png')
+        image.save(defer_upload=True)
+        calls = mock.Mock()
+        calls.upload.side_effect = [RuntimeError('timeout'), 'https://res.cloudinary.com/demo/opening.png']
+        with mock.patch('api.uploads.connection', calls.connection), \
+                mock.patch('api.uploads.upload_model_image', calls.upload), \
+                mock.patch('api.uploads.time.sleep', calls.sleep), self.assertLogs('api.uploads', 'WARNING'):
+            self.assertTrue(_upload_one(CarouselImage, image.pk, retries=2))
+        self.assertEqual([call[0] for call in calls.mock_calls], [
+            'connection.close', 'upload', 'connection.close', 'sleep',
+            'connection.close', 'upload', 'connection.close',
+        ])
+        image.refresh_from_db()
+        self.assertEqual(image.cloudinary_url, 'https://res.cloudinary.com/demo/opening.png')
+
+
+class AddResultsAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth import get_user_model
+
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@festival.test', 'password')
+        group = Group.objects.create(name='School of Letters')
+        cls.event = Event.objects.create(name='Poetry')
+        cls.registrations = [
+            Registration.objects.create(event=cls.event, contestant=Contestant.objects.create(
+                full_name=f'Contestant {n}', email=f'c{n}@festival.test', state='Kerala', gender='Female',
+                group=group, course='BA English', phone_number='9000000000',
+            ))
+            for n in range(3)
+        ]
+        Result.objects.create(registration=cls.registrations[0], position=1, points=5, resultNumber='01')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = f'/admin/api/event/{self.event.pk}/add-results/'
+
+    def publish(self):
+        return self.client.post(self.url, {
+            'result_number': '02',
+            'winners_1': [self.registrations[1].pk], 'points_1': 5,
+            'winners_2': [self.registrations[0].pk], 'points_2': 3,
+        })
+
+    def results(self):
+        return list(Result.objects.filter(registration__event=self.event).values_list('registration', 'points'))
+
+    def test_publish(self):
+        with self.captureOnCommitCallbacks():
+            self.assertRedirects(self.publish(), '/admin/api/event/')
+        self.assertCountEqual(self.results(), [(self.registrations[1].pk, 5), (self.registrations[0].pk, 3)])
+        self.assertEqual(ResultChange.objects.get().result_number, '02')
+
+    def test_failed_publish_changes_nothing(self):
+        from unittest import mock
+
+        before = self.results()
+        with self.captureOnCommitCallbacks() as callbacks, \
+                mock.patch('api.admin.record_publication', side_effect=RuntimeError('log unavailable')):
+            with self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+                self.publish()
+        self.assertEqual(self.results(), before)
+        self.assertFalse(ResultChange.objects.exists())
+        self.assertEqual(callbacks, [])
+
+
+class ResultPickerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        group = Group.objects.create(name='School of Letters')
+        cls.event = Event.objects.create(name='Poetry')
+        cls.registrations = [
+            Registration.objects.create(event=cls.event, contestant=Contestant.objects.create(
+                full_name=f'Contestant {n}', email=f'c{n}@festival.test', state='Kerala', gender='Female',
+                group=group, course='BA English', phone_number='9000000000',
+            ))
+            for n in range(3)
+        ]
+
+    def form(self, **kwargs):
+        return EventResultForm(event=self.event, search_url='/admin/api/event/search/', **kwargs)
+
+    def widgets(self, form):
+        return {type(form.fields[name].widget) for name in ('winners_1', 'winners_3', 'non_poster_participants')}
+
+    def test_search_threshold(self):
+        with self.settings(RESULT_PICKER_SEARCH_THRESHOLD=3):
+            self.assertEqual(self.widgets(self.form()), {CheckboxSelectMultiple})
+        with self.settings(RESULT_PICKER_SEARCH_THRESHOLD=2):
+            form = self.form()
+            self.assertEqual(self.widgets(form), {RegistrationSearchWidget})
+            self.assertEqual(form.fields['winners_1'].widget.attrs['data-search-url'], '/admin/api/event/search/')
+            # Without a search endpoint every event gets checkboxes
+            self.assertEqual(self.widgets(EventResultForm(event=self.event)), {CheckboxSelectMultiple})
+
+    @override_settings(RESULT_PICKER_SEARCH_THRESHOLD=0)
+    def test_search_widget_renders_the_initial_selection(self):
+        first, second, third = self.registrations
+        # The admin passes registration ids, Registration objects work too
+        # One query for the event's registrations, shared by all the pickers
+        with self.assertNumQueries(1):
+            form = self.form(initial={'winners_1': [first.pk], 'non_poster_participants': [second]})
+            winners = str(form['winners_1'])
+            non_poster = str(form['non_poster_participants'])
+            empty = str(form['winners_2'])
+        self.assertIn(f'<option value="{first.pk}" selected>Contestant 0 (School of Letters)', winners)
+        self.assertNotIn('Contestant 1', winners)
+        self.assertIn(f'<option value="{second.pk}" selected>Contestant 1', non_poster)
+        self.assertNotIn('<option', empty)
+
+        data = {'result_number': '01', 'winners_1': [str(first.pk)], 'points_1': '5',
+                'non_poster_participants': [str(second.pk)], 'non_poster_points': '0'}
+        form = self.form(initial={'result_number': '01', 'winners_1': [first.pk], 'points_1': 5,
+                                  'non_poster_participants': [second]}, data=data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['winners_1'], [first])
+        self.assertNotIn('winners_1', form.changed_data)
+        self.assertNotIn('non_poster_participants', form.changed_data)
+        self.assertNotIn(str(third.pk), str(form['winners_1']))
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Enough groups for a points table that compresses
+        group, *_ = Group.objects.bulk_create(Group(name=f'School of Letters {n}') for n in range(10))
+        cls.event = Event.objects.create(name='Poetry')
+        contestant = Contestant.objects.create(
+            full_name='Anjali Menon', email='anjali@festival.test', state='Kerala', gender='Female',
+            group=group, course='BA English', phone_number='9000000000',
+        )
+        cls.registration = Registration.objects.create(contestant=contestant, event=cls.event)
+        Result.objects.create(registration=cls.registration, position=1, points=5, resultNumber='01')
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.enterContext(override_settings(SNAPSHOT_ROOT=self.root, SNAPSHOT_STORAGE={
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': self.root, 'base_url': '/snapshots/'},
+        }))
+
+    def test_publish_and_serve(self):
+        manifest = publish_snapshot()
+        self.assertEqual(set(manifest['files']), {
+            'points.json', 'results.json', 'winners.json', f'winners/{self.event.pk}.json',
+        })
+
+        latest = self.client.get(f'/snapshots/{LATEST_NAME}')
+        self.assertEqual(latest['Cache-Control'], 'no-cache')
+        self.assertEqual(json.loads(b''.join(latest.streaming_content))['version'], manifest['version'])
+
+        url = manifest['files']['points.json']
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.get('Content-Encoding'), 'gzip')
+        points = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(points, json.loads(json.dumps(group_points())))
+        response = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/snapshots/../settings.py').status_code, 404)
+
+    def test_old_versions_are_pruned(self):
+        versions = [publish_snapshot(keep=2)['version'] for _ in range(3)]
+        self.assertEqual(sorted(os.listdir(self.root)), sorted([LATEST_NAME, *versions[1:]]))
+
+    def test_latest_is_replaced_in_one_step(self):
+        from unittest import mock
+
+        first = publish_snapshot()
+        with mock.patch.object(FileSystemStorage, 'delete', side_effect=AssertionError('deleted')) as delete:
+            second = publish_snapshot(keep=0)
+        delete.assert_not_called()
+        with open(os.path.join(self.root, LATEST_NAME)) as f:
+            self.assertEqual(json.load(f), json.loads(json.dumps(second)))
+        self.assertEqual(sorted(os.listdir(self.root)), sorted([LATEST_NAME, first['version'], second['version']]))
+
+        # A publish that finishes after a newer one doesn't take latest back
+        with open(os.path.join(self.root, LATEST_NAME), 'w') as f:
+            json.dump({'version': '99991231T000000000000Z', 'files': {}}, f)
+        publish_snapshot()
+        with open(os.path.join(self.root, LATEST_NAME)) as f:
+            self.assertEqual(json.load(f)['version'], '99991231T000000000000Z')
+
+    def scheduled(self, change):
+        with self.settings(SNAPSHOT_ON_PUBLISH=True), self.captureOnCommitCallbacks() as callbacks:
+            change()
+        return 'schedule_snapshot.<locals>.submit' in [callback.__qualname__ for callback in callbacks]
+
+    def test_changes_schedule_a_snapshot(self):
+        contestant = self.registration.contestant
+        group = Group.objects.create(name='School of Arts')
+        self.assertTrue(self.scheduled(lambda: Group.objects.filter(pk=group.pk).get().save()))
+
+        contestant.group = group
+        self.assertTrue(self.scheduled(contestant.save))
+        self.event.name = 'Poetry Recitation'
+        self.assertTrue(self.scheduled(self.event.save))
+        self.assertTrue(self.scheduled(self.registration.save))
+        self.assertTrue(self.scheduled(lambda: Result.objects.filter(registration=self.registration).get().delete()))
+
+        # Nothing without results is in the snapshot
+        self.assertFalse(self.scheduled(contestant.save))
+        self.assertFalse(self.scheduled(self.event.save))
+        self.assertFalse(self.scheduled(self.registration.save))
+
+
+class SpaShellTests(SimpleTestCase):
+    def setUp(self):
+        from unittest import mock
+
+        from .views import SpaShell
+
+        build = tempfile.TemporaryDirectory()
+        self.addCleanup(build.cleanup)
+        self.path = os.path.join(build.name, 'index.html')
+        self.build('<div id="root"></div>')
+        self.enterContext(mock.patch('api.views.spa_shell', SpaShell(self.path)))
+
+    def build(self, body):
+        with open(self.path, 'w') as f:
+            f.write(f'<!doctype html><html><body>{body * 50}</body></html>')
+
+    def test_variants_share_a_weak_etag(self):
+        plain = self.client.get('/')
+        compressed = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertTrue(plain['ETag'].startswith('W/"'))
+        self.assertEqual(compressed['ETag'], plain['ETag'])
+
+        response = self.client.get('/', headers={'If-None-Match': plain['ETag'], 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_a_new_build_changes_the_etag(self):
+        etag = self.client.get('/')['ETag']
+        self.build('<div id="app"></div>')
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 1))
+        response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(b'<div id="app">', response.content)
+
+
+class LoggingTests(SimpleTestCase):
+    def setUp(self):
+        # Loggers only get the request id through the console handler's
+        # filter, which assertLogs replaces
+        self.logger = logging.getLogger('api.tests.log')
+        request_id_filter = RequestIdFilter()
+        self.logger.addFilter(request_id_filter)
+        self.addCleanup(self.logger.removeFilter, request_id_filter)
+
+    def logging_middleware(self, response=None):
+        def get_response(request):
+            self.logger.warning('Handling %s', request.path)
+            if response is None:
+                raise RuntimeError('view failed')
+            return response
+        return RequestIdMiddleware(get_response)
+
+    def test_request_id_header(self):
+        # A page that needs no database, and whose 404 is logged
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get('/missing/', headers={'X-Request-ID': 'edge-1.a_b'})
+            self.assertEqual(response['X-Request-ID'], 'edge-1.a_b')
+
+            generated = {self.client.get('/missing/', headers=headers)['X-Request-ID']
+                         for headers in ({}, {'X-Request-ID': 'not valid!'}, {'X-Request-ID': 'x' * 65})}
+        self.assertEqual(len(generated), 3)
+        for value in generated:
+            self.assertRegex(value, r'^[0-9a-f]{32}$')
+
+    def test_records_carry_the_request_id(self):
+        from django.http import HttpResponse
+
+        request = RequestFactory().get('/api/points/', headers={'X-Request-ID': 'edge-1'})
+        with self.assertLogs('api.tests.log', 'WARNING') as logs:
+            response = self.logging_middleware(HttpResponse())(request)
+        self.assertEqual(response['X-Request-ID'], 'edge-1')
+        self.assertEqual(request.request_id, 'edge-1')
+        self.assertEqual([(record.getMessage(), record.request_id) for record in logs.records],
+                         [('Handling /api/points/', 'edge-1')])
+        self.assertEqual(request_id.get(), '-')
+
+        # Reset when the view fails too
+        with self.assertLogs('api.tests.log', 'WARNING'), self.assertRaises(RuntimeError):
+            self.logging_middleware()(RequestFactory().get('/api/points/'))
+        self.assertEqual(request_id.get(), '-')
+
+    def test_async_requests(self):
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from django.http import HttpResponse
+
+        async def get_response(request):
+            self.logger.warning('Handling %s', request.path)
+            return HttpResponse()
+
+        middleware = RequestIdMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/api/async/points/', headers={'X-Request-ID': 'edge-2'})
+        with self.assertLogs('api.tests.log', 'WARNING') as logs:
+            response = async_to_sync(middleware)(request)
+        self.assertEqual(response['X-Request-ID'], 'edge-2')
+        self.assertEqual(logs.records[0].request_id, 'edge-2')
+
+    def record(self, msg, *args, exc_info=None):
+        record = self.logger.makeRecord('api.tests.log', logging.ERROR, __file__, 1, msg, args, exc_info)
+        record.request_id = 'edge-3'
+        return record
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError('bad points')
+        except ValueError:
+            record = self.record('Scoring %s failed', 'Poetry', exc_info=sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(
+            {key: entry[key] for key in ('level', 'logger', 'request_id', 'message')},
+            {'level': 'ERROR', 'logger': 'api.tests.log', 'request_id': 'edge-3', 'message': 'Scoring Poetry failed'},
+        )
+        self.assertIn('ValueError: bad points', entry['exception'])
+        self.assertIn('time', entry)
+
+    def test_queue_handler_prepares_a_copy(self):
+        handler = QueueStreamHandler.__new__(QueueStreamHandler)  # No listener thread
+        groups = ['Letters']
+        try:
+            raise ValueError('bad points')
+        except ValueError:
+            record = self.record('Groups %s', groups, exc_info=sys.exc_info())
+        prepared = handler.prepare(record)
+        groups.append('Arts')
+
+        self.assertIsNot(prepared, record)
+        self.assertEqual((prepared.msg, prepared.args, prepared.exc_info), ("Groups ['Letters']", None, None))
+        self.assertIn('ValueError: bad points', prepared.exc_text)
+        self.assertEqual(prepared.request_id, 'edge-3')
+        # The caller's record is left as it was
+        self.assertEqual(record.args, (groups,))
+        self.assertIsNotNone(record.exc_info)
+        # The traceback survives the trip to the listener thread
+        self.assertIn('ValueError: bad points', json.loads(JsonFormatter().format(prepared))['exception'])
+
+    def test_queue_handler_writes_from_its_thread(self):
+        import threading
+        import time
+
+        stream = io.StringIO()
+        handler = QueueStreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        threads = []
+        handler._stream_handler.emit = lambda record, emit=handler._stream_handler.emit: (
+            threads.append(threading.current_thread()), emit(record)
+        )
+        handler.handle(self.record('Published %s', 'Poetry'))
+        deadline = time.monotonic() + 5
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(json.loads(stream.getvalue())['message'], 'Published Poetry')
+        self.assertNotEqual(threads, [threading.current_thread()])
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth import get_user_model
+
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@festival.test', 'password')
+        cls.user = get_user_model().objects.create_user('visitor', 'visitor@festival.test', 'password')
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+
+    def test_admins_only(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+            self.client.force_login(self.user)
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+            self.assertEqual(self.client.delete('/api/metrics/').status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/api/metrics/').json()['pid'], os.getpid())
+
+    def test_percentiles(self):
+        stats = RouteStats(samples=100)
+        for ms in range(1, 101):
+            metrics = RequestMetrics()
+            metrics.queries, metrics.db_time = ms % 4, ms / 2000
+            stats.add(ms / 1000, metrics, 500 if ms > 98 else 200)
+        summary = stats.summary()
+        self.assertEqual((summary['count'], summary['errors'], summary['samples']), (100, 2, 100))
+        self.assertEqual(summary['duration_ms'], {'p50': 51.0, 'p95': 96.0, 'p99': 100.0})
+        self.assertEqual(summary['db_ms'], {'p50': 25.5, 'p95': 48.0, 'p99': 50.0})
+        self.assertEqual(summary['queries'], {'mean': 1.5, 'p95': 3, 'max': 3})
+
+        # Only the latest samples are kept, all requests are counted
+        stats = RouteStats(samples=10)
+        for ms in range(1, 101):
+            stats.add(ms / 1000, RequestMetrics(), 200)
+        summary = stats.summary()
+        self.assertEqual((summary['count'], summary['samples']), (100, 10))
+        self.assertEqual(summary['duration_ms']['p50'], 96.0)
+        self.assertEqual(RouteStats(samples=10).summary()['duration_ms'], {'p50': 0.0, 'p95': 0.0, 'p99': 0.0})
+
+    def test_routes_and_reset(self):
+        self.client.force_login(self.admin)
+        self.client.get('/api/groups/')
+        with self.assertLogs('django.request', 'WARNING'):
+            self.client.get('/api/events/0/')
+            self.client.get('/api/events/0/')
+            self.client.get('/api/no-such-endpoint/')
+        self.client.get('/admin/')
+
+        routes = self.client.get('/api/metrics/').json()['routes']
+        self.assertEqual(set(routes), {'GET /api/groups/', 'GET /api/events/<pk>/', 'unresolved'})
+        self.assertEqual(routes['GET /api/events/<pk>/']['count'], 2)
+
+        self.assertEqual(self.client.delete('/api/metrics/').status_code, 204)
+        self.assertEqual(set(self.client.get('/api/metrics/').json()['routes']), {'DELETE /api/metrics/'})
+
+    def test_profiles_of_slow_sampled_requests(self):
+        import pstats
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiles = os.path.join(directory.name, 'profiles')
+
+        with self.settings(PROFILE_SAMPLE_RATE=1, PROFILE_SLOW_MS=10_000, PROFILE_DIR=profiles):
+            self.client.get('/api/groups/')
+        self.assertFalse(os.path.exists(profiles))
+
+        with self.settings(PROFILE_SAMPLE_RATE=1, PROFILE_SLOW_MS=0, PROFILE_DIR=profiles, PROFILE_KEEP=2):
+            for number in range(3):
+                self.client.get('/api/groups/', headers={'X-Request-ID': f'req-{number}'})
+            # Not profiled (and not saved) outside /api/
+            self.client.get('/admin/')
+        saved = sorted(os.listdir(profiles))
+        self.assertEqual(len(saved), 2)
+        self.assertRegex(saved[0], r'^\d{7}ms-GET_api_groups-req-\d\.prof$')
+        self.assertTrue(pstats.Stats(os.path.join(profiles, saved[0])).total_calls)
+
+        with self.settings(PROFILE_SAMPLE_RATE=0, PROFILE_SLOW_MS=0, PROFILE_DIR=profiles, PROFILE_KEEP=10):
+            self.client.get('/api/groups/')
+        self.assertEqual(len(os.listdir(profiles)), 2)
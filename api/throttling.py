@@ -0,0 +1,137 @@
+"""
+Throttling and admission control for the public write endpoints
+(contestant and event registration).
+
+When registration opens, bots and double-submits can flood those endpoints.
+Two layers keep that from slowing down the rest of the site:
+
+* `WriteRateThrottle`, the default DRF throttle, limits the writes of each
+  client (by IP) per endpoint: a view's `throttle_scope` picks its rate
+  from `REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`.
+  Its counters live in the cache named by `THROTTLE_CACHE`: the default
+  cache (shared by all workers) or `local`, an in-process cache.
+* `AdmissionControlMixin`, which lets at most `ADMISSION_MAX_CONCURRENT`
+  writes (of all write endpoints together) run at once in a worker process,
+  with up to `ADMISSION_MAX_QUEUE` more waiting for a slot. A waiting write
+  holds a request thread, so the two together must stay below the worker's
+  `GUNICORN_THREADS`; anything beyond them is turned away at once, so a
+  burst can't take every thread and pooled database connection away from
+  the public pages.
+
+Both answer `429 Too Many Requests` with a `Retry-After` header.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+class WriteRateThrottle(ScopedRateThrottle):
+    """
+    `ScopedRateThrottle` for the unsafe methods only: reads of a view are
+    never throttled. The view's `throttle_scope` names its rate.
+    """
+
+    def __init__(self):
+        # Looked up per request (not at import), so the rates and cache
+        # can be changed in tests
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class AdmissionGate:
+    """
+    A bounded queue in front of a piece of work: at most `limit` callers
+    hold a slot at once and at most `queue` more wait for one.
+    """
+
+    def __init__(self, limit, queue):
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Take a slot, waiting up to `timeout` seconds. Return False if there is none."""
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + timeout
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        if self.active >= self.limit:
+                            return False
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_gate():
+    """The admission gate shared by the write endpoints of this process."""
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                limit, queue = settings.ADMISSION_MAX_CONCURRENT, settings.ADMISSION_MAX_QUEUE
+                if limit + queue >= settings.GUNICORN_THREADS:
+                    logger.warning(
+                        "ADMISSION_MAX_CONCURRENT + ADMISSION_MAX_QUEUE (%d) leaves none of the %d "
+                        "threads for reads", limit + queue, settings.GUNICORN_THREADS,
+                    )
+                _gate = AdmissionGate(limit, queue)
+    return _gate
+
+
+class AdmissionControlMixin:
+    """
+    Run the unsafe requests of a view through the process's admission gate.
+    Throttled requests are rejected before they queue.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS or not settings.ADMISSION_CONTROL:
+            return
+        gate = get_gate()
+        if not gate.acquire(settings.ADMISSION_QUEUE_TIMEOUT):
+            logger.info("Shedding %s %s: %d running, %d waiting",
+                        request.method, request.path, gate.active, gate.waiting)
+            raise Throttled(wait=settings.ADMISSION_RETRY_AFTER)
+        request.admission_gate = gate
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        gate = getattr(request, 'admission_gate', None)
+        if gate is not None:
+            request.admission_gate = None
+            gate.release()
+        return super().finalize_response(request, response, *args, **kwargs)
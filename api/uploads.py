@@ -0,0 +1,199 @@
+"""
+Cloudinary upload pipeline for gallery and carousel images.
+
+Images can be saved with `save(defer_upload=True)`, which stores the file
+and returns at once. The Cloudinary upload then runs on a bounded pool of
+worker threads (`enqueue_uploads`) or in the foreground (`upload_pending`,
+used by the `upload_images` management command). A failed upload is retried
+with backoff. If it still fails, the image is left without a `cloudinary_url`
+so it can be picked up again later.
+"""
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+
+from . import cloudinary_sdk
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.bmp', '.tif', '.tiff')
+
+_executor = None
+
+
+def upload_file(file, folder, public_id):
+    """
+    Upload a file object to Cloudinary and return its secure URL.
+
+    The file is sent in chunks rather than read into memory in one go.
+    """
+    result = cloudinary_sdk.uploader().upload_large(
+        file,
+        folder=folder,
+        public_id=public_id,
+        overwrite=True,
+        resource_type='image',
+        chunk_size=settings.CLOUDINARY_UPLOAD_CHUNK_SIZE,
+    )
+    return result.get('secure_url')
+
+
+def upload_model_image(obj):
+    """Upload the image of a GalleryImage/CarouselImage and return its URL."""
+    public_id = obj.build_public_id()
+    if obj.image._committed:
+        # Already in storage, stream it back from there
+        with obj.image.open('rb') as f:
+            return upload_file(f, obj.cloudinary_folder, public_id)
+
+    # A freshly uploaded file that Django hasn't saved yet
+    obj.image.seek(0)
+    try:
+        return upload_file(obj.image, obj.cloudinary_folder, public_id)
+    finally:
+        obj.image.seek(0)
+
+
+def _upload_one(model, pk, retries):
+    """
+    Upload a single pending image, retrying with exponential backoff.
+
+    The thread's database connection is given back while the image is
+    uploaded and while it waits to retry, so a slow upload doesn't keep a
+    pooled connection from the web requests.
+    """
+    try:
+        for attempt in range(1, retries + 1):
+            obj = model.objects.filter(pk=pk).first()
+            if obj is None or obj.cloudinary_url or not obj.image:
+                return True
+            connection.close()
+            try:
+                obj.cloudinary_url = upload_model_image(obj)
+                obj.save(update_fields=['cloudinary_url'])
+                return True
+            except Exception as e:
+                logger.warning(
+                    "Upload of %s %s failed (attempt %s/%s): %s",
+                    model._meta.model_name, pk, attempt, retries, e,
+                )
+                if attempt < retries:
+                    connection.close()
+                    time.sleep(settings.UPLOAD_RETRY_BACKOFF * 2 ** (attempt - 1))
+        return False
+    finally:
+        # Worker threads get their own DB connection, don't leak it
+        connection.close()
+
+
+def upload_pending(model, pks=None, workers=None, retries=None):
+    """
+    Upload images that have no `cloudinary_url` yet, `workers` at a time.
+
+    Uploads all pending images of the model when `pks` is None.
+    Returns a `(succeeded, failed)` tuple of primary key lists.
+    """
+    workers = workers or settings.UPLOAD_WORKERS
+    retries = retries or settings.UPLOAD_RETRIES
+    if pks is None:
+        pks = list(
+            model.objects.filter(cloudinary_url__isnull=True)
+            .exclude(image='').values_list('pk', flat=True)
+        )
+
+    succeeded, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_upload_one, model, pk, retries): pk for pk in pks}
+        for future in as_completed(futures):
+            (succeeded if future.result() else failed).append(futures[future])
+    return succeeded, failed
+
+
+def _background_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.UPLOAD_WORKERS, thread_name_prefix='image-upload'
+        )
+    return _executor
+
+
+def enqueue_uploads(model, pks):
+    """
+    Upload the given images in the background once the current transaction
+    commits, so the request that created them returns immediately.
+    """
+    pks = list(pks)
+
+    def submit():
+        executor = _background_executor()
+        for pk in pks:
+            executor.submit(_upload_one, model, pk, settings.UPLOAD_RETRIES)
+
+    transaction.on_commit(submit)
+
+
+def iter_image_files(files=(), archives=()):
+    """
+    Yield a Django `File` for every image in `files` and inside the zip
+    `archives`. Zip members are streamed, not extracted to disk.
+    """
+    for f in files:
+        if f.name.lower().endswith(IMAGE_EXTENSIONS):
+            yield f if isinstance(f, File) else File(f, name=os.path.basename(f.name))
+
+    for archive in archives:
+        with zipfile.ZipFile(archive) as zf:
+            for member in zf.infolist():
+                name = os.path.basename(member.filename)
+                if member.is_dir() or name.startswith('.') or not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                with zf.open(member) as member_file:
+                    yield File(member_file, name=name)
+
+
+def build_instances(image_files, build, preprocess=False, duplicates='allow', skipped=None):
+    """
+    Yield unsaved model instances for `image_files`.
+
+    `build(name)` returns a new instance without its image. With
+    `preprocess=True` the images go through api/imaging.py first, and
+    near-duplicates of existing gallery images (api/dedup.py) are either
+    kept (`duplicates='allow'`), marked with `duplicate_of` ('flag') or
+    left out ('skip'; their names are appended to `skipped`).
+    """
+    if preprocess:
+        from .dedup import gallery_hash_index
+        from .imaging import preprocess_files
+
+        if duplicates != 'allow':
+            # Once for the whole batch; the lookups below stay in memory
+            gallery_hash_index.refresh()
+        for processed in preprocess_files(image_files):
+            obj = build(processed.name)
+            obj.apply_processed_image(processed)
+            if duplicates != 'allow':
+                match = gallery_hash_index.find_duplicate(obj.phash)
+                if match and duplicates == 'skip':
+                    if skipped is not None:
+                        skipped.append(processed.name)
+                    continue
+                obj.duplicate_of_id = match
+            yield obj
+    else:
+        for image_file in image_files:
+            obj = build(image_file.name)
+            obj.image = image_file
+            yield obj
+
+
+def caption_from_filename(name):
+    """Turn 'stage_day-2.jpg' into 'stage day 2'."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem.replace('_', ' ').replace('-', ' ').strip()[:255] or 'Untitled'
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -17,7 +18,7 @@ from .views import (
     ping_database,
     WinnersExportView  # Add the new export view
 )
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
@@ -31,9 +32,14 @@ router.register(r'registrations', RegistrationViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/<int:event_id>/results/', views.EventResultsView.as_view(), name='event-results'),
+    path('results/by-number/<str:number>/', views.ResultsByNumberView.as_view(), name='results-by-number'),
     path('points/', PointsView.as_view(), name='points'),
+    path('points/breakdown/', views.PointsBreakdownView.as_view(), name='points-breakdown'),
     path('generate-event-posters/<int:event_id>/', GenerateEventPostersView.as_view(), name='generate-event-posters'),
     path('events-for-registration/<int:category_id>/', EventsForRegistrationView.as_view(), name='events-for-registration'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
 
     # Winners Export endpoints
     path('export-winners/', WinnersExportView.as_view(), name='export-all-winners'),
@@ -45,4 +51,25 @@ urlpatterns = [
     
     # Keep database awake endpoint
     path('ping/', ping_database, name='ping-database'),
-]
\ No newline at end of file
+    path('db-pool/', views.DatabasePoolView.as_view(), name='db-pool'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+]
+
+# Async variants of the I/O-bound views (see api/async_views.py), always
+# reachable under async/ so both paths can be benchmarked side by side
+async_urlpatterns = [
+    path('ping/', async_views.ping_database, name='async-ping-database'),
+    path('points/', async_views.points, name='async-points'),
+    path('gallery/', async_views.gallery, name='async-gallery'),
+    path('generate-event-posters/<int:event_id>/', async_views.generate_event_posters, name='async-generate-event-posters'),
+]
+urlpatterns += [path('async/', include(async_urlpatterns))]
+
+# On ASGI the async views also take over the regular URLs
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('ping/', async_views.ping_database),
+        path('points/', async_views.points),
+        path('gallery/', async_views.gallery),
+        path('generate-event-posters/<int:event_id>/', async_views.generate_event_posters),
+    ] + urlpatterns
@@ -1,26 +1,51 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db.models import Count
 from django.db.models import Q
 from django.utils import timezone
-import cloudinary.uploader
 from django.db import connection
 
-from PIL import Image, ImageDraw, ImageFont
+import functools
+import hashlib
+import logging
 import os
-import io
+import threading
 from django.conf import settings
+from whitenoise import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
 
+from .caching import (
+    CompressedResponseCacheMixin, ConditionalGetMixin, choose_encoding, compress_variants,
+    versioned_key,
+)
+from . import search
+from .changes import MAX_LIMIT as CHANGES_MAX_LIMIT, changes_since
+from .event_results import event_results, poster_cache_key, results_by_number
+from .idempotency import IdempotentCreateMixin
+from .metrics import registry as metrics_registry
 from .models import Registration
+from .routers import ReplicaReadMixin
+from .posters import generate_posters, load_poster_data
+from .scoring import breakdown_standings, group_points
+from .snapshots import LATEST_NAME
+from .throttling import AdmissionControlMixin
 from .serializers import RegistrationSerializer
+from .signals import GALLERY_YEARS_NAMESPACE, gallery_year_namespace
+
+logger = logging.getLogger(__name__)
 
-class RegistrationViewSet(viewsets.ModelViewSet):
+class RegistrationViewSet(AdmissionControlMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Registration.objects.all()
     serializer_class = RegistrationSerializer
-from .models import Category, Event, Group, Result, GalleryImage, CarouselImage, Contestant
+    throttle_scope = 'registrations'
+from .models import Category, Event, Group, Result, ResultChange, GalleryImage, CarouselImage, Contestant
 from .serializers import (
     CategorySerializer, 
     EventSerializer, 
@@ -30,20 +55,40 @@ from .serializers import (
     CarouselImageSerializer,
     ContestantSerializer
 )
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, ConditionalGetMixin, CompressedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category,)
+    cache_policy = 'static'
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
+class EventViewSet(ReplicaReadMixin, ConditionalGetMixin, CompressedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    cache_models = (Event, Category)
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(ReplicaReadMixin, ConditionalGetMixin, CompressedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    cache_models = (Group,)
+    cache_policy = 'static'
 
-class GalleryImageViewSet(viewsets.ReadOnlyModelViewSet):
+class GalleryImageViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Gallery listing, cached per year. The cached pages are invalidated by
+    the signal handlers in `api/signals.py` whenever an image changes.
+    """
     serializer_class = GalleryImageSerializer
+    cache_models = (GalleryImage,)
+    cache_policy = 'images'
+
+    def get_year(self):
+        year = self.request.query_params.get('year')
+        if year is None:
+            return None
+        try:
+            return int(year)
+        except ValueError:
+            raise ValidationError({'year': 'Year must be a number.'})
 
     def get_queryset(self):
         """
@@ -51,17 +96,45 @@ class GalleryImageViewSet(viewsets.ReadOnlyModelViewSet):
         by filtering against a `year` query parameter in the URL.
         """
         queryset = GalleryImage.objects.all().order_by('-uploaded_at')
-        year = self.request.query_params.get('year')
+        year = self.get_year()
         if year is not None:
             queryset = queryset.filter(year=year)
         return queryset
 
-class CarouselImageViewSet(viewsets.ReadOnlyModelViewSet):
+    def list(self, request, *args, **kwargs):
+        year = self.get_year()
+        # The listing isn't paginated: other query parameters must not add
+        # copies of it to the cache
+        cache_key = versioned_key(gallery_year_namespace(year), 'list')
+        data = cache.get(cache_key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(cache_key, response.data, settings.GALLERY_CACHE_TIMEOUT)
+            return response
+        return Response(data)
+
+    @action(detail=False)
+    def years(self, request):
+        """Available gallery years with the number of images in each, newest first."""
+        cache_key = versioned_key(GALLERY_YEARS_NAMESPACE, 'facets')
+        data = cache.get(cache_key)
+        if data is None:
+            data = list(
+                GalleryImage.objects.values('year')
+                .annotate(count=Count('id'))
+                .order_by('-year')
+            )
+            cache.set(cache_key, data, settings.GALLERY_CACHE_TIMEOUT)
+        return Response(data)
+
+class CarouselImageViewSet(ReplicaReadMixin, ConditionalGetMixin, CompressedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for carousel images that auto-scroll on the dashboard.
     Only returns active images, ordered by their specified order.
     """
     serializer_class = CarouselImageSerializer
+    cache_models = (CarouselImage,)
+    cache_policy = 'images'
 
     def get_queryset(self):
         """
@@ -69,265 +142,136 @@ class CarouselImageViewSet(viewsets.ReadOnlyModelViewSet):
         """
         return CarouselImage.objects.filter(is_active=True).order_by('order', 'uploaded_at')
 
-class ContestantViewSet(viewsets.ModelViewSet):
+class ContestantViewSet(AdmissionControlMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Contestant.objects.all()
     serializer_class = ContestantSerializer
-class ResultViewSet(viewsets.ReadOnlyModelViewSet):
+    # Throttled and queued per client and process, see api/throttling.py;
+    # retried creates are answered from api/idempotency.py
+    throttle_scope = 'contestants'
+class ResultViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
+    cache_models = (Result, Registration, Contestant, Event, Group)
+
+class PointsView(ReplicaReadMixin, CompressedResponseCacheMixin, APIView):
+    # Points follow results, and the group a result counts for
+    cache_models = (Group, Result, Registration, Contestant)
 
-class PointsView(APIView):
     def get(self, request, format=None):
-        groups = Group.objects.all()
-        points_data = []
-        for group in groups:
-            # Calculate total points for each group
-            total_points = Result.objects.filter(
-                registration__contestant__group=group
-            ).aggregate(total=Sum('points'))['total'] or 0
+        # One aggregate query for all groups, see api/scoring.py
+        return Response(group_points())
 
-            points_data.append({
-                'group_name': group.name,
-                'total_points': total_points
-            })
 
-        # --- THIS IS THE FIX ---
-        # Sort the list of dictionaries by 'total_points' in descending order.
-        sorted_points_data = sorted(points_data, key=lambda x: x['total_points'], reverse=True)
-        # --------------------
+class PointsBreakdownView(ReplicaReadMixin, CompressedResponseCacheMixin, APIView):
+    """
+    Group standings split by contestant category and gender:
+    `/api/points/breakdown/?category=<id>&gender=<Male|Female>&group=<id>&top=<n>`.
+    Served from the cached breakdown cube in api/scoring.py.
+    """
+    cache_models = (Group, Category, Event, Result, Registration, Contestant)
 
-        return Response(sorted_points_data)
+    def get(self, request):
+        params = request.query_params
+        filters = {}
+        for name in ('group', 'category', 'top'):
+            if params.get(name):
+                try:
+                    filters[name] = int(params[name])
+                except ValueError:
+                    raise ValidationError({name: f'{name.capitalize()} must be a number.'})
+        if filters.get('top', 1) < 1:
+            raise ValidationError({'top': 'Top must be at least 1.'})
+        gender = params.get('gender')
+        if gender:
+            if gender not in dict(Contestant.GENDER_CHOICES):
+                raise ValidationError({'gender': f"Gender must be one of {', '.join(dict(Contestant.GENDER_CHOICES))}."})
+            filters['gender'] = gender
+        return Response(breakdown_standings(**filters))
 
 
 class GenerateEventPostersView(APIView):
     def get(self, request, event_id):
         try:
-            # Optimized query with select_related to reduce database hits
-            event = Event.objects.select_related().prefetch_related('categories').get(id=event_id)
-            
-            # Get all results for this event
-            all_results = Result.objects.filter(registration__event=event).select_related(
-                'registration__contestant__group', 'registration__event'
-            )
-            
-            # Get winning results (positions 1, 2, 3) that should be included in posters
-            results = all_results.filter(
-                position__in=[1, 2, 3], 
-                include_in_poster=True
-            ).order_by('position', 'display_order')  # Order by position first, then display_order for ties
-
-            if not results.exists():
+            # Posters are only drawn again once something on them changed
+            posters_key = poster_cache_key(event_id)
+            cached_posters = cache.get(posters_key)
+            if cached_posters is not None:
+                return Response(cached_posters)
+
+            data = load_poster_data(event_id)
+            if data is None:
                 # No poster-eligible winning results found
                 return Response([], status=200)
 
-            
-            # Pre-calculate common data once
-            result_number = results.first().resultNumber or ""
-            
-            category_names = [cat.name for cat in event.categories.all()]
-            is_general_event = len(category_names) > 1
-            
-            # Ensure output directory exists once
-            output_dir = os.path.join(settings.MEDIA_ROOT, 'generated_posters')
-            os.makedirs(output_dir, exist_ok=True)
-            
-            generated_posters_urls = []
-            template_files = ['tmb1.png', 'tmb2.png']
+            generated_posters_urls = generate_posters(data, request)
+            if generated_posters_urls:
+                cache.set(posters_key, generated_posters_urls, settings.POSTER_CACHE_TIMEOUT)
 
-            # Process one template at a time to minimize memory usage
-            for template_name in template_files:
-                try:
-                    # Load template and process immediately
-                    template_path = os.path.join(settings.BASE_DIR, 'assets', template_name)
-                    
-                    if not os.path.exists(template_path):
-                        continue
-                    
-                    # Open, process, and save in one go to minimize memory usage
-                    with Image.open(template_path) as template_img:
-                        # Copy the template to work with and convert to RGB mode
-                        # This fixes the "cannot allocate more than 256 colors" error
-                        image = template_img.convert('RGB')
-                    
-                    # Load fonts (do this once per template to save memory)
-                    try:
-                        font_main_path = os.path.join(settings.BASE_DIR, 'assets', 'fonts', 'chinese rocks rg.otf')
-                        font_secondary_path = os.path.join(settings.BASE_DIR, 'assets', 'fonts', 'Poppins-Medium.ttf')
-                        
-                        print(f"Font paths - Main: {font_main_path}, Secondary: {font_secondary_path}")
-                        print(f"Font files exist - Main: {os.path.exists(font_main_path)}, Secondary: {os.path.exists(font_secondary_path)}")
-                        
-                        # font_result_label = ImageFont.truetype(font_main_path, 40)
-                        font_publication_num = ImageFont.truetype(font_main_path, 60)
-                        font_category = ImageFont.truetype(font_main_path, 50)
-                        font_event = ImageFont.truetype(font_main_path, 60)
-                        font_winner = ImageFont.truetype(font_main_path, 45)
-                        font_department = ImageFont.truetype(font_secondary_path, 25)
-                        print("✅ All fonts loaded successfully")
-                        
-                    except Exception as font_error:
-                        print(f"❌ Font loading error: {font_error}")
-                        # Use default font if custom fonts fail
-                        font_result_label = font_publication_num = font_category = font_event = font_winner = font_department = ImageFont.load_default()
-                    
-                    draw = ImageDraw.Draw(image)
-                    
-                    # Define colors
-                    color_primary = (0, 0, 0)
-                    color_secondary = (0, 0, 0) 
-                    even_name_color = (167, 18, 26)
-                    print(f"Colors defined - Primary: {color_primary}, Secondary: {color_secondary}, Event: {even_name_color}")
-                    
-                    # Get image dimensions for reference
-                    img_width, img_height = image.size
-                    print(f"Template dimensions: {img_width} x {img_height}")
-                    
-                    # ===== CUSTOMIZABLE POSITIONS =====
-                    # Adjust these X,Y coordinates for any template design
-                    
-                    # "Result" label position
-                    # result_label_x = 200
-                    # result_label_y = 150
-                    
-                    # Result number position (01, 02, etc.)
-                    result_num_x = 225
-                    result_num_y = 605
-                    
-                    # Category position (GIRLS, BOYS, etc.)
-                    category_x = 210
-                    category_y = 705
-                    
-                    # Event name position
-                    event_x = 210
-                    event_y = 760
-                    
-                    # Winners starting position and spacing
-                    winners_start_x = 280
-                    winners_start_y = 885
-                    winners_spacing = 95  # Vertical space between each winner
-                    
-                    # Department name offset (relative to winner name)
-                    dept_x_offset = 0    # Horizontal offset from winner name
-                    dept_y_offset = 40   # Vertical offset from winner name
-                    
-                    # Draw "Result" label
-                    # draw.text((result_label_x, result_label_y), "Result", font=font_result_label, fill=color_secondary)
-                    # print(f"Drew 'Result' label at ({result_label_x}, {result_label_y})")
-                    
-                    # Draw result number
-                    draw.text((result_num_x, result_num_y), str(result_number), font=font_publication_num, fill=color_primary)
-                    print(f"Drew result number: '{result_number}' at ({result_num_x}, {result_num_y})")
-                    
-                    # Draw category and event name
-                    if not is_general_event and category_names:
-                        category_text = category_names[0].upper()
-                        draw.text((category_x, category_y), category_text, font=font_category, fill=color_secondary)
-                        print(f"Drew category: '{category_text}' at ({category_x}, {category_y})")
-                    else:
-                        print("Skipped category (general event or no categories)")
-                    
-                    # Draw event name
-                    event_text = event.name.upper()
-                    draw.text((event_x, event_y), event_text, font=font_event, fill=even_name_color)
-                    print(f"Drew event name: '{event_text}' at ({event_x}, {event_y})")
-                    
-                    # Draw winners list - simple X,Y positioning with tie handling
-                    # Results are already sorted by position, then display_order for ties
-                    
-                    for i, result in enumerate(results):
-                        winner_name = result.registration.contestant.full_name
-                        department_name = result.registration.contestant.group.name
-                        position = result.position
-                        display_order = result.display_order
-                        
-                        print(f"  Drawing winner at position {position} (display_order: {display_order}): {winner_name} - {department_name}")
-                        
-                        # Calculate positions for this winner
-                        winner_y = winners_start_y + (i * winners_spacing)
-                        dept_x = winners_start_x + dept_x_offset
-                        dept_y = winner_y + dept_y_offset
-                        
-                        try:
-                            # Draw winner name and department
-                            draw.text((winners_start_x, winner_y), winner_name, font=font_winner, fill=color_primary)
-                            draw.text((dept_x, dept_y), department_name, font=font_department, fill=color_secondary)
-                            print(f"    Winner drawn at ({winners_start_x}, {winner_y})")
-                            print(f"    Department drawn at ({dept_x}, {dept_y})")
-                        except Exception as e:
-                            print(f"    ERROR drawing winner: {e}")
-                    
-                    # Save to memory buffer instead of local file for Cloudinary upload
-                    output_filename = f'event_{event_id}_{template_name}'
-                    
-                    # Save image to memory buffer
-                    img_buffer = io.BytesIO()
-                    image.save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    
-                    print(f"✅ Saved {output_filename} to memory buffer")
-                    
-                    # Upload to Cloudinary
-                    try:
-                        print(f"📤 Uploading {output_filename} to Cloudinary...")
-                        upload_result = cloudinary.uploader.upload(
-                            img_buffer,
-                            public_id=f"generated_posters/{output_filename}",
-                            folder="generated_posters",
-                            resource_type="image",
-                            format="png"
-                        )
-                        
-                        # Get the Cloudinary URL
-                        image_url = upload_result['secure_url']
-                        generated_posters_urls.append({'id': template_name, 'url': image_url})
-                        print(f"✅ Successfully uploaded to Cloudinary: {image_url}")
-                        
-                    except Exception as cloudinary_error:
-                        print(f"❌ Cloudinary upload failed: {cloudinary_error}")
-                        # Fallback: save locally (won't work on Render but good for local testing)
-                        try:
-                            output_path = os.path.join(output_dir, output_filename)
-                            image.save(output_path, "PNG")
-                            image_url = request.build_absolute_uri(
-                                os.path.join(settings.MEDIA_URL, 'generated_posters', output_filename)
-                            )
-                            generated_posters_urls.append({'id': template_name, 'url': image_url})
-                            print(f"⚠️ Saved locally as fallback: {image_url}")
-                        except Exception as local_error:
-                            print(f"❌ Local save also failed: {local_error}")
-                            continue
-                    
-                    # Immediately close and delete the image to free memory
-                    image.close()
-                    del image
-                    del draw
-                    
-                    print(f"✅ Completed template: {template_name}")
-                    
-                except Exception as template_error:
-                    print(f"❌ Error processing template {template_name}: {template_error}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
-
-            print(f"🎯 Generated {len(generated_posters_urls)} posters for event {event_id}")
-            print(f"Response data: {generated_posters_urls}")
+            logger.debug("Generated %d posters for event %s: %s",
+                         len(generated_posters_urls), event_id, generated_posters_urls)
             return Response(generated_posters_urls)
 
         except Event.DoesNotExist:
-            print(f"❌ Event not found: {event_id}")
             return Response({"error": "Event not found."}, status=404)
-        except Exception as e:
-            print(f"💥 CRITICAL ERROR in GenerateEventPostersView: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Generating posters for event %s failed", event_id)
             return Response({'error': 'An unexpected server error occurred.'}, status=500)
 
-class EventsForRegistrationView(APIView):
+class EventResultsView(ReplicaReadMixin, APIView):
+    """
+    An event with its ordered results, winners' names and groups, points
+    and poster URLs (null until generated), see api/event_results.py.
+    """
+    cache_models = (Result, Registration, Contestant, Event, Group, Category)
+
+    def get(self, request, event_id):
+        payload = event_results(event_id)
+        if payload is None:
+            return Response({"error": "Event not found."}, status=404)
+        return Response(payload)
+
+
+class ResultsByNumberView(ReplicaReadMixin, APIView):
+    """The events published under a result number, each as in `EventResultsView`."""
+    cache_models = (Result, Registration, Contestant, Event, Group, Category)
+
+    def get(self, request, number):
+        payloads = results_by_number(number)
+        if not payloads:
+            return Response({"error": "No results with this number."}, status=404)
+        return Response({'result_number': number, 'events': payloads})
+
+
+class ChangesView(ReplicaReadMixin, CompressedResponseCacheMixin, APIView):
+    """
+    What was published after a sequence number:
+    `/api/changes/?since=<seq>&limit=<n>`. Clients keep the returned
+    `latest` and pass it as `since` next time; see api/changes.py.
+    """
+    cache_models = (ResultChange, Result, Registration, Contestant, Event, Group, Category)
+
+    def get(self, request):
+        since = self.get_number('since', default=0, minimum=0)
+        limit = min(self.get_number('limit', default=CHANGES_MAX_LIMIT, minimum=1), CHANGES_MAX_LIMIT)
+        return Response(changes_since(since, limit))
+
+    def get_number(self, name, default, minimum):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: f'{name.capitalize()} must be a number.'})
+        if value < minimum:
+            raise ValidationError({name: f'{name.capitalize()} must be at least {minimum}.'})
+        return value
+
+
+class EventsForRegistrationView(ReplicaReadMixin, APIView):
     """
     A smart view that returns events for a specific category
     PLUS any events that are considered "general".
     """
+    cache_models = (Event, Category)
+
     def get(self, request, category_id):
         try:
             # A "general" event is one linked to both Category A and Category B
@@ -343,18 +287,49 @@ class EventsForRegistrationView(APIView):
             return Response(serializer.data)
         except Category.DoesNotExist:
             return Response({"error": "Category not found."}, status=404)
-        
+
+
+class SearchView(ReplicaReadMixin, CompressedResponseCacheMixin, APIView):
+    """
+    Look up contestants and results by name or result number:
+    `/api/search/?q=<text>&limit=<n>`. Meant for search-as-you-type, so
+    answers are cached per query until the data changes; see api/search.py
+    for the indexes behind it.
+    """
+    cache_models = (Contestant, Registration, Result, Event, Group)
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), search.MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': 'Limit must be a number.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Limit must be at least 1.'})
+        if len(query) < search.MIN_QUERY_LENGTH:
+            return Response({'query': query, 'contestants': [], 'results': []})
+
+        contestants = [
+            {
+                'id': contestant.pk,
+                'full_name': contestant.full_name,
+                'group_name': contestant.group.name if contestant.group else None,
+            }
+            for contestant in search.search_contestants(query, limit)
+        ]
+        results = ResultSerializer(search.search_results(query, limit), many=True).data
+        return Response({'query': query, 'contestants': contestants, 'results': results})
+
+
 def debug_cloudinary_vars(request):
     cloud_name = os.environ.get('CLOUDINARY_CLOUD_NAME')
     api_key = os.environ.get('CLOUDINARY_API_KEY')
     api_secret = os.environ.get('CLOUDINARY_API_SECRET')
 
-    # This will print the values to your Render server logs.
-    print("--- CLOUDINARY DEBUG START ---")
-    print(f"DEBUG: CLOUD_NAME = {cloud_name}")
-    print(f"DEBUG: API_KEY = {api_key}")
-    print(f"DEBUG: API_SECRET_IS_SET = {'Yes, a value exists' if api_secret else 'No, it is empty or missing'}")
-    print("--- CLOUDINARY DEBUG END ---")
+    # This will print the values to your Render server logs. Logged at info
+    # level, since this endpoint is only ever called to see them.
+    logger.info("Cloudinary config: cloud name %s, API key %s, API secret set: %s",
+                 cloud_name, api_key, bool(api_secret))
 
     return HttpResponse("Debug information has been printed to the Render logs. Please check them now.")
 
@@ -419,31 +394,109 @@ def ping_database(request):
         }, status=500)
 
 
+class DatabasePoolView(APIView):
+    """
+    Connection pool statistics of this worker process (admins only):
+    pool size, idle connections, waiting requests, and the time requests
+    spent waiting for a connection.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        pool = connection.pool if connection.vendor == 'postgresql' else None
+        if pool is None:
+            return Response({'pooled': False, 'vendor': connection.vendor})
+        return Response({
+            'pooled': True,
+            'min_size': pool.min_size,
+            'max_size': pool.max_size,
+            'stats': pool.get_stats(),
+        })
+
+
+class MetricsView(APIView):
+    """
+    Per-route latency, query and serializer timings of this worker process
+    (admins only), see api/metrics.py. DELETE resets them.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics_registry.snapshot())
+
+    def delete(self, request):
+        metrics_registry.reset()
+        return Response(status=204)
+
+
+class SpaShell:
+    """
+    The built React index.html, kept in memory together with its gzip and
+    Brotli variants and a content-hash ETag. The ETag is weak: the variants
+    differ byte for byte but share it. The file is only read again when its
+    modification time changes, e.g. after a new frontend build.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mtime, etag, variants), replaced as a whole so a request never
+        # sees the ETag of one build with the body of another
+        self._shell = None
+
+    def load(self):
+        """
+        Return the shell's `(etag, variants)`, re-reading it if the file
+        changed, or None if it isn't available.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        shell = self._shell
+        if shell is None or shell[0] != mtime:
+            with self._lock:
+                shell = self._shell
+                if shell is None or shell[0] != mtime:
+                    with open(self.path, 'rb') as f:
+                        body = f.read()
+                    etag = 'W/"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                    shell = self._shell = (mtime, etag, compress_variants(body))
+        return shell[1:]
+
+
+spa_shell = SpaShell(os.path.join(settings.BASE_DIR, 'frontend', 'build', 'index.html'))
+
+
 def serve_react_app(request):
     """
     Serve the React app's index.html for all frontend routes.
     This handles React Router's client-side routing.
     """
     try:
-        index_file_path = os.path.join(settings.BASE_DIR, 'frontend', 'build', 'index.html')
-        
         # Check if the file exists
-        if not os.path.exists(index_file_path):
+        shell = spa_shell.load()
+        if shell is None:
             return HttpResponse(
                 '<h1>Frontend not built</h1><p>Please run <code>npm run build</code> in the frontend directory.</p>', 
                 content_type='text/html', 
                 status=404
             )
-        
-        with open(index_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Set proper headers for SPA
-        response = HttpResponse(content, content_type='text/html')
-        response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response['Pragma'] = 'no-cache'
-        response['Expires'] = '0'
-        
+
+        # The browser revalidates on every navigation, but only downloads
+        # the shell again after a new build
+        etag, variants = shell
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            encoding = choose_encoding(request, variants)
+            response = HttpResponse(variants[encoding], content_type='text/html; charset=utf-8')
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = 'no-cache'
+
         return response
         
     except Exception as e:
@@ -454,6 +507,39 @@ def serve_react_app(request):
         )
 
 
+def _is_latest(url):
+    return url == '/' + LATEST_NAME
+
+
+def _snapshot_headers(headers, path, url):
+    if _is_latest(url):
+        headers['Cache-Control'] = 'no-cache'
+
+
+@functools.cache
+def _snapshot_files(root):
+    # New versions are published while the server runs, so files are looked
+    # up on each request (autorefresh) instead of indexed once at startup
+    files = WhiteNoise(
+        None, autorefresh=True, max_age=None, add_headers_function=_snapshot_headers,
+        immutable_file_test=lambda path, url: not _is_latest(url),
+    )
+    files.add_files(root, prefix='/')
+    return files
+
+
+def serve_snapshot(request, path):
+    """
+    Serve a published results snapshot (see api/snapshots.py) from local
+    storage with WhiteNoise: pre-compressed variants, ETags and 304s.
+    Versioned files never change; `latest.json` is revalidated.
+    """
+    static_file = _snapshot_files(settings.SNAPSHOT_ROOT).find_file('/' + path)
+    if static_file is None:
+        raise Http404(path)
+    return WhiteNoiseMiddleware.serve(static_file, request)
+
+
 def debug_routing(request):
     """Debug view to see what's happening with routing"""
     return JsonResponse({
@@ -472,10 +558,12 @@ from django.http import HttpResponse
 from datetime import datetime
 import csv
 
-class WinnersExportView(APIView):
+class WinnersExportView(ReplicaReadMixin, APIView):
     """
     Export winners list as CSV
     """
+    cache_models = (Result, Registration, Contestant, Event, Group, Category)
+
     def get(self, request, event_id=None):
         try:
             # Get winners data (positions 1, 2, 3)
@@ -9,4 +9,10 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Apply database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Create the table used by the database cache backend
+python manage.py createcachetable
+
+# Resolve stored image URLs for any images that don't have one yet
+python manage.py backfill_image_urls
@@ -82,7 +82,9 @@ function GalleryPage() {
             <div key={image.id} className="gallery-item">
               {/* Use image.image directly, which will now be the full Cloudinary URL */}
               <img 
-                src={image.image} 
+                src={image.variants?.medium || image.image} 
+                srcSet={image.variants?.large ? `${image.variants.thumb} 320w, ${image.variants.medium} 800w, ${image.variants.large} 1600w` : undefined}
+                sizes="(max-width: 600px) 100vw, 33vw"
                 alt={image.caption}
                 onError={(e) => {
                   console.error(`Failed to load image: ${image.image}`);
@@ -1,5 +1,5 @@
 // frontend/src/components/RegistrationPage.js
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import {
   Paper, Box, Typography, TextField, Button, MenuItem, Stepper, Step, StepLabel,
@@ -11,6 +11,27 @@ import API_BASE_URL from '../apiConfig';
 
 const steps = ["Personal Details", "Select Category", "Choose Competitions"];
 
+const RETRY_STATUSES = [409, 502, 503, 504];
+const MAX_ATTEMPTS = 4;
+
+const newIdempotencyKey = () =>
+  (window.crypto?.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+
+// POST with an Idempotency-Key, retrying dropped connections and busy
+// servers with the same key: the server answers a retry with the original
+// response instead of creating the record twice.
+const postIdempotent = async (url, payload, key) => {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await axios.post(url, payload, { headers: { "Idempotency-Key": key } });
+    } catch (error) {
+      const retryable = !error.response || RETRY_STATUSES.includes(error.response.status);
+      if (!retryable || attempt >= MAX_ATTEMPTS) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  }
+};
+
 function RegistrationPage() {
   const [activeStep, setActiveStep] = useState(0);
   const [isSuccess, setIsSuccess] = useState(false);
@@ -18,6 +39,9 @@ function RegistrationPage() {
   const [hasTriedNext, setHasTriedNext] = useState(false);
   const [hasTriedSubmit, setHasTriedSubmit] = useState(false);
   const [message, setMessage] = useState("");
+  // Submitting the same details again reuses the key, so a contestant
+  // created by an attempt that seemed to fail isn't created twice
+  const submission = useRef({ payload: null, key: null });
 
   const [formData, setFormData] = useState({
     fullName: "",
@@ -151,20 +175,31 @@ function RegistrationPage() {
       phone_number: formData.phoneNumber,
     };
 
+    const payloadJson = JSON.stringify(contestantPayload);
+    if (submission.current.payload !== payloadJson) {
+      submission.current = { payload: payloadJson, key: newIdempotencyKey() };
+    }
+    const submissionKey = submission.current.key;
+
     try {
-      const contestantResponse = await axios.post(`${API_BASE_URL}/api/contestants/`, contestantPayload);
+      const contestantResponse = await postIdempotent(`${API_BASE_URL}/api/contestants/`, contestantPayload, submissionKey);
       const contestantId = contestantResponse.data.id;
       const registrationPromises = selectedEventIDs.map((eventId) => {
-        return axios.post(`${API_BASE_URL}/api/registrations/`, {
+        return postIdempotent(`${API_BASE_URL}/api/registrations/`, {
           contestant: contestantId,
           event: eventId,
-        });
+        }, `${submissionKey}:${eventId}`);
       });
       await Promise.all(registrationPromises);
       setIsSuccess(true);
     } catch (error) {
       console.error("Submission error! Details:", error.response?.data);
-      setMessage("Registration failed. Please check your details and try again.");
+      if (error.response?.status === 429) {
+        const retryAfter = error.response.headers["retry-after"];
+        setMessage(`Too many registrations right now. Please try again${retryAfter ? ` in ${retryAfter} seconds` : " shortly"}.`);
+      } else {
+        setMessage("Registration failed. Please check your details and try again.");
+      }
     } finally {
       setIsSubmitting(false);
     }
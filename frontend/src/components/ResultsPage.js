@@ -5,6 +5,7 @@ import { Container } from "@mui/material";
 import ResultFilter from "./ResultFilter";
 import ResultPosters from "./ResultPosters";
 import API_BASE_URL from '../apiConfig'; 
+import { fetchSnapshotFile } from "../snapshot";
 
 function ResultsPage() {
   const [posters, setPosters] = useState([]);
@@ -26,17 +27,27 @@ function ResultsPage() {
 
     const fetchPosters = async () => {
       try {
-        // Call the backend to generate and get the poster URLs
-        const response = await axios.get(
-          `${API_BASE_URL}/api/generate-event-posters/${filters.event}/`,
-        );
-        
-        // This is the key: we log the data to see what the API is sending
-        console.log("Received data from API:", response.data);
-
-        // Update the state with the new posters
-        setPosters(response.data);
+        // An event in the published snapshot goes straight to its (cached)
+        // posters; anything else, e.g. results newer than the snapshot,
+        // goes through the API
+        const winners = await fetchSnapshotFile(`winners/${filters.event}.json`).catch(() => null);
+        if (winners) {
+          const snapshotPosters = await axios.get(`${API_BASE_URL}${winners.posters_url}`);
+          setPosters(snapshotPosters.data);
+          return;
+        }
 
+        // The event's results come with its poster URLs once they have
+        // been generated; only the first visitor asks for them to be drawn
+        const response = await axios.get(`${API_BASE_URL}/api/events/${filters.event}/results/`);
+        let eventPosters = response.data.posters || [];
+        if (!response.data.posters && response.data.results.length > 0) {
+          const generated = await axios.get(
+            `${API_BASE_URL}/api/generate-event-posters/${filters.event}/`,
+          );
+          eventPosters = generated.data;
+        }
+        setPosters(eventPosters);
       } catch (error) {
         console.error("Error fetching posters!", error);
         setPosters([]); // Ensure posters are cleared if an error occurs
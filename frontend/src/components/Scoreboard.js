@@ -7,6 +7,7 @@ import CountUp from "react-countup";
 import { motion } from "framer-motion";
 import { useInView } from "react-intersection-observer";
 import API_BASE_URL from '../apiConfig'; 
+import { fetchSnapshotFile } from "../snapshot";
 
 const containerVariants = {
   hidden: { opacity: 0 },
@@ -46,6 +47,12 @@ function Scoreboard() {
 
   const fetchPoints = async () => {
     try {
+      // The published snapshot first, the API if there is none
+      const snapshot = await fetchSnapshotFile("points.json").catch(() => null);
+      if (snapshot) {
+        setPoints(snapshot);
+        return;
+      }
       const response = await axios.get(`${API_BASE_URL}/api/points/`);
       setPoints(response.data || []);
     } catch (error) {
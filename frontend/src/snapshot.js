@@ -0,0 +1,20 @@
+// frontend/src/snapshot.js
+// Published results snapshots (see api/snapshots.py on the backend).
+// latest.json names the files of the current snapshot; those never change,
+// so the browser keeps them and only latest.json is revalidated.
+import axios from "axios";
+import API_BASE_URL from "./apiConfig";
+
+const absolute = (url) => (/^https?:\/\//.test(url) ? url : `${API_BASE_URL}${url}`);
+
+// Returns the data of one snapshot file, or null if the snapshot has no such
+// file. Throws if there is no snapshot, so callers can fall back to the API.
+export async function fetchSnapshotFile(name) {
+  const latest = await axios.get(`${API_BASE_URL}/snapshots/latest.json`);
+  const url = latest.data.files[name];
+  if (!url) {
+    return null;
+  }
+  const response = await axios.get(absolute(url));
+  return response.data;
+}
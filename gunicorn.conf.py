@@ -0,0 +1,23 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from
+the project root (`gunicorn pusahityotsav.wsgi`).
+
+Workers and threads are read from the same environment variables as
+settings.py, which sizes each worker's database connection pool from them.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def worker_exit(server, worker):
+    # Close the pooled database connections instead of leaving them to time out
+    from django.db import connections
+
+    for conn in connections.all(initialized_only=True):
+        if conn.vendor == 'postgresql':
+            conn.close_pool()
@@ -0,0 +1,89 @@
+"""
+Load test against a running server, e.g.
+
+    pip install locust
+    locust -H http://127.0.0.1:8000 --headless -u 100 -r 10 -t 2m --csv locust
+
+Visitors mostly read the public pages (points, results, gallery), and a few
+register. Seed the server's database with a synthetic festival first, so
+the numbers mean something:
+
+    python manage.py generate_festival_data --contestants 20000
+    python manage.py publish_snapshot
+
+Registrations are throttled per client IP (see api/throttling.py), and all
+simulated visitors share this machine's IP: raise CONTESTANT_THROTTLE_RATE
+and REGISTRATION_THROTTLE_RATE on the server to load the insert path, or
+leave them to watch it shed load with 429s.
+
+For in-process, per-endpoint numbers see `python manage.py run_benchmarks`.
+"""
+import itertools
+import random
+import uuid
+
+from locust import HttpUser, between, task
+
+_registrations = itertools.count()
+
+
+class Visitor(HttpUser):
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.events = [event['id'] for event in self.client.get('/api/events/').json()] or [None]
+        self.categories = [category['id'] for category in self.client.get('/api/categories/').json()] or [None]
+        self.groups = [group['id'] for group in self.client.get('/api/groups/').json()] or [None]
+
+    @task(6)
+    def points(self):
+        self.client.get('/api/points/')
+
+    @task(4)
+    def results(self):
+        self.client.get('/api/results/')
+
+    @task(4)
+    def gallery(self):
+        self.client.get('/api/gallery/')
+        self.client.get('/api/gallery/years/')
+
+    @task(3)
+    def home(self):
+        self.client.get('/')
+        self.client.get('/api/carousel/')
+
+    @task(2)
+    def events(self):
+        self.client.get('/api/events/')
+        self.client.get('/api/categories/')
+
+    @task(2)
+    def event(self):
+        event_id = random.choice(self.events)
+        if event_id:
+            self.client.get(f'/api/events/{event_id}/', name='/api/events/[id]/')
+
+    @task(1)
+    def snapshot(self):
+        self.client.get('/snapshots/latest.json')
+
+    @task(1)
+    def export_winners(self):
+        self.client.get('/api/export-winners/')
+
+    @task(1)
+    def register(self):
+        category_id = random.choice(self.categories)
+        if category_id:
+            self.client.get(f'/api/events-for-registration/{category_id}/', name='/api/events-for-registration/[id]/')
+        self.client.post('/api/contestants/', json={
+            'full_name': 'Load Test Contestant',
+            'email': f'load-{uuid.uuid4().hex[:12]}-{next(_registrations)}@festival.test',
+            'state': 'Kerala',
+            'gender': random.choice(['Male', 'Female']),
+            'group': random.choice(self.groups),
+            'category': category_id,
+            'course': 'BA English',
+            'phone_number': '9000000000',
+        })
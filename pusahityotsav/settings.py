@@ -137,10 +137,10 @@
 Django settings for pusahityotsav project.
 Final, unified configuration for local and production environments.
 """
-import cloudinary
 from pathlib import Path
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # --- BASE CONFIGURATION ---
@@ -165,7 +165,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'cloudinary_storage',
-    'cloudinary',
+    # 'cloudinary' is not an installed app: nothing uses its template tags,
+    # and as an app it would import the whole SDK at startup
     'import_export',
     'rest_framework',
     'corsheaders',
@@ -176,6 +177,11 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Below WhiteNoise, which is sync only: on ASGI the middleware from here
+    # down runs on the event loop instead of in a thread
+    'api.log.RequestIdMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -208,9 +214,107 @@ DATABASES = {
     'default': dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}", # Fallback if DATABASE_URL is not set
         conn_max_age=600,
+        conn_health_checks=True,
     )
 }
 
+# --- READ REPLICA ---
+# With REPLICA_DATABASE_URL set, the public read-only API views and the
+# exports read from the replica, and writes and the admin use the primary
+# (see api/routers.py). REPLICA_MAX_LAG is how far behind, in seconds, the
+# replica may be: for that long after a write the writer, and any view
+# reading the changed models, stay on the primary.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 10))
+if REPLICA_DATABASE_URL:
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(
+        REPLICA_DATABASE_URL, conn_max_age=600, conn_health_checks=True,
+    )
+    # Tests run against the test database through both aliases
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Gunicorn sizing, read by gunicorn.conf.py too. The connection pool below
+# is sized from it.
+GUNICORN_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 2))
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+# Background image upload threads per worker process (see api/uploads.py)
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 4))
+
+# On Postgres every worker process keeps a pool of connections (psycopg 3)
+# instead of one persistent connection per thread. Connections are checked
+# before they are handed out (CONN_HEALTH_CHECKS), so one the server closed
+# while idle is replaced instead of failing the request. Each request
+# thread, background upload thread and the snapshot thread can hold a
+# connection, so at most GUNICORN_WORKERS * DB_POOL_MAX_SIZE connections
+# are opened.
+DB_POOL = os.environ.get('DB_POOL', 'True') == 'True'
+for database in DATABASES.values():
+    if not DB_POOL or database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    database['CONN_MAX_AGE'] = 0  # The pool keeps connections open instead
+    database.setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', GUNICORN_THREADS + UPLOAD_WORKERS + 1)),
+        # Seconds a request may wait for a free connection
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Seconds before an idle connection above min_size is closed
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    }
+
+# --- CACHE ---
+# Shared between all gunicorn workers so that invalidating a cached API
+# response in one worker invalidates it everywhere. Uses Redis when
+# REDIS_URL is set, which is what production should use: without it the
+# cache is a database table (`manage.py createcachetable`), fine for
+# development, but every cache read is a database query.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'api_cache',
+        }
+    }
+# Per process, costs no round trips: throttle counters (THROTTLE_CACHE) and
+# short-lived copies of the cache version counters (see api/caching.py)
+CACHES['local'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local'}
+# Seconds a worker may use its copy of a version number or last-changed
+# time, so another worker's change can take that long to show; 0 always
+# reads the shared cache. Redis reads are cheap enough to do every time.
+CACHE_COUNTER_TIMEOUT = float(os.environ.get('CACHE_COUNTER_TIMEOUT', 0 if REDIS_URL else 2))
+
+# How long (seconds) a cached gallery page is kept. Pages are invalidated
+# as soon as an image is saved or deleted, so this can be long.
+GALLERY_CACHE_TIMEOUT = int(os.environ.get('GALLERY_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# How long (seconds) the pre-compressed bodies of the events, categories,
+# groups, carousel and points endpoints are kept. They are invalidated by
+# model changes too, this only bounds changes made without signals.
+API_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('API_RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
+# Browser/CDN caching of the read-only API endpoints (seconds). Within
+# max_age a response is reused as is, after that it may still be shown for
+# stale_while_revalidate seconds while it is revalidated in the background.
+# Revalidation is a cheap 304 as long as nothing changed.
+API_CACHE_POLICIES = {
+    'default': {
+        'max_age': int(os.environ.get('API_CACHE_MAX_AGE', 30)),
+        'stale_while_revalidate': int(os.environ.get('API_CACHE_STALE_WHILE_REVALIDATE', 300)),
+    },
+    # Categories and groups are set up before the festival
+    'static': {'max_age': 60 * 60, 'stale_while_revalidate': 60 * 60 * 24},
+    'images': {'max_age': 5 * 60, 'stale_while_revalidate': 60 * 60 * 24},
+}
+
 # --- PASSWORD VALIDATION ---
 AUTH_PASSWORD_VALIDATORS = [ # ... (This section is correct and unchanged)
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -263,14 +367,142 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET'),
 }
 
-# This explicit config call is for direct uploads (Poster Generation)
-cloudinary.config(
-  cloud_name = os.environ.get('CLOUDINARY_CLOUD_NAME'),
-  api_key = os.environ.get('CLOUDINARY_API_KEY'),
-  api_secret = os.environ.get('CLOUDINARY_API_SECRET'),
-  secure = True
+# Background image uploads (see api/uploads.py; UPLOAD_WORKERS is set with
+# the gunicorn sizing above)
+UPLOAD_RETRIES = int(os.environ.get('UPLOAD_RETRIES', 3))
+UPLOAD_RETRY_BACKOFF = float(os.environ.get('UPLOAD_RETRY_BACKOFF', 2))  # seconds, doubled per retry
+CLOUDINARY_UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+# Allow a whole day of festival photos in one bulk upload
+DATA_UPLOAD_MAX_NUMBER_FILES = 500
+
+# Gallery photo pre-processing before upload (see api/imaging.py)
+IMAGE_MAX_EDGE = int(os.environ.get('IMAGE_MAX_EDGE', 2048))  # px, long edge
+IMAGE_THUMBNAIL_EDGE = int(os.environ.get('IMAGE_THUMBNAIL_EDGE', 400))  # px
+IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 82))
+IMAGE_PREPROCESS_WORKERS = int(os.environ.get('IMAGE_PREPROCESS_WORKERS', 2))
+# Max number of differing hash bits (out of 64) for two photos to count as duplicates
+GALLERY_DUPLICATE_DISTANCE = int(os.environ.get('GALLERY_DUPLICATE_DISTANCE', 6))
+# Seconds between checks for gallery images other processes added (see api/dedup.py)
+GALLERY_HASH_REFRESH_INTERVAL = float(os.environ.get('GALLERY_HASH_REFRESH_INTERVAL', 10))
+
+# The Cloudinary SDK itself is imported and configured from CLOUDINARY_STORAGE
+# on first upload (see api/cloudinary_sdk.py), not at startup.
+
+# Events with more registrations than this get a searchable result picker
+# in the admin instead of one checkbox per registration
+RESULT_PICKER_SEARCH_THRESHOLD = int(os.environ.get('RESULT_PICKER_SEARCH_THRESHOLD', 150))
+
+# Static JSON snapshots of the results (see api/snapshots.py), published
+# by `publish_snapshot` and whenever results change.
+SNAPSHOT_ROOT = os.environ.get('SNAPSHOT_ROOT', os.path.join(BASE_DIR, 'snapshots'))
+SNAPSHOT_URL = '/snapshots/'
+# Any Django storage backend can be used, e.g. one that writes to a CDN bucket
+SNAPSHOT_STORAGE = {
+    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    'OPTIONS': {'location': SNAPSHOT_ROOT, 'base_url': SNAPSHOT_URL},
+}
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 5))
+SNAPSHOT_ON_PUBLISH = os.environ.get('SNAPSHOT_ON_PUBLISH', 'True') == 'True'
+
+# Serve ping, points, gallery and posters with the async views in
+# api/async_views.py. Set by start_asgi.sh; keep it off under WSGI.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+# Timeout (seconds) of one poster upload from the async poster view
+POSTER_UPLOAD_TIMEOUT = float(os.environ.get('POSTER_UPLOAD_TIMEOUT', 60))
+# How long (seconds) the URLs of an event's generated posters are kept. They
+# are dropped as soon as something on the posters changes; this bounds how
+# long stale entries linger in the cache.
+POSTER_CACHE_TIMEOUT = int(os.environ.get('POSTER_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+
+# --- LOGGING ---
+# Records go through a queue to a background thread that writes them to
+# stdout (see api/log.py), tagged with the id of the request they belong
+# to. LOG_FORMAT=json emits one JSON object per line. Levels can be set per
+# module with LOG_LEVELS, e.g. "api.posters=DEBUG,django.db.backends=DEBUG".
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_LEVELS = dict(
+    item.split('=', 1) for item in os.environ.get('LOG_LEVELS', '').split(',') if '=' in item
 )
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'api.log.RequestIdFilter'},
+    },
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'},
+        'json': {'()': 'api.log.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'api.log.QueueStreamHandler',
+            'filters': ['request_id'],
+            'formatter': os.environ.get('LOG_FORMAT', 'plain'),
+        },
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'level': 'INFO'},
+        'api': {'level': LOG_LEVEL},
+        **{name.strip(): {'level': level.strip().upper()} for name, level in LOG_LEVELS.items()},
+    },
+}
+
+# --- REQUEST METRICS (see api/metrics.py) ---
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+# Timings kept per route for the percentiles at /api/metrics/
+METRICS_SAMPLES = int(os.environ.get('METRICS_SAMPLES', 1000))
+# Fraction of API requests to run under cProfile (0 turns profiling off).
+# Profiles of sampled requests slower than PROFILE_SLOW_MS are written to
+# PROFILE_DIR, keeping the PROFILE_KEEP slowest.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_MS = int(os.environ.get('PROFILE_SLOW_MS', 500))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+
+# --- REGISTRATION THROTTLING (see api/throttling.py) ---
+# Writes per client IP and endpoint, e.g. "30/min". One contestant sends
+# one registration per event they enter. A whole college often shares one
+# public IP (campus NAT, a mobile carrier's CGNAT), so the rates are per
+# network rather than per person: raise them if students registering
+# together from one campus get 429s.
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_CLASSES': ['api.throttling.WriteRateThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'contestants': os.environ.get('CONTESTANT_THROTTLE_RATE', '30/min'),
+        'registrations': os.environ.get('REGISTRATION_THROTTLE_RATE', '60/min'),
+    },
+    # Proxies in front of the app (Render has one), so the client IP is
+    # taken from X-Forwarded-For rather than the proxy's address
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,
+}
+# Cache holding the throttle counters: "default" is shared by all workers,
+# "local" is per process and costs no database queries
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'default')
+# Concurrent writes per worker process (all write endpoints together), how
+# many more may wait for a slot and for how long (seconds), and the
+# Retry-After sent to the rest. Waiting writes hold a thread too, so both
+# together stay below GUNICORN_THREADS: with 4 threads, 2 run, 1 waits and
+# 1 is always left for the public pages.
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'True') == 'True'
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', max(1, GUNICORN_THREADS // 2)))
+ADMISSION_MAX_QUEUE = int(os.environ.get(
+    'ADMISSION_MAX_QUEUE', max(0, GUNICORN_THREADS - ADMISSION_MAX_CONCURRENT - 1)
+))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 5))
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 5))
+
+# --- IDEMPOTENT WRITES (see api/idempotency.py) ---
+# Seconds a response is kept for replay to retries with the same
+# Idempotency-Key, and how long a key stays locked while its first request runs
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 60 * 60 * 24))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
 # --- CORS ---
 CORS_ALLOWED_ORIGINS = [
     os.environ.get('FRONTEND_URL', 'http://localhost:3000'),
-]
\ No newline at end of file
+]
+# Headers of the registration endpoints the registration form uses: see
+# api/throttling.py and api/idempotency.py
+CORS_EXPOSE_HEADERS = ['Retry-After', 'Idempotent-Replayed']
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
\ No newline at end of file
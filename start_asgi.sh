@@ -0,0 +1,13 @@
+#!/usr/bin/env bash
+# Start the app on ASGI instead of WSGI: gunicorn supervising uvicorn
+# workers, with the async views (api/async_views.py) serving ping, points,
+# gallery and posters. Use it as the Render start command in place of
+# `gunicorn pusahityotsav.wsgi`.
+set -o errexit
+
+export ASYNC_VIEWS=True
+
+exec gunicorn pusahityotsav.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --workers "${WEB_CONCURRENCY:-2}" \
+    --bind "0.0.0.0:${PORT:-8000}"